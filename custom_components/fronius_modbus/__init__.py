@@ -7,24 +7,37 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
 from homeassistant.const import CONF_NAME, CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
 from .const import (
     DOMAIN,
     CONF_INVERTER_UNIT_ID,
     CONF_METER_UNIT_ID,
+    CONF_FRAMER,
+    DEFAULT_FRAMER,
 )
 
 from . import hub
+from .services import async_setup_services
+from .metrics import async_register_metrics_view
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
 # List of platforms to support. There should be a matching .py file for each,
 # eg <cover.py> and <sensor.py>
 PLATFORMS = [Platform.NUMBER, Platform.SELECT, Platform.SENSOR]
 
 type HubConfigEntry = ConfigEntry[hub.Hub]
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Fronius Modbus services."""
+    async_setup_services(hass)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: HubConfigEntry) -> bool:
     """Set up Fronius Modbus from a config entry."""
 
@@ -41,25 +54,44 @@ async def async_setup_entry(hass: HomeAssistant, entry: HubConfigEntry) -> bool:
     else:
         meter_unit_ids = []
 
+    # the framer is chosen during setup and can be changed in the options
+    options = {CONF_FRAMER: entry.data.get(CONF_FRAMER, DEFAULT_FRAMER), **entry.options}
+
     _LOGGER.debug("Setup %s.%s", DOMAIN, name)
 
     # Store an instance of the "connecting" class that does the work of speaking
     # with your actual devices.
-    entry.runtime_data = hub.Hub(hass = hass, name = name, host = host, port = port, inverter_unit_id=inverter_unit_id, meter_unit_ids=meter_unit_ids, scan_interval = scan_interval)
+    entry.runtime_data = hub.Hub(hass = hass, name = name, host = host, port = port, inverter_unit_id=inverter_unit_id, meter_unit_ids=meter_unit_ids, scan_interval = scan_interval, options = options)
     
     await entry.runtime_data.init_data()
 
     # This creates each HA object for each platform your device requires.
     # It's done by calling the `async_setup_entry` function in each platform module.
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    async_register_metrics_view(hass, entry)
+
+    entry.async_on_unload(entry.runtime_data.start_supervisor())
+    entry.async_on_unload(entry.runtime_data.start_polling())
+    entry.async_on_unload(entry.runtime_data.start_schedule())
+    entry.async_on_unload(entry.runtime_data.start_fast_lane())
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when the options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # This is called when an entry/configured device is to be removed. The class
     # needs to unload itself, and remove callbacks. See the classes for further
     # details
+    # restore the storage settings and the export limit while the connection is still open
+    await entry.runtime_data.cancel_calibration()
+    await entry.runtime_data.stop_export_control()
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        entry.runtime_data.close()
 
     return unload_ok
 
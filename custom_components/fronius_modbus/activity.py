@@ -0,0 +1,69 @@
+"""Detection of the sleeping inverter for the reduced polling at night."""
+
+import logging
+
+from .froniusmodbusclient_const import INVERTER_SLEEP_STATUSES
+
+_LOGGER = logging.getLogger(__name__)
+
+FULL = 'Full'
+REDUCED = 'Reduced'
+
+ACTIVE_CHARGE_STATUSES = ['Charging', 'Discharging']
+
+
+class InverterActivity:
+    """Decides whether an update reads all blocks or only the meter and the storage.
+
+    The inverter is asleep when it reports Sleeping or Standby, or at night when it neither
+    produces PV nor AC power. While it is asleep the inverter blocks are only read as a probe
+    every probe_interval seconds, the meter and the storage are read every update. Polling is
+    full again as soon as a probe reads an inverter that is awake, the meter exports more than
+    export_threshold or the battery charges or discharges.
+    """
+
+    def __init__(self, probe_interval, idle_power=10, export_threshold=50):
+        self.probe_interval = probe_interval
+        self._idle_power = idle_power
+        self._export_threshold = export_threshold
+        self.mode = FULL
+        self._asleep = False
+        self._last_probe = None
+
+    @staticmethod
+    def _is_numeric(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def read_inverter(self, timestamp) -> bool:
+        """Whether the update at timestamp reads the inverter blocks."""
+        return self.mode == FULL or self._last_probe is None or timestamp - self._last_probe >= self.probe_interval
+
+    def asleep(self, data, night) -> bool:
+        """Whether the inverter blocks in data show a sleeping inverter."""
+        if data.get('statusvendor') in INVERTER_SLEEP_STATUSES:
+            return True
+        if not night:
+            return False
+        powers = [data.get('acpower')] + ([data.get('pv_power')] if 'pv_power' in data else [])
+        return all(self._is_numeric(power) and abs(power) <= self._idle_power for power in powers)
+
+    def woken(self, data) -> bool:
+        """Whether the meter or the storage show an inverter that is active."""
+        m_power = data.get('m1_power')
+        if self._is_numeric(m_power) and m_power < -self._export_threshold:
+            return True
+        return data.get('charge_status') in ACTIVE_CHARGE_STATUSES
+
+    def update(self, data, timestamp, inverter_read, night):
+        """Update the mode from the data of an update. Returns (previous, new) mode on a transition, otherwise None."""
+        if inverter_read:
+            self._last_probe = timestamp
+            self._asleep = self.asleep(data, night)
+        if self._asleep and self.woken(data):
+            self._asleep = False
+
+        mode = REDUCED if self._asleep else FULL
+        if mode == self.mode:
+            return None
+        previous, self.mode = self.mode, mode
+        return previous, mode
@@ -1,7 +1,9 @@
 import logging
+import time
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.core import callback
 from .hub import Hub
+from .const import SIGNIFICANT_CHANGE_DEADBANDS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -10,6 +12,9 @@ class FroniusModbusBaseEntity(CoordinatorEntity):
     """Base entity for Fronius Modbus devices."""
     _key = None
     _options_dict = None
+    _deadband = None
+    # (monotonic time, value, available, attributes) of the last state write
+    _written = None
 
     def __init__(self, coordinator, device_info, name, key, device_class=None, state_class=None, unit=None, icon=None, entity_category=None, options=None, min=None, max=None, native_step=None, mode=None):
         """Initialize the entity."""
@@ -43,6 +48,10 @@ class FroniusModbusBaseEntity(CoordinatorEntity):
         self._attr_unique_id = f"{coordinator.hub.entity_prefix}_{self._key}"
         self._attr_device_info = device_info
 
+        if coordinator.hub.significant_change:
+            self._deadband = SIGNIFICANT_CHANGE_DEADBANDS.get(key, SIGNIFICANT_CHANGE_DEADBANDS.get(device_class))
+        self._heartbeat = coordinator.hub.state_heartbeat
+
     @property
     def available(self) -> bool:
         """Return if entity is available."""
@@ -56,7 +65,42 @@ class FroniusModbusBaseEntity(CoordinatorEntity):
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self.async_write_ha_state()
+        if self._significant_update():
+            self.async_write_ha_state()
+
+    def _significant_update(self) -> bool:
+        """True if the state must be written: always without a deadband, else on a change of the
+        availability or attributes, a value change beyond the deadband or after the heartbeat."""
+        if self._deadband is None:
+            return True
+        now = time.monotonic()
+        value = self.coordinator.data.get(self._key) if self.coordinator.data else None
+        available = self.available
+        attributes = self.extra_state_attributes
+        if attributes is not None:
+            attributes = dict(attributes)
+        if (self._written is not None
+                and now - self._written[0] < self._heartbeat
+                and available == self._written[2]
+                and attributes == self._written[3]
+                and self._within_deadband(self._written[1], value)):
+            return False
+        self._written = (now, value, available, attributes)
+        return True
+
+    def _within_deadband(self, written, value) -> bool:
+        numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (written, value))
+        if not numbers:
+            return value == written
+        change = abs(value - written)
+        if change == 0:
+            return True
+        absolute, relative = self._deadband
+        if absolute is not None and change < absolute:
+            return True
+        if relative is not None and change < relative * abs(written):
+            return True
+        return False
 
     @property
     def should_poll(self) -> bool:
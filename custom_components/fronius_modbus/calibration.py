@@ -0,0 +1,153 @@
+"""Battery calibration workflow."""
+
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+IDLE = 'Idle'
+CHARGING = 'Charging'
+HOLDING = 'Holding'
+DISCHARGING = 'Discharging'
+RESTORING = 'Restoring'
+FINISHED = 'Finished'
+CANCELLED = 'Cancelled'
+FAILED = 'Failed'
+
+FULL_SOC = 100
+# share of the progress at the end of charging and holding, discharging takes the rest
+CHARGED_PROGRESS = 40
+HELD_PROGRESS = 50
+
+
+class BatteryCalibration:
+    """Charges the battery from the grid to full, holds it, discharges it to the floor and restores the settings.
+
+    Runs as a background task of the hub. The state of charge is watched on the fast lane,
+    so a phase ends within seconds of reaching its target, independent of the updates of
+    the coordinator. The storage mode of the current phase is applied again every
+    refresh_interval seconds, so the rates are written again before the revert timeout of
+    the inverter. The storage settings from before the calibration are restored when it
+    finishes, fails or is cancelled.
+    """
+
+    def __init__(self, hub, hold_time, floor_soc, phase_timeout, refresh_interval):
+        self._hub = hub
+        self.hold_time = hold_time
+        self.floor_soc = floor_soc
+        self.phase_timeout = phase_timeout
+        self.refresh_interval = refresh_interval
+        self.phase = IDLE
+        self.progress = 0
+        self.soc = None
+        self.task = None
+        self._step = None
+        self._target = None
+        self._reached = asyncio.Event()
+        self._phase_started = None
+        self._phase_start_soc = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def cancel(self):
+        """Cancel the calibration and wait until the settings are restored."""
+        if not self.running:
+            return
+        self.task.cancel()
+        await asyncio.wait([self.task])
+
+    async def run(self):
+        settings = self._hub.storage_settings()
+        self.soc = self._hub.data.get('soc')
+        remove_listener = self._hub.add_fast_listener(self._async_on_samples, ['soc'])
+        final_phase = FAILED
+        try:
+            self._set_phase(CHARGING)
+            await self._apply(4, charge_power=self._hub.max_charge_rate_w)
+            await self._wait_soc(lambda soc: soc >= FULL_SOC)
+
+            self._set_phase(HOLDING)
+            await self._apply(6)
+            await self._wait_soc(lambda soc: False, self.hold_time)
+
+            self._set_phase(DISCHARGING)
+            await self._apply(7, minimum_reserve=self.floor_soc)
+            await self._wait_soc(lambda soc: soc <= self.floor_soc)
+            self.progress = 100
+            final_phase = FINISHED
+        except asyncio.CancelledError:
+            final_phase = CANCELLED
+            _LOGGER.info(f"Battery calibration cancelled in phase {self.phase}")
+        except TimeoutError:
+            _LOGGER.error(f"Battery calibration failed, phase {self.phase} did not reach its target in {self.phase_timeout} s")
+        except Exception as e:
+            _LOGGER.error(f"Battery calibration failed in phase {self.phase}: {e}")
+        finally:
+            remove_listener()
+
+        self._set_phase(RESTORING)
+        try:
+            await self._hub.restore_storage_settings(settings)
+        except Exception as e:
+            final_phase = FAILED
+            _LOGGER.error(f"Restoring the storage settings after the battery calibration failed: {e}")
+        self._set_phase(final_phase)
+        if final_phase == CANCELLED:
+            raise asyncio.CancelledError
+
+    def _set_phase(self, phase):
+        _LOGGER.info(f"Battery calibration phase {phase} SoC {self.soc}")
+        self.phase = phase
+        self._phase_started = time.monotonic()
+        self._phase_start_soc = self.soc
+        self._hub.update_calibration_data()
+
+    async def _apply(self, ext_mode, charge_power=None, discharge_power=None, minimum_reserve=None):
+        self._step = (ext_mode, charge_power, discharge_power, minimum_reserve)
+        await self._hub.apply_storage_step(*self._step)
+
+    async def _wait_soc(self, target, duration=None):
+        """Wait until target(soc) is true, or for duration seconds. Raises TimeoutError after the phase timeout."""
+        self._target = target
+        self._reached.clear()
+        if self.soc is not None and target(self.soc):
+            return
+        deadline = time.monotonic() + (self.phase_timeout if duration is None else duration)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if duration is None:
+                    raise TimeoutError
+                return
+            try:
+                await asyncio.wait_for(self._reached.wait(), min(remaining, self.refresh_interval))
+                return
+            except TimeoutError:
+                # the phase ends at the deadline, no need to write its step again
+                if deadline > time.monotonic():
+                    await self._apply(*self._step)
+
+    def _update_progress(self):
+        start_soc = self._phase_start_soc if self._phase_start_soc is not None else self.soc
+        if self.phase == CHARGING:
+            span = max(FULL_SOC - start_soc, 1)
+            self.progress = round(CHARGED_PROGRESS * min(max(self.soc - start_soc, 0) / span, 1))
+        elif self.phase == HOLDING:
+            elapsed = time.monotonic() - self._phase_started
+            self.progress = round(CHARGED_PROGRESS + (HELD_PROGRESS - CHARGED_PROGRESS) * min(elapsed / max(self.hold_time, 1), 1))
+        elif self.phase == DISCHARGING:
+            span = max(start_soc - self.floor_soc, 1)
+            self.progress = round(HELD_PROGRESS + (100 - HELD_PROGRESS) * min(max(start_soc - self.soc, 0) / span, 1))
+
+    async def _async_on_samples(self, samples, timestamp):
+        soc = samples.get('soc')
+        if soc is None:
+            return
+        self.soc = soc
+        self._update_progress()
+        self._hub.update_calibration_data()
+        if self._target is not None and self._target(soc):
+            self._reached.set()
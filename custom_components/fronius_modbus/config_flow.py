@@ -6,9 +6,9 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries, exceptions
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
-from .hub import Hub
+from .hub import Hub, parse_unit_ids
 from homeassistant.const import CONF_NAME, CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
 from .const import (
     DOMAIN,
@@ -19,6 +19,38 @@ from .const import (
     DEFAULT_METER_UNIT_ID,
     CONF_INVERTER_UNIT_ID,
     CONF_METER_UNIT_ID,
+    CONF_FRAMER,
+    CONF_TCP_KEEPALIVE,
+    CONF_TCP_NODELAY,
+    DEFAULT_FRAMER,
+    DEFAULT_TCP_KEEPALIVE,
+    DEFAULT_TCP_NODELAY,
+    FRAMERS,
+    CONF_EXPORT_CONTROL,
+    CONF_EXPORT_CONTROL_TARGET,
+    CONF_EXPORT_CONTROL_KP,
+    CONF_EXPORT_CONTROL_KI,
+    CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL,
+    DEFAULT_EXPORT_CONTROL_TARGET,
+    DEFAULT_EXPORT_CONTROL_KP,
+    DEFAULT_EXPORT_CONTROL_KI,
+    DEFAULT_EXPORT_CONTROL_MIN_WRITE_INTERVAL,
+    CONF_FLEET_UNIT_IDS,
+    DEFAULT_FLEET_UNIT_IDS,
+    CONF_FAST_STATISTICS,
+    CONF_FAST_ENERGY,
+    CONF_METRICS,
+    CONF_SIGNIFICANT_CHANGE,
+    CONF_STORAGE_CONTROL_POLICY,
+    DEFAULT_STORAGE_CONTROL_POLICY,
+    STORAGE_CONTROL_POLICIES,
+    CONF_STATE_HEARTBEAT,
+    DEFAULT_SIGNIFICANT_CHANGE,
+    DEFAULT_STATE_HEARTBEAT,
+    CONF_SLEEP_POLLING,
+    DEFAULT_SLEEP_POLLING,
+    CONF_METER_RATED_POWER,
+    DEFAULT_METER_RATED_POWER,
     SUPPORTED_MANUFACTURERS,
     SUPPORTED_MODELS,
 )
@@ -46,9 +78,34 @@ DATA_SCHEMA = vol.Schema(
         vol.Optional(CONF_INVERTER_UNIT_ID, default=DEFAULT_INVERTER_UNIT_ID): int,
         vol.Optional(CONF_METER_UNIT_ID, default=DEFAULT_METER_UNIT_ID): int,
         vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+        vol.Optional(CONF_FRAMER, default=DEFAULT_FRAMER): vol.In(FRAMERS),
     }
 )
 
+def options_schema(options: dict, data: dict) -> vol.Schema:
+    """Schema of the options form with the current options as defaults."""
+    return vol.Schema(
+        {
+            vol.Optional(CONF_FRAMER, default=options.get(CONF_FRAMER, data.get(CONF_FRAMER, DEFAULT_FRAMER))): vol.In(FRAMERS),
+            vol.Optional(CONF_TCP_NODELAY, default=options.get(CONF_TCP_NODELAY, DEFAULT_TCP_NODELAY)): bool,
+            vol.Optional(CONF_TCP_KEEPALIVE, default=options.get(CONF_TCP_KEEPALIVE, DEFAULT_TCP_KEEPALIVE)): bool,
+            vol.Optional(CONF_EXPORT_CONTROL, default=options.get(CONF_EXPORT_CONTROL, False)): bool,
+            vol.Optional(CONF_EXPORT_CONTROL_TARGET, default=options.get(CONF_EXPORT_CONTROL_TARGET, DEFAULT_EXPORT_CONTROL_TARGET)): int,
+            vol.Optional(CONF_EXPORT_CONTROL_KP, default=options.get(CONF_EXPORT_CONTROL_KP, DEFAULT_EXPORT_CONTROL_KP)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(CONF_EXPORT_CONTROL_KI, default=options.get(CONF_EXPORT_CONTROL_KI, DEFAULT_EXPORT_CONTROL_KI)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL, default=options.get(CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL, DEFAULT_EXPORT_CONTROL_MIN_WRITE_INTERVAL)): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Optional(CONF_FAST_STATISTICS, default=options.get(CONF_FAST_STATISTICS, False)): bool,
+            vol.Optional(CONF_FAST_ENERGY, default=options.get(CONF_FAST_ENERGY, False)): bool,
+            vol.Optional(CONF_FLEET_UNIT_IDS, default=options.get(CONF_FLEET_UNIT_IDS, DEFAULT_FLEET_UNIT_IDS)): str,
+            vol.Optional(CONF_METRICS, default=options.get(CONF_METRICS, False)): bool,
+            vol.Optional(CONF_STORAGE_CONTROL_POLICY, default=options.get(CONF_STORAGE_CONTROL_POLICY, DEFAULT_STORAGE_CONTROL_POLICY)): vol.In(STORAGE_CONTROL_POLICIES),
+            vol.Optional(CONF_SIGNIFICANT_CHANGE, default=options.get(CONF_SIGNIFICANT_CHANGE, DEFAULT_SIGNIFICANT_CHANGE)): bool,
+            vol.Optional(CONF_STATE_HEARTBEAT, default=options.get(CONF_STATE_HEARTBEAT, DEFAULT_STATE_HEARTBEAT)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+            vol.Optional(CONF_SLEEP_POLLING, default=options.get(CONF_SLEEP_POLLING, DEFAULT_SLEEP_POLLING)): bool,
+            vol.Optional(CONF_METER_RATED_POWER, default=options.get(CONF_METER_RATED_POWER, DEFAULT_METER_RATED_POWER)): vol.All(vol.Coerce(int), vol.Range(min=100)),
+        }
+    )
+
 async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
@@ -75,7 +132,7 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
         raise AddressesNotUnique
 
     try:
-        hub = Hub(hass, data[CONF_NAME], data[CONF_HOST], data[CONF_PORT], data[CONF_INVERTER_UNIT_ID], meter_addresses, data[CONF_SCAN_INTERVAL])
+        hub = Hub(hass, data[CONF_NAME], data[CONF_HOST], data[CONF_PORT], data[CONF_INVERTER_UNIT_ID], meter_addresses, data[CONF_SCAN_INTERVAL], options={CONF_FRAMER: data.get(CONF_FRAMER, DEFAULT_FRAMER)})
 
         await hub.init_data()
     except Exception as e:
@@ -161,6 +218,34 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler()
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options of a Fronius system."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+        if user_input is not None:
+            try:
+                fleet_unit_ids = parse_unit_ids(user_input.get(CONF_FLEET_UNIT_IDS))
+            except ValueError:
+                errors[CONF_FLEET_UNIT_IDS] = "invalid_fleet_unit_ids"
+            else:
+                used = [self.config_entry.data.get(CONF_INVERTER_UNIT_ID), self.config_entry.data.get(CONF_METER_UNIT_ID)]
+                if any(unit_id in used for unit_id in fleet_unit_ids):
+                    errors[CONF_FLEET_UNIT_IDS] = "modbus_address_conflict"
+            if not errors:
+                return self.async_create_entry(data={**self.config_entry.options, **user_input})
+
+        return self.async_show_form(
+            step_id="init", data_schema=options_schema(self.config_entry.options, self.config_entry.data), errors=errors
+        )
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
@@ -12,6 +12,99 @@ DEFAULT_SCAN_INTERVAL = 10
 DEFAULT_PORT = 502
 DEFAULT_INVERTER_UNIT_ID = 1
 DEFAULT_METER_UNIT_ID = 200
+STORE_VERSION = 1
+ENERGY_STORE_SAVE_DELAY = 60
+ENERGY_INTEGRATION_MAX_GAP_CYCLES = 3
+SCHEDULE_UPDATE_INTERVAL = 30
+# battery calibration: seconds held at full charge, discharge floor and maximum duration of a phase
+DEFAULT_CALIBRATION_HOLD_TIME = 1800
+DEFAULT_CALIBRATION_FLOOR_SOC = 5
+CALIBRATION_PHASE_TIMEOUT = 12 * 3600
+REGISTER_CACHE_TTL_CYCLES = 2
+FAST_POLL_INTERVAL = 1
+# share of the scan interval the reads of one update may take
+CYCLE_BUDGET_FRACTION = 0.9
+# seconds without requests after which the connection supervisor reads a register
+KEEPALIVE_INTERVAL = 30
+# seconds between the reads of the inverter blocks while the inverter is asleep
+SLEEP_PROBE_INTERVAL = 300
+# hubs of the domain updating at the same time
+MAX_CONCURRENT_UPDATES = 2
+EVENT_GRID_STATUS_CHANGED = f'{DOMAIN}_grid_status_changed'
+EVENT_INVERTER_EVENT = f'{DOMAIN}_inverter_event'
+
+CONF_FRAMER = 'framer'
+CONF_TCP_KEEPALIVE = 'tcp_keepalive'
+CONF_TCP_NODELAY = 'tcp_nodelay'
+DEFAULT_FRAMER = 'socket'
+DEFAULT_TCP_KEEPALIVE = False
+DEFAULT_TCP_NODELAY = True
+FRAMERS = {
+    'socket': 'Modbus TCP',
+    'rtu': 'RTU over TCP',
+}
+
+CONF_EXPORT_CONTROL = 'export_control'
+CONF_EXPORT_CONTROL_TARGET = 'export_control_target'
+CONF_EXPORT_CONTROL_KP = 'export_control_kp'
+CONF_EXPORT_CONTROL_KI = 'export_control_ki'
+CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL = 'export_control_min_write_interval'
+DEFAULT_EXPORT_CONTROL_TARGET = 0
+DEFAULT_EXPORT_CONTROL_KP = 0.5
+DEFAULT_EXPORT_CONTROL_KI = 0.2
+DEFAULT_EXPORT_CONTROL_MIN_WRITE_INTERVAL = 5
+
+# min, max and mean of the fast samples of the power values
+CONF_FAST_STATISTICS = 'fast_statistics'
+# the powers of the integrated energy sensors are sampled every second instead of every update
+CONF_FAST_ENERGY = 'fast_energy'
+# OpenMetrics exporter at /api/fronius_modbus/metrics
+CONF_METRICS = 'metrics'
+
+# sensor states are only written on a change beyond the deadband or after the heartbeat
+CONF_SIGNIFICANT_CHANGE = 'significant_change'
+CONF_STATE_HEARTBEAT = 'state_heartbeat'
+DEFAULT_SIGNIFICANT_CHANGE = True
+DEFAULT_STATE_HEARTBEAT = 300
+# only the meter and the storage are read every update while the inverter is asleep
+CONF_SLEEP_POLLING = 'sleep_polling'
+DEFAULT_SLEEP_POLLING = True
+# maximum power through the meter in W, bounds the increase of its energy counters
+CONF_METER_RATED_POWER = 'meter_rated_power'
+DEFAULT_METER_RATED_POWER = 50000
+# data key or device class -> (absolute deadband, relative deadband to the last written value).
+# A change is significant when it reaches both bands, None means no band. Keys take precedence,
+# sensors without an entry write every update.
+SIGNIFICANT_CHANGE_DEADBANDS = {
+    SensorDeviceClass.POWER: (10, 0.01),
+    SensorDeviceClass.VOLTAGE: (0.5, None),
+    SensorDeviceClass.CURRENT: (0.05, None),
+    SensorDeviceClass.FREQUENCY: (0.02, None),
+    SensorDeviceClass.TEMPERATURE: (0.5, None),
+    SensorDeviceClass.BATTERY: (1, None),
+    'mppt1_voltage': (1, None),
+    'mppt2_voltage': (1, None),
+}
+
+# resolution of storage control changes made outside of the integration
+CONF_STORAGE_CONTROL_POLICY = 'storage_control_policy'
+DEFAULT_STORAGE_CONTROL_POLICY = 'adopt'
+STORAGE_CONTROL_POLICIES = {
+    'adopt': 'Adopt external changes',
+    'reassert': 'Reassert the mode set in Home Assistant',
+}
+
+# further inverter unit ids behind the same gateway, e.g. '2,3'
+CONF_FLEET_UNIT_IDS = 'fleet_unit_ids'
+DEFAULT_FLEET_UNIT_IDS = ''
+MAX_FLEET_INVERTERS = 10
+ATTR_CONFIG_ENTRY_ID = 'config_entry_id'
+SERVICE_SET_BATTERY_SCHEDULE = 'set_battery_schedule'
+SERVICE_CLEAR_BATTERY_SCHEDULE = 'clear_battery_schedule'
+SERVICE_START_BATTERY_CALIBRATION = 'start_battery_calibration'
+SERVICE_CANCEL_BATTERY_CALIBRATION = 'cancel_battery_calibration'
+SERVICE_READ_REGISTERS = 'read_registers'
+SERVICE_WRITE_REGISTERS = 'write_registers'
 CONF_INVERTER_UNIT_ID = 'inverter_modbus_unit_id'
 CONF_METER_UNIT_ID = 'meter_modbus_unit_id'
 ATTR_MANUFACTURER = 'Fronius'
@@ -27,7 +120,6 @@ STORAGE_EXT_CONTROL_MODE = {
     5: 'Discharge to Grid',
     6: 'Block Discharging',
     7: 'Block Charging',
-#    8: 'Calibrate',
 }
 
 STORAGE_SELECT_TYPES = [
@@ -66,6 +158,7 @@ INVERTER_SENSOR_TYPES = {
     'mppt1_lfte': ['MPPT1 lifetime energy', 'mppt1_lfte', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:solar-panel', None],
     'mppt2_lfte': ['MPPT2 lifetime energy', 'mppt2_lfte', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:solar-panel', None],
     'load': ['Load', 'load', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'pv_energy': ['PV energy', 'pv_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:solar-power', None],
     'pv_connection': ['PV connection', 'pv_connection', None, None, None, None, EntityCategory.DIAGNOSTIC],
     'ecp_connection': ['Electrical connection', 'ecp_connection', None, None, None, None, EntityCategory.DIAGNOSTIC],
     #'status': ['Status Base', 'status', None, None, None, None, None],
@@ -79,6 +172,10 @@ INVERTER_SENSOR_TYPES = {
     'events2': ['Events', 'events2', None, None, None, None, EntityCategory.DIAGNOSTIC],    
 
     'grid_status': ['Grid status', 'grid_status', None, None, None, None, EntityCategory.DIAGNOSTIC],
+    'connection': ['Modbus connection', 'connection', None, None, None, 'mdi:lan-connect', EntityCategory.DIAGNOSTIC],
+    'reconnects': ['Modbus reconnects', 'reconnects', None, SensorStateClass.TOTAL_INCREASING, None, 'mdi:lan-pending', EntityCategory.DIAGNOSTIC],
+    'connected_since': ['Modbus connected since', 'connected_since', SensorDeviceClass.TIMESTAMP, None, None, None, EntityCategory.DIAGNOSTIC],
+    'polling': ['Polling', 'polling', None, None, None, 'mdi:sleep', EntityCategory.DIAGNOSTIC],
 
     'Conn': ['Connection control', 'Conn', None, None, None, None, EntityCategory.DIAGNOSTIC],
     'WMaxLim_Ena': ['Throttle control', 'WMaxLim_Ena', None, None, None, None, EntityCategory.DIAGNOSTIC],
@@ -106,8 +203,19 @@ INVERTER_STORAGE_SENSOR_TYPES = {
     'storage_power': ['Storage power', 'storage_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:home-battery', None],
     'mppt3_lfte': ['Storage charging lifetime energy', 'mppt3_lfte', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:home-battery', None],
     'mppt4_lfte': ['Storage discharging lifetime energy', 'mppt4_lfte', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:home-battery', None],
+    'storage_charge_energy': ['Storage charging energy', 'storage_charge_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:home-battery', None],
+    'storage_discharge_energy': ['Storage discharging energy', 'storage_discharge_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:home-battery', None],
 }
 
+INVERTER_METER_SENSOR_TYPES = {
+    'grid_import_power': ['Grid import power', 'grid_import_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:transmission-tower-import', None],
+    'grid_export_power': ['Grid export power', 'grid_export_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:transmission-tower-export', None],
+    'self_consumption': ['Self consumption', 'self_consumption', None, SensorStateClass.MEASUREMENT, '%', 'mdi:home-percent', None],
+    'autarky': ['Autarky', 'autarky', None, SensorStateClass.MEASUREMENT, '%', 'mdi:home-percent', None],
+    'load_energy': ['Load energy', 'load_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:lightning-bolt', None],
+    'grid_import_energy': ['Grid import energy', 'grid_import_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:transmission-tower-import', None],
+    'grid_export_energy': ['Grid export energy', 'grid_export_energy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:transmission-tower-export', None],
+}
 
 METER_SENSOR_TYPES = {
     'power': ['Power', 'power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
@@ -121,6 +229,37 @@ METER_SENSOR_TYPES = {
     'unit_id': ['Modbus ID', 'unit_id', None, None, None, None, EntityCategory.DIAGNOSTIC],
 }
 
+INVERTER_STATISTICS_SENSOR_TYPES = {
+    'acpower_min': ['AC power min', 'acpower_min', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'acpower_max': ['AC power max', 'acpower_max', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'acpower_mean': ['AC power mean', 'acpower_mean', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+}
+
+METER_STATISTICS_SENSOR_TYPES = {
+    'power_min': ['Power min', 'power_min', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'power_max': ['Power max', 'power_max', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'power_mean': ['Power mean', 'power_mean', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+}
+
+FLEET_INVERTER_SENSOR_TYPES = {
+    'acpower': ['AC power', 'acpower', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'acenergy': ['AC energy', 'acenergy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:lightning-bolt', None],
+    'pv_power': ['PV power', 'pv_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:solar-power', None],
+    'mppt1_power': ['MPPT1 power', 'mppt1_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:solar-power', None],
+    'mppt2_power': ['MPPT2 power', 'mppt2_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:solar-power', None],
+    'line_frequency': ['Line frequency', 'line_frequency', SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT, 'Hz', None, None],
+    'tempcab': ['Temperature', 'tempcab', SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, '°C', 'mdi:thermometer', None],
+    'statusvendor': ['Status', 'statusvendor', None, None, None, None, EntityCategory.DIAGNOSTIC],
+    'events2': ['Events', 'events2', None, None, None, None, EntityCategory.DIAGNOSTIC],
+    'unit_id': ['Modbus ID', 'unit_id', None, None, None, None, EntityCategory.DIAGNOSTIC],
+}
+
+SITE_SENSOR_TYPES = {
+    'site_acpower': ['AC power', 'site_acpower', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:lightning-bolt', None],
+    'site_pv_power': ['PV power', 'site_pv_power', SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', 'mdi:solar-power', None],
+    'site_acenergy': ['AC energy', 'site_acenergy', SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, 'Wh', 'mdi:lightning-bolt', None],
+}
+
 STORAGE_SENSOR_TYPES = {
     'control_mode': ['Core storage control mode', 'control_mode', None, None, None, None, EntityCategory.DIAGNOSTIC],
     'charge_status': ['Charge status', 'charge_status', None, None, None, None, None, EntityCategory.DIAGNOSTIC],
@@ -130,6 +269,9 @@ STORAGE_SENSOR_TYPES = {
     'discharging_power': ['Discharging power', 'discharging_power',  None, None, '%', 'mdi:gauge', EntityCategory.DIAGNOSTIC],
     'minimum_reserve': ['Minimum reserve', 'minimum_reserve',  None, None, '%', 'mdi:gauge', None],
     'grid_charging': ['Grid charging', 'grid_charging',  None, None, None, None, EntityCategory.DIAGNOSTIC],
+    'storage_control_state': ['Storage control state', 'storage_control_state',  None, None, None, None, EntityCategory.DIAGNOSTIC],
+    'calibration_phase': ['Calibration phase', 'calibration_phase',  None, None, None, 'mdi:battery-sync', EntityCategory.DIAGNOSTIC],
+    'calibration_progress': ['Calibration progress', 'calibration_progress',  None, SensorStateClass.MEASUREMENT, '%', 'mdi:battery-sync', EntityCategory.DIAGNOSTIC],
     'WHRtg': ['Capacity', 'WHRtg',  SensorDeviceClass.ENERGY, SensorStateClass.MEASUREMENT, 'Wh', None, EntityCategory.DIAGNOSTIC],
     'MaxChaRte': ['Maximum charge rate', 'MaxChaRte',  SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', None, EntityCategory.DIAGNOSTIC],
     'MaxDisChaRte': ['Maximum discharge rate', 'MaxDisChaRte',  SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, 'W', None, EntityCategory.DIAGNOSTIC],
@@ -0,0 +1,97 @@
+"""Plausibility filter for lifetime energy counters."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CounterGuard:
+    """Ensure lifetime energy counters are plausible before they are published.
+
+    A new counter value is accepted when its increase since the last accepted value
+    is no more than the energy the device could have produced at its rated power in
+    the elapsed time. Implausible values are replaced by the last accepted value.
+    Because the bound grows with the time since the last accepted value, a counter
+    that was frozen is accepted again once it is plausible.
+
+    A smaller value is only accepted as a counter reset after it has been confirmed
+    by reset_confirmations consecutive plausible reads. A missing value is replaced by
+    the last accepted value as well, only the first one in a row is logged as a warning.
+
+    The last accepted values and their timestamps are kept in state, so they can be
+    persisted and the first read after a restart is checked as well.
+    """
+
+    def __init__(self, margin=1.5, tolerance=100, reset_confirmations=3):
+        self._margin = margin
+        self._tolerance = tolerance
+        self._reset_confirmations = reset_confirmations
+        self._counters = {}
+        self._reset_candidates = {}
+        self._missing = set()
+
+    @property
+    def state(self) -> dict:
+        """Last accepted values in a form suitable for storage."""
+        return {'counters': {key: dict(counter) for key, counter in self._counters.items()}}
+
+    def restore(self, state):
+        counters = (state or {}).get('counters', {})
+        for key, counter in counters.items():
+            if isinstance(counter.get('value'), (int, float)) and isinstance(counter.get('time'), (int, float)):
+                self._counters[key] = {'value': counter['value'], 'time': counter['time']}
+        _LOGGER.debug(f'restored counters {self._counters}')
+
+    def max_increase(self, rated_power, elapsed):
+        return rated_power * self._margin * max(elapsed, 0) / 3600 + self._tolerance
+
+    def check(self, key, value, rated_power, now):
+        """Return value if it is plausible, otherwise the last accepted value."""
+        counter = self._counters.get(key)
+
+        if value is None:
+            if counter is None:
+                return None
+            if key in self._missing:
+                _LOGGER.debug(f"Received no {key}. Using previous plausible value {counter['value']}")
+            else:
+                self._missing.add(key)
+                _LOGGER.warning(f"Received no {key}. Using previous plausible value {counter['value']} until it is read again")
+            return counter['value']
+        self._missing.discard(key)
+
+        if counter is None:
+            _LOGGER.info(f"Initializing {key}={value}")
+            return self._accept(key, value, now)
+
+        last_value = counter['value']
+        max_increase = self.max_increase(rated_power, now - counter['time'])
+
+        if value < last_value:
+            if self._is_confirmed_reset(key, value, rated_power, now):
+                _LOGGER.warning(f"Counter reset of {key} detected. Previous value {last_value} new value {value}")
+                return self._accept(key, value, now)
+            _LOGGER.warning(f"Received implausible (too small) {key}={value} < previous plausible value {last_value}")
+            return last_value
+
+        self._reset_candidates.pop(key, None)
+        if value > last_value + max_increase:
+            _LOGGER.warning(f"Received implausible (too large) {key}={value} > previous plausible value {last_value} + {round(max_increase)}")
+            return last_value
+
+        return self._accept(key, value, now)
+
+    def _accept(self, key, value, now):
+        self._counters[key] = {'value': value, 'time': now}
+        self._reset_candidates.pop(key, None)
+        return value
+
+    def _is_confirmed_reset(self, key, value, rated_power, now):
+        candidate = self._reset_candidates.get(key)
+        if (candidate is None
+            or value < candidate['value']
+            or value > candidate['value'] + self.max_increase(rated_power, now - candidate['time'])):
+            candidate = {'value': value, 'time': now, 'count': 0}
+        candidate = {'value': value, 'time': now, 'count': candidate['count'] + 1}
+        self._reset_candidates[key] = candidate
+        return candidate['count'] >= self._reset_confirmations
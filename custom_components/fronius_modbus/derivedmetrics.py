@@ -0,0 +1,108 @@
+"""Derived metrics computed from one snapshot of decoded data."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DerivedMetric:
+    """A value calculated from other keys of the data dict.
+
+    defaults holds values for inputs that may be missing, e.g. points the device does not implement.
+    """
+
+    def __init__(self, key, inputs, formula, defaults=None):
+        self.key = key
+        self.inputs = tuple(inputs)
+        self.formula = formula
+        self.defaults = defaults or {}
+
+
+class DerivedMetricsEngine:
+    """Evaluates derived metrics in dependency order.
+
+    Metrics are sorted once so that every metric is evaluated after the metrics it
+    depends on. On each update only metrics whose input values changed since the
+    previous update are recalculated. Metrics with an input key that is not present
+    in the data at all (e.g. no meter configured) are skipped.
+    """
+
+    def __init__(self, metrics):
+        self._metrics = self._sort(metrics)
+        self._last_inputs = {}
+
+    @staticmethod
+    def _sort(metrics):
+        by_key = {metric.key: metric for metric in metrics}
+        ordered = []
+        visiting = set()
+        done = set()
+
+        def visit(metric):
+            if metric.key in done:
+                return
+            if metric.key in visiting:
+                raise ValueError(f'Circular dependency in derived metric {metric.key}')
+            visiting.add(metric.key)
+            for key in metric.inputs:
+                if key in by_key:
+                    visit(by_key[key])
+            visiting.discard(metric.key)
+            done.add(metric.key)
+            ordered.append(metric)
+
+        for metric in metrics:
+            visit(metric)
+        return ordered
+
+    @property
+    def keys(self):
+        return [metric.key for metric in self._metrics]
+
+    def update(self, data) -> list:
+        """Recalculate metrics with changed inputs. Returns the updated keys."""
+        updated = []
+        for metric in self._metrics:
+            if any(key not in data and key not in metric.defaults for key in metric.inputs):
+                continue
+            values = tuple(data.get(key, metric.defaults.get(key)) for key in metric.inputs)
+            if metric.key in data and self._last_inputs.get(metric.key) == values:
+                continue
+            self._last_inputs[metric.key] = values
+            try:
+                data[metric.key] = metric.formula(*values)
+            except (TypeError, ValueError, ZeroDivisionError) as e:
+                _LOGGER.debug(f'cannot calculate {metric.key} from {values}: {e}')
+                data[metric.key] = None
+            updated.append(metric.key)
+        return updated
+
+
+def is_numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def numeric_inputs(formula):
+    """Return None instead of calling the formula when an input is not numeric."""
+    def wrapper(*values):
+        if not all(is_numeric(value) for value in values):
+            return None
+        return formula(*values)
+    return wrapper
+
+
+def percentage(part, total):
+    if total <= 0:
+        return None
+    return round(min(100.0, max(0.0, part / total * 100)), 1)
+
+
+DERIVED_METRICS = [
+    DerivedMetric('pv_power', ['mppt1_power', 'mppt2_power'], numeric_inputs(lambda mppt1, mppt2: mppt1 + mppt2), defaults={'mppt2_power': 0}),
+    DerivedMetric('storage_power', ['mppt3_power', 'mppt4_power'], numeric_inputs(lambda charge, discharge: discharge - charge)),
+    DerivedMetric('load', ['m1_power', 'acpower'], numeric_inputs(lambda meter, inverter: round(meter + inverter, 2))),
+    DerivedMetric('grid_import_power', ['m1_power'], numeric_inputs(lambda meter: max(meter, 0))),
+    DerivedMetric('grid_export_power', ['m1_power'], numeric_inputs(lambda meter: max(-meter, 0))),
+    DerivedMetric('self_consumption', ['acpower', 'grid_export_power'], numeric_inputs(lambda acpower, export: percentage(acpower - export, acpower))),
+    DerivedMetric('autarky', ['load', 'grid_import_power'], numeric_inputs(lambda load, grid_import: percentage(load - grid_import, load))),
+]
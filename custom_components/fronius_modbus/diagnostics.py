@@ -0,0 +1,62 @@
+"""Diagnostics support for Fronius Modbus."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from . import HubConfigEntry
+
+TO_REDACT = {CONF_HOST}
+
+
+def redact_serials(data: dict) -> dict:
+    return {key: '**REDACTED**' if key.endswith('serial') else value for key, value in data.items()}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: HubConfigEntry) -> dict[str, Any]:
+    """Diagnostics of a config entry from the data of the last update, without Modbus requests."""
+    hub = entry.runtime_data
+    coordinator = hub.coordinator
+
+    return {
+        'config': {
+            'data': async_redact_data(dict(entry.data), TO_REDACT),
+            'options': async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        'capabilities': {
+            'mppt_configured': hub.mppt_configured,
+            'storage_configured': hub.storage_configured,
+            'meter_configured': hub.meter_configured,
+            'not_implemented': sorted(key for key, implemented in hub.capabilities.items() if not implemented),
+        },
+        'connection': {
+            'connected': hub.connected,
+            'last_update_success': coordinator.last_update_success,
+            'last_exception': repr(coordinator.last_exception) if coordinator.last_exception else None,
+            'updates': hub.snapshot_version,
+            'request_timeouts': {
+                str(unit_id): estimate for (_, unit_id), estimate in hub.request_timeouts.items()
+            },
+        },
+        'blocks': {
+            block: {
+                **timing,
+                'errors': hub.read_errors.get(block, 0),
+            }
+            for block, timing in hub.block_timings.items()
+        },
+        'registers': {
+            block: [
+                {'unit_id': unit_id, 'address': address, 'registers': registers}
+                for unit_id, address, registers in images
+            ]
+            for block, images in hub.register_images().items()
+        },
+        'scale_factors': dict(hub.scale_factors),
+        'data': redact_serials(hub.data),
+        'attributes': dict(hub.attributes),
+    }
@@ -0,0 +1,100 @@
+"""Energy calculated by integrating sampled power values."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EnergyIntegrator:
+    """Trapezoidal integration of power samples (W) into energy totals (Wh).
+
+    Each energy key is fed by one power key. An interval is only integrated when
+    both of its samples are valid and not further apart than max_gap seconds,
+    otherwise integration restarts at the next sample. Negative power values are
+    treated as 0 so the totals only ever increase.
+    """
+
+    def __init__(self, sources, max_gap):
+        self._sources = sources
+        self._max_gap = max_gap
+        self._totals = {key: 0.0 for key in sources}
+        self._last_samples = {}
+
+    @property
+    def state(self) -> dict:
+        """Totals in a form suitable for storage."""
+        return {'totals': dict(self._totals)}
+
+    def restore(self, state):
+        totals = (state or {}).get('totals', {})
+        for key, value in totals.items():
+            if key in self._totals and isinstance(value, (int, float)):
+                self._totals[key] = float(value)
+        _LOGGER.debug(f'restored energy totals {self._totals}')
+
+    def add_samples(self, data, timestamp):
+        """Integrate the power values in data sampled at timestamp (seconds, monotonic).
+
+        Power keys that are not in data were not sampled and keep their last sample.
+        """
+        for energy_key, power_key in self._sources.items():
+            if power_key not in data:
+                continue
+            power = data.get(power_key)
+            if not isinstance(power, (int, float)) or isinstance(power, bool):
+                self._last_samples.pop(energy_key, None)
+                continue
+            power = max(power, 0)
+
+            last = self._last_samples.get(energy_key)
+            if last is not None:
+                last_timestamp, last_power = last
+                elapsed = timestamp - last_timestamp
+                if elapsed <= 0:
+                    continue
+                if elapsed <= self._max_gap:
+                    self._totals[energy_key] += (last_power + power) / 2 * elapsed / 3600
+                else:
+                    _LOGGER.debug(f'gap of {elapsed:.1f}s in {power_key} samples, not integrated')
+            self._last_samples[energy_key] = (timestamp, power)
+
+    def update(self, data):
+        """Write the energy totals for all available power keys to data."""
+        for energy_key, power_key in self._sources.items():
+            if power_key in data:
+                data[energy_key] = round(self._totals[energy_key], 2)
+
+
+INTEGRATED_ENERGY_SOURCES = {
+    'pv_energy': 'pv_power',
+    'storage_charge_energy': 'mppt3_power',
+    'storage_discharge_energy': 'mppt4_power',
+    'grid_import_energy': 'grid_import_power',
+    'grid_export_energy': 'grid_export_power',
+    'load_energy': 'load',
+}
+
+
+def _is_numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def fast_energy_powers(samples) -> dict:
+    """Power keys of INTEGRATED_ENERGY_SOURCES calculated from fast samples like the derived metrics.
+
+    Only the powers that the sampled keys allow to calculate are returned.
+    """
+    powers = {}
+    m_power = samples.get('m1_power')
+    if _is_numeric(m_power):
+        powers['grid_import_power'] = max(m_power, 0)
+        powers['grid_export_power'] = max(-m_power, 0)
+        if _is_numeric(samples.get('acpower')):
+            powers['load'] = round(m_power + samples['acpower'], 2)
+    if 'mppt1_power' in samples:
+        mppt1_power, mppt2_power = samples['mppt1_power'], samples.get('mppt2_power', 0)
+        powers['pv_power'] = mppt1_power + mppt2_power if _is_numeric(mppt1_power) and _is_numeric(mppt2_power) else None
+    for key in ['mppt3_power', 'mppt4_power']:
+        if key in samples:
+            powers[key] = samples[key]
+    return powers
@@ -0,0 +1,93 @@
+"""Closed loop control of the inverter export limit."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Export limit rate register: 10000 = 100% of WMax, minimum 1%
+EXPORT_LIMIT_RATE_MIN = 100
+EXPORT_LIMIT_RATE_MAX = 10000
+
+
+class ExportLimitController:
+    """PI controller keeping the grid power at a target by limiting the inverter power.
+
+    grid_power is the meter power (positive import, negative export). target is the
+    grid power to keep, e.g. 0 for zero export or -3000 to allow 3 kW of export.
+    The controller uses the velocity form, so the output is simply clamped to the
+    inverter power range without integrator windup. Errors within the deadband are
+    ignored, the output changes at most max_step W per second and a new rate is only
+    returned when it differs by write_hysteresis from the last written rate and
+    min_write_interval seconds have passed. A rate counts as written once written()
+    confirms it, so a write that did not happen is retried with the next sample.
+    """
+
+    def __init__(self, target, kp, ki, min_write_interval, deadband=50, max_step=1000, write_hysteresis=50):
+        self._target = target
+        self._kp = kp
+        self._ki = ki
+        self._min_write_interval = min_write_interval
+        self._deadband = deadband
+        self._max_step = max_step
+        self._write_hysteresis = write_hysteresis
+
+        self._output = None
+        self._last_error = 0
+        self._last_time = None
+        self._last_rate = None
+        self._last_write_time = None
+
+    @property
+    def output(self):
+        """Inverter power limit in W."""
+        return self._output
+
+    def reset(self, rate=None, max_power=None):
+        """Start from the current export limit rate, or unlimited if it is unknown."""
+        if rate is not None and max_power:
+            self._output = rate / EXPORT_LIMIT_RATE_MAX * max_power
+        else:
+            self._output = None
+        self._last_rate = rate
+        self._last_error = 0
+        self._last_time = None
+
+    def update(self, grid_power, max_power, now):
+        """Calculate the power limit for a new grid power sample.
+
+        Returns the export limit rate register value to write, or None if nothing should be written.
+        Call written() once the rate is written.
+        """
+        if grid_power is None or not max_power:
+            return None
+        if self._output is None:
+            self._output = max_power
+
+        error = grid_power - self._target
+        if abs(error) <= self._deadband:
+            error = 0
+
+        if self._last_time is not None:
+            elapsed = now - self._last_time
+            step = self._kp * (error - self._last_error) + self._ki * error * elapsed
+            max_step = self._max_step * elapsed
+            step = min(max(step, max_step * -1), max_step)
+            min_output = max_power * EXPORT_LIMIT_RATE_MIN / EXPORT_LIMIT_RATE_MAX
+            self._output = min(max(self._output + step, min_output), max_power)
+        self._last_error = error
+        self._last_time = now
+
+        rate = round(self._output / max_power * EXPORT_LIMIT_RATE_MAX)
+        rate = min(max(rate, EXPORT_LIMIT_RATE_MIN), EXPORT_LIMIT_RATE_MAX)
+
+        if self._last_rate is not None:
+            if abs(rate - self._last_rate) < self._write_hysteresis:
+                return None
+            if self._last_write_time is not None and now - self._last_write_time < self._min_write_interval:
+                return None
+        return rate
+
+    def written(self, rate, now):
+        """Confirm that rate was written to the export limit rate register at now."""
+        self._last_rate = rate
+        self._last_write_time = now
@@ -2,13 +2,20 @@
 
 """Extended Modbus Class"""
 
+import contextlib
+import contextvars
+import functools
 import logging
 import operator
 #from datetime import timedelta, datetime
 from typing import Literal
 import struct
 import asyncio
+import socket
+import sys
+import time
 
+from pymodbus import FramerType
 from pymodbus.client import AsyncModbusTcpClient
 try:
     # For newer pymodbus versions (3.9.x+)
@@ -19,23 +26,263 @@ except ImportError:
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 from pymodbus import ExceptionResponse
 
+# register block of the coordinator read running in the current task, see ExtModbusClient.reading_block
+_current_block = contextvars.ContextVar('fronius_modbus_block', default=None)
+
 _LOGGER = logging.getLogger(__name__)
 
+class RttEstimator:
+    """Request timeouts from a smoothed round trip time per key, as TCP does (RFC 6298).
+
+    Each measured round trip updates the smoothed rtt (srtt) and its variation
+    (rttvar). The timeout is srtt + 4 * rttvar, clamped to min_timeout and
+    max_timeout. A timed out request doubles the timeout of its key until the next
+    successful measurement. Keys without measurements use initial_timeout.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial_timeout=2, min_timeout=0.2, max_timeout=10):
+        self._initial_timeout = initial_timeout
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        # key -> {'srtt': s, 'rttvar': s, 'timeout': s}
+        self._estimates = {}
+
+    @property
+    def min_timeout(self):
+        return self._min_timeout
+
+    @property
+    def estimates(self) -> dict:
+        return {key: dict(estimate) for key, estimate in self._estimates.items()}
+
+    def _clamp(self, timeout):
+        return min(max(timeout, self._min_timeout), self._max_timeout)
+
+    def timeout(self, key):
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            return self._clamp(self._initial_timeout)
+        return estimate['timeout']
+
+    def srtt(self, key):
+        estimate = self._estimates.get(key)
+        if estimate is None or estimate['srtt'] is None:
+            return None
+        return estimate['srtt']
+
+    def add_sample(self, key, rtt):
+        """Update the estimate with a measured round trip time in seconds."""
+        estimate = self._estimates.get(key)
+        if estimate is None or estimate['srtt'] is None:
+            srtt = rtt
+            rttvar = rtt / 2
+        else:
+            rttvar = (1 - self.BETA) * estimate['rttvar'] + self.BETA * abs(estimate['srtt'] - rtt)
+            srtt = (1 - self.ALPHA) * estimate['srtt'] + self.ALPHA * rtt
+        self._estimates[key] = {
+            'srtt': srtt,
+            'rttvar': rttvar,
+            'timeout': self._clamp(srtt + self.K * rttvar),
+        }
+
+    def backoff(self, key):
+        """Double the timeout after a request of key timed out."""
+        estimate = self._estimates.setdefault(key, {'srtt': None, 'rttvar': None, 'timeout': self.timeout(key)})
+        estimate['timeout'] = self._clamp(estimate['timeout'] * 2)
+        _LOGGER.debug(f"Request timeout of {key} increased to {estimate['timeout']:.2f}s")
+
+
+class BitfieldDecoder:
+    """Decoding of bitmasks into the labels of the set bits.
+
+    The set bits of every byte value are precomputed into per byte lookup tables, and
+    the results are memoized on the raw value in bounded LRU caches, as bitfields
+    such as events and controls rarely change between reads.
+    """
+
+    CACHE_SIZE = 64
+
+    def __init__(self, labels, bits=16):
+        self.labels = tuple(labels)
+        self.bits = bits
+        self._tables = tuple(
+            tuple(
+                tuple(byte * 8 + bit for bit in range(8) if value & (1 << bit) and byte * 8 + bit < bits)
+                for value in range(256)
+            )
+            for byte in range((bits + 7) // 8)
+        )
+        self.active_bits = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._active_bits)
+        self.strings = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._strings)
+        self.string = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._string)
+
+    def label(self, bit):
+        if bit < len(self.labels):
+            return self.labels[bit]
+        return f'bit {bit} undefined'
+
+    def _active_bits(self, bitmask) -> tuple:
+        """Numbers of the set bits, lowest first."""
+        bits = ()
+        for table in self._tables:
+            bits += table[bitmask & 0xFF]
+            bitmask >>= 8
+        return bits
+
+    def _strings(self, bitmask) -> tuple:
+        return tuple(self.label(bit) for bit in self.active_bits(bitmask))
+
+    def _string(self, bitmask, default='NA', max_length=255) -> str:
+        strings = self.strings(bitmask)
+        if len(strings):
+            return ','.join(strings)[:max_length]
+        return default
+
+
+@functools.lru_cache(maxsize=32)
+def bitfield_decoder(labels: tuple, bits=16) -> BitfieldDecoder:
+    """Shared decoder of a label list."""
+    return BitfieldDecoder(labels, bits)
+
+
+class EnumRegistry:
+    """Labels of enum points, such as status codes, by key.
+
+    The labels are interned once, so every cycle publishes the same string objects. The
+    label of a key is only looked up again when its raw code changes. Unknown codes map
+    to the shared UNKNOWN label instead of failing the read.
+    """
+
+    UNKNOWN = sys.intern('Unknown')
+
+    def __init__(self, enums: dict):
+        self._enums = {key: {code: sys.intern(label) for code, label in mapping.items()} for key, mapping in enums.items()}
+        # key -> (last raw code, its label)
+        self._last = {}
+
+    def label(self, key, raw, enum = None) -> str:
+        """Label of the raw code of key. enum is the enum of key if it differs from key, e.g. for prefixed keys."""
+        last = self._last.get(key)
+        if last is not None and last[0] == raw:
+            return last[1]
+        label = self._enums[enum or key].get(raw)
+        if label is None:
+            _LOGGER.warning(f'Unknown code {raw} of {key}')
+            label = self.UNKNOWN
+        self._last[key] = (raw, label)
+        return label
+
+
 class ExtModbusClient:
 
-    def __init__(self, host: str, port: int, unit_id: int, timeout: int, framer:str = None) -> None:
-        """Init Class"""
+    # resends by pymodbus after a request timed out
+    REQUEST_RETRIES = 1
+    # timeout of requests to a unit without round trip measurements
+    INITIAL_REQUEST_TIMEOUT = 2
+    # maximum number of holding registers of one read request
+    MAX_READ_COUNT = 125
+    # delays of the supervisor between failed connects, doubled from min to max
+    MIN_RECONNECT_DELAY = 1
+    MAX_RECONNECT_DELAY = 60
+    # register read by the supervisor to keep an idle connection open
+    KEEPALIVE_ADDRESS = 40000
+    # 'SunS' at the start of the SunSpec register map
+    SUNSPEC_MARKER = [0x5375, 0x6E53]
+    # reads of the not implemented value while the device is awake after which a point is not implemented
+    NOT_IMPLEMENTED_READS = 3
+    # SunSpec registers of points that are not implemented by the device, compared before decoding
+    NOT_IMPLEMENTED = {
+        AsyncModbusTcpClient.DATATYPE.INT16: [0x8000],
+        AsyncModbusTcpClient.DATATYPE.UINT16: [0xFFFF],
+        AsyncModbusTcpClient.DATATYPE.INT32: [0x8000, 0],
+        AsyncModbusTcpClient.DATATYPE.UINT32: [0xFFFF, 0xFFFF],
+        AsyncModbusTcpClient.DATATYPE.INT64: [0x8000, 0, 0, 0],
+        AsyncModbusTcpClient.DATATYPE.UINT64: [0xFFFF, 0xFFFF, 0xFFFF, 0xFFFF],
+    }
+
+    def __init__(self, host: str, port: int, unit_id: int, timeout: int, framer:str = None, register_cache_ttl: float = 0, tcp_keepalive: bool = False, tcp_nodelay: bool = True) -> None:
+        """Init Class
+
+        framer is 'socket' for Modbus TCP or 'rtu' for RTU over TCP, e.g. through a serial gateway.
+        timeout is the upper limit of the request timeouts, which adapt to the measured round trip times.
+        """
         self._host = host
         self._port = port
         self._unit_id = unit_id
         self.busy = False
+        # (unit_id, address) -> (value, time) from reads and acknowledged writes
+        self._register_cache = {}
+        self._register_cache_ttl = register_cache_ttl
+        self._tcp_keepalive = tcp_keepalive
+        self._tcp_nodelay = tcp_nodelay
+        self._timeout = timeout
+        self._rtt = RttEstimator(initial_timeout=min(self.INITIAL_REQUEST_TIMEOUT, timeout), max_timeout=timeout)
+        # serializes requests, so the timeout set for a request is not changed while it waits for pymodbus
+        self._request_lock = asyncio.Lock()
+        self._cycle_deadline = None
+        self._cycle_skipped = 0
+        # block -> {(unit_id, address): count} of its successful reads
+        self.block_reads = {}
+        # block -> number of its failed reads
+        self.read_errors = {}
+        # data key -> whether the device implements the point, see update_capability
+        self.capabilities = {}
+        # data key -> reads of the not implemented value while awake since the last valid value
+        self._not_implemented_reads = {}
+        # connection state owned by supervise(), reconnects are counted after the first connect
+        self._supervised = False
+        self._closed = False
+        self._connection_lost = asyncio.Event()
+        self._last_activity = time.monotonic()
+        self._inflight = set()
+        self._ever_connected = False
+        self.reconnects = 0
+        self.connected_since = None
+        # pymodbus does not reconnect by itself, reads reconnect inline unless supervised
         if not framer is None:
-            self._client = AsyncModbusTcpClient(host=host, port=port, framer=framer, timeout=timeout) 
+            self._client = AsyncModbusTcpClient(host=host, port=port, framer=FramerType(framer), timeout=timeout, retries=self.REQUEST_RETRIES, reconnect_delay=0, trace_connect=self._on_connection_change) 
+        else:
+            self._client = AsyncModbusTcpClient(host=host, port=port, timeout=timeout, retries=self.REQUEST_RETRIES, reconnect_delay=0, trace_connect=self._on_connection_change) 
+
+    def _on_connection_change(self, connected: bool) -> None:
+        if connected:
+            self._apply_socket_options()
+            if self._ever_connected:
+                self.reconnects += 1
+            self._ever_connected = True
+            self.connected_since = time.time()
+            self._last_activity = time.monotonic()
         else:
-            self._client = AsyncModbusTcpClient(host=host, port=port, timeout=timeout) 
+            self.connected_since = None
+            self._connection_lost.set()
+
+    def _apply_socket_options(self):
+        """Set TCP_NODELAY and keepalive on the socket of a new connection."""
+        transport = self._client.ctx.transport
+        sock = transport.get_extra_info('socket') if transport is not None else None
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if self._tcp_nodelay else 0)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1 if self._tcp_keepalive else 0)
+            if self._tcp_keepalive:
+                # not available on all platforms
+                for option, value in [('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3)]:
+                    if hasattr(socket, option):
+                        sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        except OSError as e:
+            _LOGGER.warning(f"Could not set socket options for {self._host}:{self._port}: {e}")
 
     def close(self):
-        """Disconnect client."""
+        """Disconnect client, cancel the requests in flight and stop reconnecting."""
+        self._closed = True
+        for request in list(self._inflight):
+            request.cancel()
+        self._connection_lost.set()
         self._client.close()
 
     async def connect(self, retries = 3):
@@ -54,15 +301,123 @@ class ExtModbusClient:
         return True
     
     async def _check_and_reconnect(self):
-        if not self._client.connected:
-            _LOGGER.warning("Modbus client is not connected, reconnecting...", exc_info=True)
-            return await self.connect()
-        return self._client.connected
+        """True if connected. Connects inline only while the connection is not supervised."""
+        if self._client.connected:
+            return True
+        if self._closed or self._supervised:
+            self._connection_lost.set()
+            return False
+        _LOGGER.warning(f"Modbus client is not connected to {self._host}:{self._port}, reconnecting")
+        return await self.connect()
+
+    async def supervise(self, keepalive_interval):
+        """Own the connection until close(): connect ahead of the reads, reconnect with
+        exponential backoff after a failed connect, and read a register when the connection
+        was idle for keepalive_interval seconds, so a dead connection is noticed and replaced
+        before the next update needs it."""
+        self._supervised = True
+        delay = self.MIN_RECONNECT_DELAY
+        try:
+            while not self._closed:
+                if not self._client.connected:
+                    try:
+                        await self._client.connect()
+                    except Exception as e:
+                        _LOGGER.debug(f"Connecting to {self._host}:{self._port} failed: {e}")
+                    if self._closed:
+                        break
+                    if self._client.connected:
+                        _LOGGER.debug(f"Connected to {self._host}:{self._port}")
+                        delay = self.MIN_RECONNECT_DELAY
+                        continue
+                    _LOGGER.debug(f"Not connected to {self._host}:{self._port}, next attempt in {delay} s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+                    continue
+
+                idle = time.monotonic() - self._last_activity
+                if idle >= keepalive_interval:
+                    if not await self._keepalive():
+                        _LOGGER.warning(f"Keepalive to {self._host}:{self._port} failed, reconnecting")
+                        self._client.close()
+                    continue
+
+                self._connection_lost.clear()
+                try:
+                    await asyncio.wait_for(self._connection_lost.wait(), keepalive_interval - idle)
+                except TimeoutError:
+                    pass
+        finally:
+            self._supervised = False
+
+    async def _keepalive(self) -> bool:
+        try:
+            response = await self._execute(self._unit_id, lambda: self._client.read_holding_registers(address=self.KEEPALIVE_ADDRESS, count=1, device_id=self._unit_id), budgeted=False)
+        except (ModbusIOException, ConnectionException) as e:
+            _LOGGER.debug(f"Keepalive to {self._host}:{self._port} failed: {e}")
+            return False
+        return response is not None and not response.isError()
 
     @property
     def connected(self) -> bool:
         return self._client.connected
 
+    @property
+    def request_timeouts(self) -> dict:
+        """Round trip estimates and request timeouts per (host, unit id)."""
+        return self._rtt.estimates
+
+    def start_cycle(self, budget):
+        """Reads are skipped when they do not fit in the remaining budget seconds."""
+        self._cycle_deadline = time.monotonic() + budget
+        self._cycle_skipped = 0
+
+    def end_cycle(self):
+        if self._cycle_skipped > 0:
+            _LOGGER.warning(f"Skipped {self._cycle_skipped} reads from {self._host}:{self._port}, they did not fit in the update interval")
+        self._cycle_deadline = None
+
+    async def _execute(self, unit_id, request, budgeted = True):
+        """Run request with a timeout from the round trip estimate of the unit.
+
+        Within a cycle the timeout is limited to the remaining budget. Budgeted
+        requests that do not fit in the remaining budget are not sent and None is returned.
+        """
+        key = (self._host, unit_id)
+        async with self._request_lock:
+            timeout = self._rtt.timeout(key)
+            if budgeted and self._cycle_deadline is not None:
+                remaining = self._cycle_deadline - time.monotonic()
+                if remaining < max(self._rtt.srtt(key) or 0, self._rtt.min_timeout):
+                    self._cycle_skipped += 1
+                    return None
+                timeout = min(timeout, remaining / (self.REQUEST_RETRIES + 1))
+
+            self._client.ctx.comm_params.timeout_connect = timeout
+            start = time.monotonic()
+            # a task, so close() can cancel it
+            task = asyncio.ensure_future(request())
+            self._inflight.add(task)
+            try:
+                response = await task
+            except ModbusIOException:
+                self._rtt.backoff(key)
+                raise
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if self._closed and (current is None or not current.cancelling()):
+                    raise ConnectionException(f"Connection to {self._host}:{self._port} closed")
+                raise
+            finally:
+                self._inflight.discard(task)
+                self._client.ctx.comm_params.timeout_connect = self._timeout
+            self._last_activity = time.monotonic()
+
+            # like Karn's algorithm, ignore the round trip time of resent requests
+            if getattr(response, 'retries', 0) == 0:
+                self._rtt.add_sample(key, time.monotonic() - start)
+            return response
+
     def validate(self, value, comparison, against):
         ops = {
             ">": operator.gt,
@@ -76,13 +431,42 @@ class ExtModbusClient:
             raise ValueError(f"Value {value} failed validation ({comparison}{against})")
         return value
 
-    async def read_holding_registers(self, unit_id, address, count, retries = 3):
-        """Read holding registers."""
-        await self._check_and_reconnect()
+    @contextlib.contextmanager
+    def reading_block(self, block):
+        """Record the reads of the current task in the block reads and read errors of block.
+
+        The block is kept in a context variable, so reads of other tasks running at the same
+        time, e.g. of the fast lane or a service, are not recorded in it.
+        """
+        token = _current_block.set(block)
+        try:
+            yield
+        finally:
+            _current_block.reset(token)
+
+    async def read_holding_registers(self, unit_id, address, count, retries = 3, budgeted = True):
+        """Read holding registers. Budgeted reads are skipped when they do not fit in the cycle budget."""
+        skipped = self._cycle_skipped
+        data = await self._read_holding_registers(unit_id, address, count, retries, budgeted)
+        block = _current_block.get()
+        if block is not None:
+            if data is not None:
+                self.block_reads.setdefault(block, {})[(unit_id, address)] = count
+            elif self._cycle_skipped == skipped:
+                self.read_errors[block] = self.read_errors.get(block, 0) + 1
+        return data
+
+    async def _read_holding_registers(self, unit_id, address, count, retries, budgeted):
+        if not await self._check_and_reconnect():
+            _LOGGER.debug(f'skip reading registers, not connected. address: {address} count: {count} unit id: {unit_id}')
+            return None
 
         for attempt in range(retries+1):
             try:
-                data = await self._client.read_holding_registers(address=address, count=count, device_id=unit_id)
+                data = await self._execute(unit_id, lambda: self._client.read_holding_registers(address=address, count=count, device_id=unit_id), budgeted=budgeted)
+                if data is None:
+                    _LOGGER.debug(f'skip reading registers, cycle budget exhausted. address: {address} count: {count} unit id: {unit_id}')
+                    return None
             except ModbusIOException as e:
                 _LOGGER.error(f'error reading registers. IO error. connected: {self._client.connected} address: {address} count: {count} unit id: {unit_id}')
                 return None
@@ -108,15 +492,55 @@ class ExtModbusClient:
             _LOGGER.error(f"error reading registers. retries: {attempt}/{retries} connected {self._client.connected} register: {address} count: {count} unit id: {unit_id} retries {retries} error: {data} ")
             return None
 
+        self.update_register_cache(unit_id, address, data.registers)
         return data
 
-    async def get_registers(self, unit_id, address, count, retries = 0):
-        data = await self.read_holding_registers(unit_id=unit_id, address=address, count=count)
+    def update_register_cache(self, unit_id, address, values):
+        now = time.monotonic()
+        for i, value in enumerate(values):
+            self._register_cache[(unit_id, address + i)] = (value, now)
+
+    def invalidate_register_cache(self, unit_id, address, count):
+        for i in range(count):
+            self._register_cache.pop((unit_id, address + i), None)
+
+    def get_cached_register(self, unit_id, address):
+        """Last read or written value of a register, None if unknown or older than the cache ttl."""
+        cached = self._register_cache.get((unit_id, address))
+        if cached is None:
+            return None
+        value, timestamp = cached
+        if time.monotonic() - timestamp > self._register_cache_ttl:
+            return None
+        return value
+
+    def register_images(self) -> dict:
+        """Last read values of the registers of every block as {block: [(unit_id, address, registers)]}."""
+        images = {}
+        for block, reads in self.block_reads.items():
+            images[block] = [
+                (unit_id, address, [self._register_cache.get((unit_id, address + i), (None, None))[0] for i in range(count)])
+                for (unit_id, address), count in sorted(reads.items())
+            ]
+        return images
+
+    def registers_unchanged(self, unit_id, address, payload) -> bool:
+        for i, value in enumerate(payload):
+            if self.get_cached_register(unit_id, address + i) != value:
+                return False
+        return True
+
+    async def get_registers(self, unit_id, address, count, retries = 0, budgeted = True):
+        skipped = self._cycle_skipped
+        data = await self.read_holding_registers(unit_id=unit_id, address=address, count=count, budgeted=budgeted)
+        if data is None and budgeted and self._cycle_skipped > skipped:
+            # not read because of the cycle budget, reported by end_cycle
+            return None
         if data is None or data.isError():
             if isinstance(data,ModbusIOException):
                 if retries < 1:
                     _LOGGER.debug(f"IO Error: {data}. Retrying...")
-                    return await self.get_registers(address=address, count=count, retries = retries + 1)
+                    return await self.get_registers(unit_id=unit_id, address=address, count=count, retries = retries + 1, budgeted = budgeted)
                 else:
                     _LOGGER.error(f"error reading register: {address} count: {count} unit id: {unit_id} error: {data} ")
             else:
@@ -124,23 +548,68 @@ class ExtModbusClient:
             return None
         return data.registers
 
-    async def write_registers(self, unit_id, address, payload):
-        """Write registers."""
-        await self._check_and_reconnect()
+    @classmethod
+    def plan_reads(cls, ranges):
+        """Merge overlapping and adjacent (unit_id, address, count) ranges into as few reads as possible.
+
+        Reads are limited to MAX_READ_COUNT registers.
+        """
+        merged = []
+        for unit_id, address, count in sorted(ranges):
+            if merged and merged[-1][0] == unit_id and address <= merged[-1][1] + merged[-1][2]:
+                _, start, length = merged[-1]
+                merged[-1] = (unit_id, start, max(start + length, address + count) - start)
+            else:
+                merged.append((unit_id, address, count))
+
+        reads = []
+        for unit_id, address, count in merged:
+            for offset in range(0, count, cls.MAX_READ_COUNT):
+                reads.append((unit_id, address + offset, min(cls.MAX_READ_COUNT, count - offset)))
+        return reads
+
+    async def read_ranges(self, ranges) -> dict:
+        """Read (unit_id, address, count) ranges outside of the cycle budget. Returns {(unit_id, address): value} of the registers read."""
+        registers = {}
+        for unit_id, address, count in self.plan_reads(ranges):
+            regs = await self.get_registers(unit_id=unit_id, address=address, count=count, budgeted=False)
+            if regs is None:
+                continue
+            for i, value in enumerate(regs):
+                registers[(unit_id, address + i)] = value
+        return registers
+
+    async def write_registers(self, unit_id, address, payload, skip_unchanged = True):
+        """Write registers.
+
+        When skip_unchanged is set and the registers are known to hold the payload already,
+        nothing is written and None is returned.
+        """
+        if skip_unchanged and self.registers_unchanged(unit_id, address, payload):
+            _LOGGER.debug(f"skip write registers, unchanged a: {address} p: {payload} unit_id: {unit_id}")
+            return None
+
+        if not await self._check_and_reconnect():
+            raise Exception(f'write_registers: no connection to {self._host}:{self._port}')
         #_LOGGER.debug(f"write registers a: {address} p: {payload} unit_id: {unit_id}")
 
         try:
-            result = await self._client.write_registers(address=address, values=payload, device_id=unit_id)
+            result = await self._execute(unit_id, lambda: self._client.write_registers(address=address, values=payload, device_id=unit_id), budgeted=False)
         except ModbusIOException as e:
+            self.invalidate_register_cache(unit_id, address, len(payload))
             raise Exception(f'write_registers: IO error {self._client.connected} {e.fcode} {e}')
         except ConnectionException as e:
+            self.invalidate_register_cache(unit_id, address, len(payload))
             raise Exception(f'write_registers: no connection {self._client.connected} {e} ')
         except Exception as e:
+            self.invalidate_register_cache(unit_id, address, len(payload))
             raise Exception(f'write_registers: unknown error {self._client.connected} {type(e)} {e} ')
 
         if result.isError():
+            self.invalidate_register_cache(unit_id, address, len(payload))
             raise Exception(f'write_registers: data error {self._client.connected} {type(result)} {result} ')
-    
+
+        self.update_register_cache(unit_id, address, payload)
         #_LOGGER.debug(f'write result {type(result)} {result}')
         return result
 
@@ -227,27 +696,97 @@ class ExtModbusClient:
           return 0
         return result
 
-    def bitmask_to_strings(self, bitmask, bitmask_list, bits=16):
-        strings = []
-        len_list = len(bitmask_list)
-        for bit in range(bits):
-            if bitmask & (1<<bit):
-                if bit < len_list: 
-                    value = bitmask_list[bit]
-                else:
-                    value = f'bit {bit} undefined'
-                strings.append(value)
-        return strings
+    def bitmask_to_strings(self, bitmask, bitmask_list, bits=16) -> tuple:
+        return bitfield_decoder(tuple(bitmask_list), bits).strings(bitmask)
 
     def bitmask_to_string(self, bitmask, bitmask_list, default='NA', max_length=255, bits=16):
-        strings = self.bitmask_to_strings(bitmask = bitmask, bitmask_list = bitmask_list, bits = bits)
-        return self.strings_to_string(strings=strings, default=default, max_length=max_length)
+        return bitfield_decoder(tuple(bitmask_list), bits).string(bitmask, default, max_length)
     
     def strings_to_string(self, strings, default='NA', max_length=255):
         if len(strings):
             return ','.join(strings)[:max_length]
         return default
 
+    async def read_model_chain(self, unit_id, address = 40000, max_models = 64) -> dict:
+        """Walk the SunSpec model chain of a unit.
+
+        Returns {model id: (address, length)} of the model data, empty if there is no SunSpec marker at address.
+        """
+        regs = await self.get_registers(unit_id=unit_id, address=address, count=2)
+        if regs != self.SUNSPEC_MARKER:
+            _LOGGER.debug(f'no SunSpec marker at {address} unit id: {unit_id} registers: {regs}')
+            return {}
+
+        models = {}
+        address += 2
+        for _ in range(max_models):
+            header = await self.get_registers(unit_id=unit_id, address=address, count=2)
+            if header is None:
+                break
+            model_id, length = header
+            if model_id == 0xFFFF:
+                break
+            # the first instance of a model is used
+            models.setdefault(model_id, (address + 2, length))
+            address += 2 + length
+        _LOGGER.debug(f'SunSpec models of unit id {unit_id}: {models}')
+        return models
+
+    def implemented(self, key) -> bool:
+        """False if the device is known not to implement the point stored under key."""
+        return self.capabilities.get(key, True)
+
+    def awake(self, key) -> bool:
+        """Whether the device of the point stored under key answers for all the points it implements, e.g. not while an inverter sleeps."""
+        return True
+
+    def update_capability(self, key, implemented):
+        """Record whether a read of the point stored under key returned a value.
+
+        A point is implemented once it returned a value. It is not implemented after
+        NOT_IMPLEMENTED_READS reads of the not implemented value while the device is awake,
+        and implemented again when it returns a value later.
+        """
+        if implemented:
+            if self.capabilities.get(key) is False:
+                _LOGGER.info(f'{key} returned a value on {self._host}, it is implemented')
+            self.capabilities[key] = True
+            self._not_implemented_reads.pop(key, None)
+            return
+        if key in self.capabilities or not self.awake(key):
+            return
+        reads = self._not_implemented_reads.get(key, 0) + 1
+        self._not_implemented_reads[key] = reads
+        if reads >= self.NOT_IMPLEMENTED_READS:
+            self.capabilities[key] = False
+            _LOGGER.info(f'{key} is not implemented by the device on {self._host}')
+
+    def decode(self, key, regs, data_type):
+        """Decode the point stored under key, None if it holds the SunSpec not implemented value.
+
+        The registers are compared with the not implemented value first, so points that are
+        not implemented are not converted.
+        """
+        implemented = list(regs) != self.NOT_IMPLEMENTED.get(data_type)
+        self.update_capability(key, implemented)
+        if not implemented:
+            return None
+        return self._client.convert_from_registers(regs, data_type = data_type)
+
+    def capability_state(self, serial) -> dict:
+        """Capabilities of the device with serial in a form suitable for storage."""
+        return {'devices': {serial: dict(self.capabilities)}}
+
+    def restore_capabilities(self, state, serial):
+        """Restore the capabilities stored for the device with serial, those of another device are ignored."""
+        capabilities = (state or {}).get('devices', {}).get(serial)
+        if not isinstance(capabilities, dict):
+            return
+        for key, implemented in capabilities.items():
+            if isinstance(implemented, bool):
+                self.capabilities.setdefault(key, implemented)
+        _LOGGER.debug(f'restored capabilities of {serial}, not implemented {sorted(key for key, implemented in self.capabilities.items() if not implemented)}')
+
     def calculate_value(self, value, sf, digits=2, lower_bound = None, upper_bound = None):
         if self.is_numeric(value) and self.is_numeric(sf):
             rvalue = round(value * 10**sf, digits)
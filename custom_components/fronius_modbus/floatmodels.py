@@ -0,0 +1,105 @@
+"""Decoding of the SunSpec float models (111-113, 211-213)."""
+
+import logging
+import math
+import struct
+
+_LOGGER = logging.getLogger(__name__)
+
+# struct format and number of registers of the point types
+POINT_TYPES = {
+    'float32': ('f', 2),
+    'uint16': ('H', 1),
+    'uint32': ('I', 2),
+}
+
+
+class FloatLayout:
+    """Points of a float model, decoded from the registers of the model with one precompiled struct.
+
+    points is a list of (key, offset, type, digits, lower bound, upper bound). Floats are
+    rounded to digits; values outside of the bounds and NaN (not implemented) become None.
+    """
+
+    def __init__(self, points):
+        points = sorted(points, key=lambda point: point[1])
+        fmt = '>'
+        position = 0
+        for key, offset, point_type, *_ in points:
+            if offset < position:
+                raise ValueError(f'Point {key} at {offset} overlaps the previous point')
+            code, length = POINT_TYPES[point_type]
+            if offset > position:
+                fmt += f'{(offset - position) * 2}x'
+            fmt += code
+            position = offset + length
+        self.keys = [point[0] for point in points]
+        self.length = position
+        self._points = points
+        self._struct = struct.Struct(fmt)
+        self._registers = struct.Struct(f'>{position}H')
+
+    def decode(self, regs, keys=None) -> dict:
+        """Values of the points in keys (all points if None) from the registers of the model."""
+        raw = self._struct.unpack(self._registers.pack(*regs[:self.length]))
+        values = {}
+        for (key, _, point_type, digits, lower_bound, upper_bound), value in zip(self._points, raw):
+            if keys is not None and key not in keys:
+                continue
+            if point_type == 'float32':
+                if math.isnan(value):
+                    value = None
+                else:
+                    value = round(value, digits)
+                    if (lower_bound is not None and value < lower_bound) or (upper_bound is not None and value > upper_bound):
+                        _LOGGER.debug(f'{key}: {value} out of bounds {lower_bound} {upper_bound}')
+                        value = None
+            values[key] = value
+        return values
+
+    def not_implemented(self, regs) -> set:
+        """Keys of the float points holding NaN, the SunSpec not implemented value."""
+        raw = self._struct.unpack(self._registers.pack(*regs[:self.length]))
+        return {point[0] for point, value in zip(self._points, raw) if point[2] == 'float32' and math.isnan(value)}
+
+
+# single, split and three phase inverter
+INVERTER_FLOAT_MODELS = [111, 112, 113]
+INVERTER_FLOAT_LAYOUT = FloatLayout([
+    ('PPVphAB', 8, 'float32', 2, None, None),
+    ('PPVphBC', 10, 'float32', 2, None, None),
+    ('PPVphCA', 12, 'float32', 2, None, None),
+    ('PhVphA', 14, 'float32', 2, None, None),
+    ('PhVphB', 16, 'float32', 2, None, None),
+    ('PhVphC', 18, 'float32', 2, None, None),
+    ('acpower', 20, 'float32', 2, -50000, 50000),
+    ('line_frequency', 22, 'float32', 2, 0, 100),
+    ('acenergy', 30, 'float32', 2, None, None),
+    ('tempcab', 38, 'float32', 2, None, None),
+    ('StVnd', 47, 'uint16', None, None, None),
+    ('EvtVnd1', 52, 'uint32', None, None, None),
+    ('EvtVnd2', 54, 'uint32', None, None, None),
+    ('EvtVnd3', 56, 'uint32', None, None, None),
+])
+
+INVERTER_FLOAT_POWER_LAYOUT = FloatLayout([
+    ('acpower', 0, 'float32', 2, -50000, 50000),
+])
+INVERTER_FLOAT_POWER_OFFSET = 20
+
+# single, split and three phase meter
+METER_FLOAT_MODELS = [211, 212, 213]
+METER_FLOAT_LAYOUT = FloatLayout([
+    ('PhVphA', 10, 'float32', 1, 0, 1000),
+    ('PhVphB', 12, 'float32', 1, 0, 1000),
+    ('PhVphC', 14, 'float32', 1, 0, 1000),
+    ('PPV', 16, 'float32', 1, 0, 1000),
+    ('line_frequency', 24, 'float32', 2, 0, 100),
+    ('power', 26, 'float32', 2, -50000, 50000),
+    ('exported', 58, 'float32', 2, None, None),
+    ('imported', 66, 'float32', 2, None, None),
+])
+METER_FLOAT_POWER_LAYOUT = FloatLayout([
+    ('power', 0, 'float32', 2, -50000, 50000),
+])
+METER_FLOAT_POWER_OFFSET = 26
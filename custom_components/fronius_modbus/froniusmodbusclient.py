@@ -3,18 +3,29 @@
 """BYD Battery Box Class"""
 
 import asyncio
+import functools
 import logging
+import re
+import time
 from typing import Optional, Literal
-from .extmodbusclient import ExtModbusClient
+from .extmodbusclient import ExtModbusClient, BitfieldDecoder, EnumRegistry
+from .derivedmetrics import DerivedMetricsEngine, DERIVED_METRICS
+from .counterguard import CounterGuard
+from .gridstatus import GridStatusEstimator
+from .storagecontrol import StorageControl, POLICY_ADOPT, ADOPTED, derive_ext_mode
+from .floatmodels import (
+    INVERTER_FLOAT_MODELS,
+    INVERTER_FLOAT_LAYOUT,
+    INVERTER_FLOAT_POWER_LAYOUT,
+    INVERTER_FLOAT_POWER_OFFSET,
+    METER_FLOAT_MODELS,
+    METER_FLOAT_LAYOUT,
+    METER_FLOAT_POWER_LAYOUT,
+    METER_FLOAT_POWER_OFFSET,
+)
 import requests
 
 from .froniusmodbusclient_const import (
-    INVERTER_ADDRESS,
-    MPPT_ADDRESS,
-    COMMON_ADDRESS,
-    NAMEPLATE_ADDRESS,
-    STORAGE_ADDRESS,
-    METER_ADDRESS,
     STORAGE_CONTROL_MODE_ADDRESS,
     MINIMUM_RESERVE_ADDRESS,
     DISCHARGE_RATE_ADDRESS,
@@ -22,35 +33,85 @@ from .froniusmodbusclient_const import (
     EXPORT_LIMIT_RATE_ADDRESS,
     EXPORT_LIMIT_ENABLE_ADDRESS,
     CONN_ADDRESS,
-    STORAGE_CONTROL_MODE,
-    CHARGE_STATUS,
-    CHARGE_GRID_STATUS,
+    COMMON_MODEL,
+    INVERTER_MODELS,
+    NAMEPLATE_MODEL,
+    SETTINGS_MODEL,
+    STATUS_MODEL,
+    CONTROLS_MODEL,
+    STORAGE_MODEL,
+    MPPT_MODEL,
+    METER_MODELS,
+    DEFAULT_INVERTER_MODELS,
+    DEFAULT_METER_MODELS,
+    CONN_OFFSET,
+    EXPORT_LIMIT_RATE_OFFSET,
+    EXPORT_LIMIT_ENABLE_OFFSET,
+    STORAGE_CONTROL_MODE_OFFSET,
+    MINIMUM_RESERVE_OFFSET,
+    DISCHARGE_RATE_OFFSET,
+    CHARGE_RATE_OFFSET,
+    METER_POWER_OFFSET,
+    INVERTER_POWER_OFFSET,
+    STORAGE_SOC_OFFSET,
+    DEFAULT_RATED_POWER,
+    LIFETIME_COUNTERS,
     STORAGE_EXT_CONTROL_MODE,
-    FRONIUS_INVERTER_STATUS,
-    CONNECTION_STATUS_CONDENSED,
-    ECP_CONNECTION_STATUS,
     INVERTER_CONTROLS,
-    INVERTER_EVENTS,
-    CONTROL_STATUS,
-    EXPORT_LIMIT_STATUS,
-    GRID_STATUS,
+    INVERTER_EVENT_REGISTERS,
+    ENUM_POINTS,
+    INVERTER_SLEEP_STATUSES,
+    SLEEPING_INVERTER_POWERS,
 #    INVERTER_STATUS,
 #    CONNECTION_STATUS,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# event register -> decoder of its 32 flags
+EVENT_DECODERS = {register: BitfieldDecoder(labels, bits=32) for register, labels in INVERTER_EVENT_REGISTERS.items()}
+# event register -> attribute names of its flags
+EVENT_CODES = {
+    register: tuple(re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_') for label in labels)
+    for register, labels in INVERTER_EVENT_REGISTERS.items()
+}
+
+
+@functools.lru_cache(maxsize=BitfieldDecoder.CACHE_SIZE)
+def decode_events(raw_values: tuple) -> tuple:
+    """Decode the raw values of the event registers, in the order of EVENT_DECODERS.
+
+    Returns the state of the events sensor, its attributes (the raw registers and one flag
+    per defined event) and the active events as a frozenset of (register, bit).
+    """
+    labels = []
+    attributes = {}
+    active = set()
+    for (register, decoder), raw in zip(EVENT_DECODERS.items(), raw_values):
+        attributes[register] = raw
+        bits = decoder.active_bits(raw)
+        labels.extend(decoder.strings(raw))
+        active.update((register, bit) for bit in bits)
+        for bit, code in enumerate(EVENT_CODES[register]):
+            attributes[code] = bit in bits
+    state = ','.join(labels)[:255] if labels else 'None'
+    return state, attributes, frozenset(active)
+
+
 class FroniusModbusClient(ExtModbusClient):
     """Hub for BYD Battery Box Interface"""
 
-    def __init__(self, host: str, port: int, inverter_unit_id: int, meter_unit_ids, timeout: int) -> None:
+    def __init__(self, host: str, port: int, inverter_unit_id: int, meter_unit_ids, timeout: int, register_cache_ttl: float = 0, framer: str = None, tcp_keepalive: bool = False, tcp_nodelay: bool = True, fleet_unit_ids = None, storage_control_policy = POLICY_ADOPT, meter_rated_power: int = DEFAULT_RATED_POWER) -> None:
         """Init hub."""
-        super(FroniusModbusClient, self).__init__(host = host, port = port, unit_id=inverter_unit_id, timeout=timeout)
+        super(FroniusModbusClient, self).__init__(host = host, port = port, unit_id=inverter_unit_id, timeout=timeout, framer=framer, register_cache_ttl=register_cache_ttl, tcp_keepalive=tcp_keepalive, tcp_nodelay=tcp_nodelay)
 
         self.initialized = False
 
         self._inverter_unit_id = inverter_unit_id
         self._meter_unit_ids = meter_unit_ids
+        # further inverters behind the same gateway, polled over the same connection
+        self.fleet_unit_ids = list(fleet_unit_ids or [])
+        self._fleet_offset = 0
 
         self.meter_configured = False
         self.mppt_configured = False
@@ -58,17 +119,82 @@ class FroniusModbusClient(ExtModbusClient):
         self.storage_extended_control_mode = 0
         self.max_charge_rate_w = 11000
         self.max_discharge_rate_w = 11000
-        self._grid_frequency = 50
-        self._grid_frequency_lower_bound = self._grid_frequency - 0.2
-        self._grid_frequency_upper_bound = self._grid_frequency + 0.2
-
-        self._inverter_frequency_lower_bound = self._grid_frequency - 5
-        self._inverter_frequency_upper_bound = self._grid_frequency + 5
+        self.storage_revert_timeout = 0
+        self._storage_rates_written_at = None
+        self.storage_control = StorageControl(storage_control_policy)
+        self._derived_metrics = DerivedMetricsEngine(DERIVED_METRICS)
+        self.counter_guard = CounterGuard()
+        # the SunSpec meter models have no rated power point
+        self.meter_rated_power = meter_rated_power
+        self.grid_status_estimator = GridStatusEstimator()
+
+        # unit id -> {model id: (address, length)} from the SunSpec model chain
+        self._models = {}
+        # control registers, updated from the model chain of the inverter
+        self.conn_address = CONN_ADDRESS
+        self.export_limit_rate_address = EXPORT_LIMIT_RATE_ADDRESS
+        self.export_limit_enable_address = EXPORT_LIMIT_ENABLE_ADDRESS
+        self.storage_control_mode_address = STORAGE_CONTROL_MODE_ADDRESS
+        self.minimum_reserve_address = MINIMUM_RESERVE_ADDRESS
+        self.discharge_rate_address = DISCHARGE_RATE_ADDRESS
+        self.charge_rate_address = CHARGE_RATE_ADDRESS
 
         self.data = {}
+        self.enums = EnumRegistry(ENUM_POINTS)
+        # data key -> extra state attributes
+        self.attributes = {}
+        # data key -> scale factor of its last scaled value
+        self.scale_factors = {}
+        # unit id -> (register, bit) of the active events of an inverter
+        self._active_events = {}
+        self._reported_events = {}
+
+    async def discover_models(self, unit_id, default_models) -> dict:
+        """Address map of the SunSpec models of a unit, read once per unit."""
+        if unit_id in self._models:
+            return self._models[unit_id]
+        try:
+            models = await self.read_model_chain(unit_id)
+        except Exception as e:
+            _LOGGER.warning(f"Error reading SunSpec models of unit id {unit_id}: {e}")
+            models = {}
+        if not models:
+            _LOGGER.warning(f"No SunSpec model chain found on {self._host}:{self._port} unit id: {unit_id}, using default addresses")
+            models = dict(default_models)
+        self._models[unit_id] = models
+        return models
+
+    def model_block(self, unit_id, model_ids):
+        """(address, length) of the first of model_ids the unit implements, None if it implements none of them."""
+        models = self._models.get(unit_id, {})
+        for model_id in model_ids:
+            block = models.get(model_id)
+            if block is not None:
+                return block[0], min(block[1], self.MAX_READ_COUNT)
+        return None
+
+    def _model_address(self, model_id, offset, default):
+        block = self.model_block(self._inverter_unit_id, [model_id])
+        if block is None:
+            return default
+        return block[0] + offset
+
+    def _update_control_addresses(self):
+        self.conn_address = self._model_address(CONTROLS_MODEL, CONN_OFFSET, CONN_ADDRESS)
+        self.export_limit_rate_address = self._model_address(CONTROLS_MODEL, EXPORT_LIMIT_RATE_OFFSET, EXPORT_LIMIT_RATE_ADDRESS)
+        self.export_limit_enable_address = self._model_address(CONTROLS_MODEL, EXPORT_LIMIT_ENABLE_OFFSET, EXPORT_LIMIT_ENABLE_ADDRESS)
+        self.storage_control_mode_address = self._model_address(STORAGE_MODEL, STORAGE_CONTROL_MODE_OFFSET, STORAGE_CONTROL_MODE_ADDRESS)
+        self.minimum_reserve_address = self._model_address(STORAGE_MODEL, MINIMUM_RESERVE_OFFSET, MINIMUM_RESERVE_ADDRESS)
+        self.discharge_rate_address = self._model_address(STORAGE_MODEL, DISCHARGE_RATE_OFFSET, DISCHARGE_RATE_ADDRESS)
+        self.charge_rate_address = self._model_address(STORAGE_MODEL, CHARGE_RATE_OFFSET, CHARGE_RATE_ADDRESS)
 
     async def init_data(self):
         await self.connect()
+
+        models = await self.discover_models(self._inverter_unit_id, DEFAULT_INVERTER_MODELS)
+        if self.model_block(self._inverter_unit_id, INVERTER_MODELS + INVERTER_FLOAT_MODELS) is None:
+            _LOGGER.error(f"No supported inverter model found in SunSpec models {list(models)}")
+        self._update_control_addresses()
         try:
             result = await self.read_device_info_data(prefix='i_', unit_id=self._inverter_unit_id)
         except Exception as e:
@@ -93,6 +219,7 @@ class FroniusModbusClient(ExtModbusClient):
         for i in range(len(self._meter_unit_ids)):
             unit_id = self._meter_unit_ids[i]
             try:
+                await self.discover_models(unit_id, DEFAULT_METER_MODELS)
                 result = await self.read_device_info_data(prefix=f'm{i+1}_', unit_id=unit_id)
                 if result:
                     if not self.meter_configured:
@@ -105,6 +232,17 @@ class FroniusModbusClient(ExtModbusClient):
         if await self.read_inverter_nameplate_data() == False:
             _LOGGER.error(f"Error reading nameplate data", exc_info=True)
 
+        for unit_id in list(self.fleet_unit_ids):
+            try:
+                await self.discover_models(unit_id, DEFAULT_INVERTER_MODELS)
+                result = await self.read_device_info_data(prefix=self.fleet_prefix(unit_id), unit_id=unit_id)
+            except Exception as e:
+                _LOGGER.error(f"Error reading fleet inverter info {self._host}:{self._port} unit id: {unit_id}", exc_info=True)
+                result = False
+            if not result:
+                _LOGGER.error(f"Fleet inverter unit id: {unit_id} not found on {self._host}:{self._port}, it is not polled")
+                self.fleet_unit_ids.remove(unit_id)
+
         _LOGGER.debug(f"Init done. data: {self.data}")
 
         return True
@@ -147,7 +285,10 @@ class FroniusModbusClient(ExtModbusClient):
             _LOGGER.error(f"Error storage json data {url} {e}", exc_info=True)
 
     async def read_device_info_data(self, prefix, unit_id):
-        regs = await self.get_registers(unit_id=unit_id, address=COMMON_ADDRESS, count=65)
+        block = self.model_block(unit_id, [COMMON_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
@@ -167,55 +308,131 @@ class FroniusModbusClient(ExtModbusClient):
 
         return True
 
-    async def read_inverter_data(self):
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=INVERTER_ADDRESS, count=50)
+    async def read_inverter_data(self, prefix = '', unit_id = None):
+        if unit_id is None:
+            unit_id = self._inverter_unit_id
+        block = self.model_block(unit_id, INVERTER_MODELS)
+        if block is None:
+            return await self.read_inverter_float_data(prefix, unit_id)
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
-        PPVphAB = self._client.convert_from_registers(regs[5:6], data_type = self._client.DATATYPE.UINT16)
-        PPVphBC = self._client.convert_from_registers(regs[6:7], data_type = self._client.DATATYPE.UINT16)
-        PPVphCA = self._client.convert_from_registers(regs[7:8], data_type = self._client.DATATYPE.UINT16)
-        PhVphA = self._client.convert_from_registers(regs[8:9], data_type = self._client.DATATYPE.UINT16)
-        PhVphB = self._client.convert_from_registers(regs[9:10], data_type = self._client.DATATYPE.UINT16)
-        PhVphC = self._client.convert_from_registers(regs[10:11], data_type = self._client.DATATYPE.UINT16)
+        # the status decides whether missing points count as not implemented, so it is set first
+        #St = self._client.convert_from_registers(regs[36:37], data_type = self._client.DATATYPE.UINT16)
+        StVnd = self._client.convert_from_registers(regs[37:38], data_type = self._client.DATATYPE.UINT16)
+        self.set_enum(prefix + 'statusvendor', StVnd, 'statusvendor')
+
+        PPVphAB = self.decode(prefix + 'PPVphAB', regs[5:6], self._client.DATATYPE.UINT16)
+        PPVphBC = self.decode(prefix + 'PPVphBC', regs[6:7], self._client.DATATYPE.UINT16)
+        PPVphCA = self.decode(prefix + 'PPVphCA', regs[7:8], self._client.DATATYPE.UINT16)
+        PhVphA = self.decode(prefix + 'PhVphA', regs[8:9], self._client.DATATYPE.UINT16)
+        PhVphB = self.decode(prefix + 'PhVphB', regs[9:10], self._client.DATATYPE.UINT16)
+        PhVphC = self.decode(prefix + 'PhVphC', regs[10:11], self._client.DATATYPE.UINT16)
         V_SF = self._client.convert_from_registers(regs[11:12], data_type = self._client.DATATYPE.INT16)
 
-        W = self._client.convert_from_registers(regs[12:13], data_type = self._client.DATATYPE.INT16)
+        W = self.decode(prefix + 'acpower', regs[12:13], self._client.DATATYPE.INT16)
         W_SF = self._client.convert_from_registers(regs[13:14], data_type = self._client.DATATYPE.INT16)
-        Hz = self._client.convert_from_registers(regs[14:15], data_type = self._client.DATATYPE.INT16)
+        Hz = self.decode(prefix + 'line_frequency', regs[14:15], self._client.DATATYPE.INT16)
         Hz_SF = self._client.convert_from_registers(regs[15:16], data_type = self._client.DATATYPE.INT16)
 
-        WH = self._client.convert_from_registers(regs[22:24], data_type = self._client.DATATYPE.UINT32)
+        WH = self.decode(prefix + 'acenergy', regs[22:24], self._client.DATATYPE.UINT32)
         WH_SF = self._client.convert_from_registers(regs[24:25], data_type = self._client.DATATYPE.INT16)
 
-        TmpCab = self._client.convert_from_registers(regs[31:32], data_type = self._client.DATATYPE.INT16)
+        TmpCab = self.decode(prefix + 'tempcab', regs[31:32], self._client.DATATYPE.INT16)
         Tmp_SF = self._client.convert_from_registers(regs[35:36], data_type = self._client.DATATYPE.INT16)
-        #St = self._client.convert_from_registers(regs[36:37], data_type = self._client.DATATYPE.UINT16)
-        StVnd = self._client.convert_from_registers(regs[37:38], data_type = self._client.DATATYPE.UINT16)
-        #EvtVnd1 = self._client.convert_from_registers(regs[42:44], data_type = self._client.DATATYPE.UINT32)
+        EvtVnd1 = self._client.convert_from_registers(regs[42:44], data_type = self._client.DATATYPE.UINT32)
         EvtVnd2 = self._client.convert_from_registers(regs[44:46], data_type = self._client.DATATYPE.UINT32)
-
-        self.data['PPVphAB'] = self.calculate_value(PPVphAB, V_SF)
-        self.data['PPVphBC'] = self.calculate_value(PPVphBC, V_SF)
-        self.data['PPVphCA'] = self.calculate_value(PPVphCA, V_SF)
-        self.data['PhVphA'] = self.calculate_value(PhVphA, V_SF)
-        self.data['PhVphB'] = self.calculate_value(PhVphB, V_SF)
-        self.data['PhVphC'] = self.calculate_value(PhVphC, V_SF)
-        self.data['tempcab'] = self.calculate_value(TmpCab, Tmp_SF)
-        self.data["acpower"] = self.calculate_value(W, W_SF, 2, -50000, 50000)
-        self.data["line_frequency"] = self.calculate_value(Hz, Hz_SF, 2, 0, 100)
-        self.data["acenergy"] = self.calculate_value(WH, WH_SF) 
+        EvtVnd3 = self._client.convert_from_registers(regs[46:48], data_type = self._client.DATATYPE.UINT32)
+
+        self.set_value(prefix + 'PPVphAB', PPVphAB, V_SF)
+        self.set_value(prefix + 'PPVphBC', PPVphBC, V_SF)
+        self.set_value(prefix + 'PPVphCA', PPVphCA, V_SF)
+        self.set_value(prefix + 'PhVphA', PhVphA, V_SF)
+        self.set_value(prefix + 'PhVphB', PhVphB, V_SF)
+        self.set_value(prefix + 'PhVphC', PhVphC, V_SF)
+        self.set_value(prefix + 'tempcab', TmpCab, Tmp_SF)
+        self.set_value(prefix + 'acpower', W, W_SF, 2, -50000, 50000)
+        self.set_value(prefix + 'line_frequency', Hz, Hz_SF, 2, 0, 100)
+        self.set_value(prefix + 'acenergy', WH, WH_SF)
         #self.data["status"] = INVERTER_STATUS[St]
-        self.data["statusvendor"] = FRONIUS_INVERTER_STATUS[StVnd]
-        self.data["statusvendor_id"] = StVnd
-        #self.data["events1"] = self.bitmask_to_string(EvtVnd1,INVERTER_EVENTS,default='None',bits=32)  
-        self.data["events2"] = self.bitmask_to_string(EvtVnd2,INVERTER_EVENTS,default='None',bits=32)  
+        self.set_events(unit_id, prefix, EvtVnd1, EvtVnd2, EvtVnd3)
+
+        return True
+
+    def awake(self, key) -> bool:
+        """Whether the inverter of the point stored under key reported a status in which it answers for all the points it implements."""
+        prefix = next((prefix for prefix in map(self.fleet_prefix, self.fleet_unit_ids) if key.startswith(prefix)), '')
+        status = self.data.get(prefix + 'statusvendor')
+        return status is not None and status not in INVERTER_SLEEP_STATUSES
+
+    def decode_float_model(self, layout, regs, prefix = '') -> dict:
+        """Values of the points of a float model, None for the points holding NaN, which are not decoded."""
+        not_implemented = layout.not_implemented(regs)
+        for key in layout.keys:
+            self.update_capability(prefix + key, key not in not_implemented)
+        values = dict.fromkeys(not_implemented)
+        values.update(layout.decode(regs, [key for key in layout.keys if key not in not_implemented]))
+        return values
+
+    async def read_inverter_float_data(self, prefix = '', unit_id = None):
+        if unit_id is None:
+            unit_id = self._inverter_unit_id
+        block = self.model_block(unit_id, INVERTER_FLOAT_MODELS)
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
+        if regs is None:
+            return False
+
+        # the status decides whether missing points count as not implemented, so it is set first
+        self.set_enum(prefix + 'statusvendor', INVERTER_FLOAT_LAYOUT.decode(regs, ['StVnd'])['StVnd'], 'statusvendor')
+        values = self.decode_float_model(INVERTER_FLOAT_LAYOUT, regs, prefix)
+        values.pop('StVnd')
+        EvtVnd1 = values.pop('EvtVnd1')
+        EvtVnd2 = values.pop('EvtVnd2')
+        EvtVnd3 = values.pop('EvtVnd3')
+        for key, value in values.items():
+            self.data[prefix + key] = value
+        self.set_events(unit_id, prefix, EvtVnd1, EvtVnd2, EvtVnd3)
 
         return True
 
+    def set_enum(self, key, raw, enum = None):
+        """Set the label of an enum point and its raw code as key_id. enum is the enum of the point if it differs from key."""
+        self.data[key] = self.enums.label(key, raw, enum)
+        self.data[key + '_id'] = raw
+
+    def set_events(self, unit_id, prefix, *raw_values):
+        """Decode the vendor event registers EvtVnd1, EvtVnd2 and EvtVnd3 of an inverter into its events sensor and its attributes."""
+        state, attributes, self._active_events[unit_id] = decode_events(raw_values)
+        # the key of the events sensor predates the decoding of all event registers
+        self.data[prefix + 'events2'] = state
+        self.attributes[prefix + 'events2'] = attributes
+
+    def event_edges(self) -> list:
+        """Events raised or cleared since the last call as (unit id, register, bit, label, active), sorted.
+
+        The events active on the first read of an inverter are the baseline and are not reported.
+        """
+        edges = []
+        for unit_id, active_events in self._active_events.items():
+            previous = self._reported_events.get(unit_id)
+            if active_events == previous:
+                continue
+            self._reported_events[unit_id] = active_events
+            if previous is None:
+                continue
+            edges += [(unit_id, register, bit, True) for register, bit in active_events - previous]
+            edges += [(unit_id, register, bit, False) for register, bit in previous - active_events]
+        return [(unit_id, register, bit, EVENT_DECODERS[register].label(bit), active) for unit_id, register, bit, active in sorted(edges)]
+
     async def read_inverter_nameplate_data(self):
         """start reading storage data"""
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=NAMEPLATE_ADDRESS, count=120)
+        block = self.model_block(self._inverter_unit_id, [NAMEPLATE_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
@@ -240,7 +457,10 @@ class FroniusModbusClient(ExtModbusClient):
         return True
 
     async def read_inverter_status_data(self):
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=40183, count=44)
+        block = self.model_block(self._inverter_unit_id, [STATUS_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
@@ -250,21 +470,24 @@ class FroniusModbusClient(ExtModbusClient):
 
         StActCtl = self._client.convert_from_registers(regs[33:35], data_type = self._client.DATATYPE.UINT32)
         
-        Ris = self._client.convert_from_registers(regs[42:43], data_type = self._client.DATATYPE.UINT16)
+        Ris = self.decode('isolation_resistance', regs[42:43], self._client.DATATYPE.UINT16)
         Ris_SF = self._client.convert_from_registers(regs[43:44], data_type = self._client.DATATYPE.UINT16)
 
-        self.data['pv_connection'] = CONNECTION_STATUS_CONDENSED[PVConn]
-        self.data['storage_connection'] = CONNECTION_STATUS_CONDENSED[StorConn]
-        self.data['ecp_connection'] = ECP_CONNECTION_STATUS[ECPConn]
+        self.set_enum('pv_connection', PVConn)
+        self.set_enum('storage_connection', StorConn)
+        self.set_enum('ecp_connection', ECPConn)
         self.data['inverter_controls'] = self.bitmask_to_string(StActCtl, INVERTER_CONTROLS, 'Normal')
         # Adjust the scaling factor because isolation resistance is provided
         # in Ohm and stored in Mega Ohm.
-        self.data['isolation_resistance'] = self.calculate_value(Ris, Ris_SF-6)
+        self.set_value('isolation_resistance', Ris, Ris_SF-6)
 
         return True
 
     async def read_inverter_model_settings_data(self):
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=40151, count=30)
+        block = self.model_block(self._inverter_unit_id, [SETTINGS_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
@@ -283,7 +506,10 @@ class FroniusModbusClient(ExtModbusClient):
         return True
 
     async def read_inverter_controls_data(self):
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=40229, count=24)
+        block = self.model_block(self._inverter_unit_id, [CONTROLS_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
@@ -292,48 +518,20 @@ class FroniusModbusClient(ExtModbusClient):
         OutPFSet_Ena = self._client.convert_from_registers(regs[12:13], data_type = self._client.DATATYPE.UINT16)
         VArPct_Ena = self._client.convert_from_registers(regs[20:21], data_type = self._client.DATATYPE.INT16)
 
-        self.data['Conn'] = CONTROL_STATUS[Conn]
-        self.data['WMaxLim_Ena'] = CONTROL_STATUS[WMaxLim_Ena]
-        self.data['OutPFSet_Ena'] = CONTROL_STATUS[OutPFSet_Ena]
-        self.data['VArPct_Ena'] = CONTROL_STATUS[VArPct_Ena]
+        self.set_enum('Conn', Conn)
+        self.set_enum('WMaxLim_Ena', WMaxLim_Ena)
+        self.set_enum('OutPFSet_Ena', OutPFSet_Ena)
+        self.set_enum('VArPct_Ena', VArPct_Ena)
 
         return True
 
-    def protect_lfte(self, key, value):
-        ''' ensure lfte values are monotonically increasing to fullfil the properties of SensorStateClass.TOTAL_INCREASING.
-            Therfore this function returns the previous, last known good value, in case the modbus read was erroneus:
-            * the current value from modbus is None
-            * the current value from modbus is smaller than the previous value
-            * the current value from modbus is much larger then the previous value
-            This avoids wrong spikes in consumption / production on the energy dashboard
-        '''
-
-        if key not in self.data:
-            _LOGGER.info(f"Initializing {key}={value}")
-            return value
-        elif self.data[key] is None:
-            # None is a invalid value for monotonically increasing data.
-            # hopefully never happens
-            _LOGGER.info(f"Found initial {key}=None. Now using new value {value}")
-            return value
-        elif value is None:
-            _LOGGER.warn(f"Received implausible {key}={value}. Using previous plausible value {self.data[key]}")
-            return self.data[key]
-        elif value < self.data[key]:
-            _LOGGER.warn(f"Received implausible (too small) {key}={value} < previous plausible value {self.data[key]}")
-            return self.data[key]
-        elif value > self.data[key] + 100000:
-            # we allow steps of 100 kWh. Usually, at a typicall rate every 10 seconds the steps should be far below.
-            # However, when data transfer is not working for minutes or even an hour it could become relevant.
-            # Also, wrong values are often by orders of magnitude to large, which should still be avoided by this check.
-
-            _LOGGER.warn(f"Received implausible (too large) {key}={value} >> previous plausible value {self.data[key]}")
-            return self.data[key]
-        else:
-            return value
-
-    async def read_mppt_data(self):
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=MPPT_ADDRESS, count=88)
+    async def read_mppt_data(self, prefix = '', unit_id = None):
+        if unit_id is None:
+            unit_id = self._inverter_unit_id
+        block = self.model_block(unit_id, [MPPT_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
         
@@ -341,52 +539,45 @@ class FroniusModbusClient(ExtModbusClient):
         DCV_SF = self._client.convert_from_registers(regs[1:2], data_type = self._client.DATATYPE.INT16)
         DCW_SF = self._client.convert_from_registers(regs[2:3], data_type = self._client.DATATYPE.INT16)
         DCWH_SF = self._client.convert_from_registers(regs[3:4], data_type = self._client.DATATYPE.INT16)
+        # 8 registers followed by 20 registers per module
+        modules = (len(regs) - 8) // 20
+        if modules < 1:
+            return False
+        # single tracker inverters have no second module
+        has_module_2 = modules >= 2
+        if not has_module_2:
+            for key in ['mppt2_current', 'mppt2_voltage', 'mppt2_power', 'mppt2_lfte']:
+                self.capabilities[prefix + key] = False
         #N = self._client.convert_from_registers(regs[6:7], data_type = self._client.DATATYPE.UINT16)
         # if N != 4:
         #     _LOGGER.error(f"Integration only supports 4 mppt modules. Found only: {N}")
         #     return
-        module_1_DCA = self._client.convert_from_registers(regs[17:18], data_type = self._client.DATATYPE.UINT16)
-        module_1_DCV = self._client.convert_from_registers(regs[18:19], data_type = self._client.DATATYPE.UINT16)
-        module_1_DCW = self._client.convert_from_registers(regs[19:20], data_type = self._client.DATATYPE.UINT16)
-        module_1_DCWH = self._client.convert_from_registers(regs[20:22], data_type = self._client.DATATYPE.UINT32)
-
-        module_2_DCA = self._client.convert_from_registers(regs[37:38], data_type = self._client.DATATYPE.UINT16)
-        module_2_DCV = self._client.convert_from_registers(regs[38:39], data_type = self._client.DATATYPE.UINT16)
-        module_2_DCW = self._client.convert_from_registers(regs[39:40], data_type = self._client.DATATYPE.UINT16)
-        module_2_DCWH = self._client.convert_from_registers(regs[40:42], data_type = self._client.DATATYPE.UINT32)
-
-        mppt1_current = self.calculate_value(module_1_DCA, DCA_SF, 2, 0, 100)
-        mppt2_current = self.calculate_value(module_2_DCA, DCA_SF, 2, 0, 100)
-        self.data['mppt1_current'] = mppt1_current
-        self.data['mppt2_current'] = mppt2_current
-
-        mppt1_voltage = self.calculate_value(module_1_DCV, DCV_SF, 2, 0, 1500)
-        mppt2_voltage = self.calculate_value(module_2_DCV, DCV_SF, 2, 0, 1500)
-        self.data['mppt1_voltage'] = mppt1_voltage
-        self.data['mppt2_voltage'] = mppt2_voltage
-
-        mppt1_power = self.calculate_value(module_1_DCW, DCW_SF, 2, 0, 15000)
-        mppt2_power = self.calculate_value(module_2_DCW, DCW_SF, 2, 0, 15000)
-        if not mppt1_power is None and not mppt2_power is None:
-             pv_power = mppt1_power + mppt2_power
-        else:
-            pv_power = None
+        module_1_DCA = self.decode(prefix + 'mppt1_current', regs[17:18], self._client.DATATYPE.UINT16)
+        module_1_DCV = self.decode(prefix + 'mppt1_voltage', regs[18:19], self._client.DATATYPE.UINT16)
+        module_1_DCW = self.decode(prefix + 'mppt1_power', regs[19:20], self._client.DATATYPE.UINT16)
+        module_1_DCWH = self.decode(prefix + 'mppt1_lfte', regs[20:22], self._client.DATATYPE.UINT32)
 
-        mppt1_lfte = self.calculate_value(module_1_DCWH, DCWH_SF)
-        mppt2_lfte = self.calculate_value(module_2_DCWH, DCWH_SF)
-        self.data['mppt1_power'] = mppt1_power
-        self.data['mppt2_power'] = mppt2_power
+        module_2_DCA = module_2_DCV = module_2_DCW = module_2_DCWH = None
+        if has_module_2:
+            module_2_DCA = self.decode(prefix + 'mppt2_current', regs[37:38], self._client.DATATYPE.UINT16)
+            module_2_DCV = self.decode(prefix + 'mppt2_voltage', regs[38:39], self._client.DATATYPE.UINT16)
+            module_2_DCW = self.decode(prefix + 'mppt2_power', regs[39:40], self._client.DATATYPE.UINT16)
+            module_2_DCWH = self.decode(prefix + 'mppt2_lfte', regs[40:42], self._client.DATATYPE.UINT32)
 
-        mppt1_lfte = self.protect_lfte('mppt1_lfte', mppt1_lfte)
-        mppt2_lfte = self.protect_lfte('mppt2_lfte', mppt2_lfte)
+        self.set_value(prefix + 'mppt1_current', module_1_DCA, DCA_SF, 2, 0, 100)
+        self.set_value(prefix + 'mppt2_current', module_2_DCA, DCA_SF, 2, 0, 100)
 
+        self.set_value(prefix + 'mppt1_voltage', module_1_DCV, DCV_SF, 2, 0, 1500)
+        self.set_value(prefix + 'mppt2_voltage', module_2_DCV, DCV_SF, 2, 0, 1500)
 
-        self.data['pv_power'] = pv_power
+        self.set_value(prefix + 'mppt1_power', module_1_DCW, DCW_SF, 2, 0, 15000)
+        self.set_value(prefix + 'mppt2_power', module_2_DCW, DCW_SF, 2, 0, 15000)
 
-        self.data['mppt1_lfte'] = mppt1_lfte
-        self.data['mppt2_lfte'] = mppt2_lfte
+        self.set_value(prefix + 'mppt1_lfte', module_1_DCWH, DCWH_SF)
+        self.set_value(prefix + 'mppt2_lfte', module_2_DCWH, DCWH_SF)
 
-        if self.storage_configured:
+        # the storage modules of the primary inverter
+        if unit_id == self._inverter_unit_id and self.storage_configured and modules >= 4:
             module_3_DCW = self._client.convert_from_registers(regs[59:60], data_type = self._client.DATATYPE.UINT16)
             module_3_DCWH = self._client.convert_from_registers(regs[60:62], data_type = self._client.DATATYPE.UINT32)
 
@@ -395,29 +586,28 @@ class FroniusModbusClient(ExtModbusClient):
 
             mppt3_power = self.calculate_value(module_3_DCW, DCW_SF, 2, 0, 15000)
             mppt4_power = self.calculate_value(module_4_DCW, DCW_SF, 2, 0, 15000)
-            if not mppt3_power is None and not mppt4_power is None:
-                storage_power = mppt4_power - mppt3_power
-            else:
-                storage_power = None
 
             mppt3_lfte = self.calculate_value(module_3_DCWH, DCWH_SF)
             mppt4_lfte = self.calculate_value(module_4_DCWH, DCWH_SF)
 
-            mppt3_lfte = self.protect_lfte('mppt3_lfte', mppt3_lfte)
-            mppt4_lfte = self.protect_lfte('mppt4_lfte', mppt4_lfte)
-
             self.data['mppt3_power'] = mppt3_power
             self.data['mppt4_power'] = mppt4_power
-            self.data['storage_power'] = storage_power
 
             self.data['mppt3_lfte'] = mppt3_lfte
             self.data['mppt4_lfte'] = mppt4_lfte
 
         return True
 
-    async def read_inverter_storage_data(self):
-        """start reading storage data"""
-        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=STORAGE_ADDRESS, count=24)
+    async def read_inverter_storage_data(self, reconcile = True):
+        """start reading storage data
+
+        With reconcile the storage control registers are compared with the values written by
+        the integration and differences are resolved with the storage control policy.
+        """
+        block = self.model_block(self._inverter_unit_id, [STORAGE_MODEL])
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
         
@@ -444,7 +634,7 @@ class FroniusModbusClient(ExtModbusClient):
         charge_power = self._client.convert_from_registers(regs[11:12], data_type = self._client.DATATYPE.INT16)
         # InOutWRte_WinTms: not supported
         # InOutWRte_RvrtTms: Timeout period for charge/discharge rate.
-        #InOutWRte_RvrtTms = self._client.convert_from_registers(regs[13:14], data_type = self._client.DATATYPE.INT16)
+        InOutWRte_RvrtTms = self._client.convert_from_registers(regs[13:14], data_type = self._client.DATATYPE.UINT16)
         # InOutWRte_RmpTms: not supported
         # ChaGriSet
         charge_grid_set = self._client.convert_from_registers(regs[15:16], data_type = self._client.DATATYPE.UINT16)
@@ -459,9 +649,9 @@ class FroniusModbusClient(ExtModbusClient):
         # InBatV_SF: not supported
         # InOutWRte_SF: Scale factor for percent charge/discharge rate. -2
 
-        self.data['grid_charging'] = CHARGE_GRID_STATUS.get(charge_grid_set)
+        self.set_enum('grid_charging', charge_grid_set)
         #self.data['power'] = power
-        self.data['charge_status'] = CHARGE_STATUS.get(charge_status)
+        self.set_enum('charge_status', charge_status)
         self.data['minimum_reserve'] =  self.calculate_value(minimum_reserve, -2, 2, 0, 100)
         self.data['discharging_power'] = self.calculate_value(discharge_power, -2, 2, -100, 100)
         self.data['charging_power'] = self.calculate_value(charge_power, -2, 2, -100, 100)
@@ -470,8 +660,28 @@ class FroniusModbusClient(ExtModbusClient):
         self.data['WChaGra'] = self.calculate_value(WChaGra, 0, 0)
         self.data['WDisChaGra'] = self.calculate_value(WDisChaGra, 0, 0)
 
+        self.storage_revert_timeout = InOutWRte_RvrtTms
+
+        adopted = False
+        writes = {}
+        if reconcile:
+            writes = self.storage_control.reconcile({'StorCtl_Mod': storage_control_mode, 'InWRte': regs[11], 'OutWRte': regs[10]})
+            adopted = self.storage_control.state == ADOPTED
+            for point, value in writes.items():
+                result = await self.write_registers(unit_id=self._inverter_unit_id, address=self.storage_control_addresses[point], payload=[value])
+                if result is not None and point in ['InWRte', 'OutWRte']:
+                    self._storage_rates_written_at = time.monotonic()
+            self.data['storage_control_state'] = self.storage_control.state
+            self.attributes['storage_control_state'] = {'policy': self.storage_control.policy, 'drifts': self.storage_control.drifts}
+        if writes:
+            # continue with the restored registers
+            desired = self.storage_control.desired
+            storage_control_mode = desired['StorCtl_Mod']
+            charge_power = self.signed_register(desired.get('InWRte', regs[11]))
+            discharge_power = self.signed_register(desired.get('OutWRte', regs[10]))
+
         control_mode = self.data.get('control_mode')
-        if control_mode is None or control_mode != STORAGE_CONTROL_MODE.get(storage_control_mode):
+        if adopted or control_mode is None or control_mode != self.enums.label('control_mode', storage_control_mode):
             if discharge_power >= 0:
                 self.data['discharge_limit'] = discharge_power / 100.0 
                 self.data['grid_charge_power'] = 0
@@ -485,116 +695,218 @@ class FroniusModbusClient(ExtModbusClient):
                 self.data['grid_discharge_power'] = (charge_power * -1) / 100.0 
                 self.data['charge_limit'] = 0
 
-            self.data['control_mode'] = STORAGE_CONTROL_MODE.get(storage_control_mode)
+            self.set_enum('control_mode', storage_control_mode)
 
-        # set extended storage control mode at startup
+        # set extended storage control mode at startup and from external changes
         ext_control_mode = self.data.get('ext_control_mode')
-        if ext_control_mode is None:
-            if storage_control_mode == 0:
-                ext_control_mode = 0
-            elif storage_control_mode in [1,3] and charge_power == 0:
-                ext_control_mode = 7
-            elif storage_control_mode == 1:
-                ext_control_mode = 1
-            elif storage_control_mode in [2,3] and discharge_power < 0:
-                ext_control_mode = 4
-            elif storage_control_mode in [2,3] and charge_power < 0:
-                ext_control_mode = 5
-            elif storage_control_mode in [2,3] and discharge_power == 0:
-                ext_control_mode = 6
-            elif storage_control_mode == 2:
-                ext_control_mode = 2
-            elif storage_control_mode == 3:
-                ext_control_mode = 3
+        if ext_control_mode is None or adopted:
+            ext_control_mode = derive_ext_mode(storage_control_mode, charge_power, discharge_power)
             self.data['ext_control_mode'] = STORAGE_EXT_CONTROL_MODE[ext_control_mode]
             self.storage_extended_control_mode = ext_control_mode
 
-        if ext_control_mode == 7:
-            soc = self.data.get('soc')
-            if storage_control_mode == 2 and soc == 100:
-                _LOGGER.error(f'Calibration hit 100%, start discharge')
-                self.change_settings(1, 0, 100, 0)
-            elif storage_control_mode == 3 and soc <= 5: 
-                _LOGGER.error(f'Calibration hit 5%, return to auto mode')
-                self.set_auto_mode()
-                self.set_minimum_reserve(30)
-                self.data['ext_control_mode'] = STORAGE_EXT_CONTROL_MODE[0]
-                self.storage_extended_control_mode = 0
-
         return True
 
     async def read_meter_data(self, meter_prefix, unit_id):
         """start reading meter data"""
-        regs = await self.get_registers(unit_id=unit_id, address=METER_ADDRESS, count=103)
+        block = self.model_block(unit_id, METER_MODELS)
+        if block is None:
+            return await self.read_meter_float_data(meter_prefix, unit_id)
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
         if regs is None:
             return False
 
-        PhVphA = self._client.convert_from_registers(regs[6:7], data_type = self._client.DATATYPE.INT16)
-        PhVphB = self._client.convert_from_registers(regs[7:8], data_type = self._client.DATATYPE.INT16)
-        PhVphC = self._client.convert_from_registers(regs[8:9], data_type = self._client.DATATYPE.INT16)
-        PPV = self._client.convert_from_registers(regs[9:10], data_type = self._client.DATATYPE.INT16)
+        PhVphA = self.decode(meter_prefix + 'PhVphA', regs[6:7], self._client.DATATYPE.INT16)
+        PhVphB = self.decode(meter_prefix + 'PhVphB', regs[7:8], self._client.DATATYPE.INT16)
+        PhVphC = self.decode(meter_prefix + 'PhVphC', regs[8:9], self._client.DATATYPE.INT16)
+        PPV = self.decode(meter_prefix + 'PPV', regs[9:10], self._client.DATATYPE.INT16)
         V_SF = self._client.convert_from_registers(regs[13:14], data_type = self._client.DATATYPE.INT16)
 
-        Hz = self._client.convert_from_registers(regs[14:15], data_type = self._client.DATATYPE.INT16)
+        Hz = self.decode(meter_prefix + 'line_frequency', regs[14:15], self._client.DATATYPE.INT16)
         Hz_SF = self._client.convert_from_registers(regs[15:16], data_type = self._client.DATATYPE.INT16)
-        W = self._client.convert_from_registers(regs[16:17], data_type = self._client.DATATYPE.INT16)
+        W = self.decode(meter_prefix + 'power', regs[16:17], self._client.DATATYPE.INT16)
         W_SF = self._client.convert_from_registers(regs[20:21], data_type = self._client.DATATYPE.INT16)
 
-        TotWhExp = self._client.convert_from_registers(regs[36:38], data_type = self._client.DATATYPE.UINT32)
-        TotWhImp = self._client.convert_from_registers(regs[44:46], data_type = self._client.DATATYPE.UINT32)
+        TotWhExp = self.decode(meter_prefix + 'exported', regs[36:38], self._client.DATATYPE.UINT32)
+        TotWhImp = self.decode(meter_prefix + 'imported', regs[44:46], self._client.DATATYPE.UINT32)
         TotWh_SF = self._client.convert_from_registers(regs[52:53], data_type = self._client.DATATYPE.INT16)
 
-        acpower = self.calculate_value(W, W_SF, 2, -50000, 50000)
-        m_frequency = self.calculate_value(Hz, Hz_SF, 2, 0, 100)
-
-        self.data[meter_prefix + "PhVphA"] = self.calculate_value(PhVphA, V_SF,1,0,1000)
-        self.data[meter_prefix + "PhVphB"] = self.calculate_value(PhVphB, V_SF,1,0,1000)
-        self.data[meter_prefix + "PhVphC"] = self.calculate_value(PhVphC, V_SF,1,0,1000)
-        self.data[meter_prefix + "PPV"] = self.calculate_value(PPV, V_SF,1,0,1000)
-        self.data[meter_prefix + "exported"] = self.protect_lfte(meter_prefix + 'exported', self.calculate_value(TotWhExp, TotWh_SF))
-        self.data[meter_prefix + "imported"] = self.protect_lfte(meter_prefix + 'imported', self.calculate_value(TotWhImp, TotWh_SF))
-        self.data[meter_prefix + "line_frequency"] = m_frequency
-        self.data[meter_prefix + "power"] = acpower
-
-        if meter_prefix == 'm1_':
-            inverter_acpower = self.data.get('acpower')
-            if not acpower is None and not inverter_acpower is None:
-                if self.is_numeric(acpower) and self.is_numeric(inverter_acpower):
-                    self.data['load'] = round(acpower + inverter_acpower,2)
-                elif not self.is_numeric(acpower):
-                    _LOGGER.error(f'meter {meter_prefix} acpower not numeric {acpower}')
-                elif not self.is_numeric(inverter_acpower):
-                    _LOGGER.error(f'inverter acpower not numeric {inverter_acpower}')
-
-            status_str = ""
-            i_frequency = self.data["line_frequency"]
-            #_LOGGER.debug(f'grid status m: {m_frequency} i: {i_frequency}')
-            if not i_frequency is None and self.is_numeric(i_frequency) and not m_frequency is None and self.is_numeric(m_frequency):
-                m_online = False
-                if m_frequency and m_frequency > self._grid_frequency_lower_bound and m_frequency < self._grid_frequency_upper_bound:
-                    m_online = True
-                
-                if m_online and i_frequency > self._grid_frequency_lower_bound and i_frequency < self._grid_frequency_upper_bound:
-                    status_str = GRID_STATUS.get(3)
-                elif not m_online and i_frequency > self._inverter_frequency_lower_bound and i_frequency < self._inverter_frequency_upper_bound:
-                    status_str = GRID_STATUS.get(1)
-                elif i_frequency < 1:
-                    if m_online:
-                        status_str = GRID_STATUS.get(2)
-                    elif m_frequency < 1:
-                        status_str = GRID_STATUS.get(0)
-            if status_str is None:
-                _LOGGER.error(f'Could not establish grid connection status m: {m_frequency} i: {i_frequency}')
-                self.data["grid_status"] = None
-            else:
-                self.data["grid_status"] = status_str
+        self.set_value(meter_prefix + "PhVphA", PhVphA, V_SF,1,0,1000)
+        self.set_value(meter_prefix + "PhVphB", PhVphB, V_SF,1,0,1000)
+        self.set_value(meter_prefix + "PhVphC", PhVphC, V_SF,1,0,1000)
+        self.set_value(meter_prefix + "PPV", PPV, V_SF,1,0,1000)
+        self.set_value(meter_prefix + "exported", TotWhExp, TotWh_SF)
+        self.set_value(meter_prefix + "imported", TotWhImp, TotWh_SF)
+        self.set_value(meter_prefix + "line_frequency", Hz, Hz_SF, 2, 0, 100)
+        self.set_value(meter_prefix + "power", W, W_SF, 2, -50000, 50000)
 
         return True
 
+    async def read_meter_float_data(self, meter_prefix, unit_id):
+        block = self.model_block(unit_id, METER_FLOAT_MODELS)
+        if block is None:
+            return False
+        regs = await self.get_registers(unit_id=unit_id, address=block[0], count=block[1])
+        if regs is None:
+            return False
+
+        values = self.decode_float_model(METER_FLOAT_LAYOUT, regs, meter_prefix)
+        for key, value in values.items():
+            self.data[meter_prefix + key] = value
+
+        return True
+
+    def set_value(self, key, value, sf, digits=2, lower_bound = None, upper_bound = None):
+        """Store the scaled value under key unless the device does not implement the point."""
+        if not self.implemented(key):
+            return
+        self.scale_factors[key] = sf
+        self.data[key] = self.calculate_value(value, sf, digits, lower_bound, upper_bound)
+
+    def guard_counters(self, now):
+        ''' ensure lifetime energy counters are plausible to fullfil the properties of SensorStateClass.TOTAL_INCREASING.
+            Implausible values are replaced by the last plausible value. This avoids wrong spikes in
+            consumption / production on the energy dashboard. The counters of the fleet inverters
+            are checked as well, so the site totals are summed from plausible values.
+        '''
+        for prefix in [''] + [self.fleet_prefix(unit_id) for unit_id in self.fleet_unit_ids]:
+            for key, rated_power_key in LIFETIME_COUNTERS.items():
+                key = prefix + key
+                if key not in self.data:
+                    continue
+                rated_power = self.data.get(prefix + rated_power_key) if rated_power_key else self.meter_rated_power
+                if not self.is_numeric(rated_power) or rated_power <= 0:
+                    rated_power = DEFAULT_RATED_POWER
+                self.data[key] = self.counter_guard.check(key, self.data[key], rated_power, now)
+
+    @staticmethod
+    def fleet_prefix(unit_id) -> str:
+        return f'inv{unit_id}_'
+
+    async def read_fleet_data(self):
+        """Read the inverter and MPPT models of the fleet inverters.
+
+        The inverter read first rotates every cycle, so the same inverter is not always
+        the one skipped when the cycle budget runs out.
+        """
+        if not self.fleet_unit_ids:
+            return
+        self._fleet_offset = (self._fleet_offset + 1) % len(self.fleet_unit_ids)
+        for unit_id in self.fleet_unit_ids[self._fleet_offset:] + self.fleet_unit_ids[:self._fleet_offset]:
+            prefix = self.fleet_prefix(unit_id)
+            await self.read_inverter_data(prefix, unit_id)
+            await self.read_mppt_data(prefix, unit_id)
+            self.data[prefix + 'pv_power'] = self.sum_values([prefix + 'mppt1_power', prefix + 'mppt2_power'])
+
+    def sum_values(self, keys):
+        """Sum of the implemented keys, None if one of them has no value."""
+        values = [self.data.get(key) for key in keys if self.implemented(key)]
+        if not values or not all(self.is_numeric(value) for value in values):
+            return None
+        return round(sum(values), 2)
+
+    def update_site_data(self):
+        """Totals of the primary and the fleet inverters."""
+        if not self.fleet_unit_ids:
+            return
+        prefixes = [''] + [self.fleet_prefix(unit_id) for unit_id in self.fleet_unit_ids]
+        for key in ['acpower', 'pv_power', 'acenergy']:
+            self.data['site_' + key] = self.sum_values([prefix + key for prefix in prefixes])
+
+    def update_derived_data(self):
+        """Calculate derived values once all blocks of a cycle have been read"""
+        return self._derived_metrics.update(self.data)
+
+    def set_sleeping_inverter_data(self):
+        """Set the values of the inverters while they are asleep and their blocks are not read.
+
+        A sleeping inverter produces no power, so the derived values and the integrated energy
+        use 0 instead of the values of the last read. Its line frequency is not measured.
+        """
+        for prefix in [''] + [self.fleet_prefix(unit_id) for unit_id in self.fleet_unit_ids]:
+            for key in SLEEPING_INVERTER_POWERS:
+                if prefix + key in self.data:
+                    self.data[prefix + key] = 0
+            if prefix + 'line_frequency' in self.data:
+                self.data[prefix + 'line_frequency'] = None
+
+    def update_grid_status(self, timestamp, inverter_asleep = False):
+        """Add the frequencies of the cycle to the grid status estimator. Returns (previous, new) on a transition.
+
+        A sleeping inverter counts as not operating.
+        """
+        if not self.meter_configured:
+            return None
+        i_frequency = 0 if inverter_asleep else self.data.get('line_frequency')
+        transition = self.grid_status_estimator.add_sample(timestamp, self.data.get('m1_line_frequency'), i_frequency)
+        self.data['grid_status'] = self.grid_status_estimator.status
+        return transition
+
+    async def read_fast_data(self, keys = ('m1_power',)):
+        """Read the values of keys ('m1_power', 'acpower', 'mppt_power', 'soc') that are sampled faster than the scan interval, outside of the cycle budget. Returns a dict of samples."""
+        samples = {}
+        if 'mppt_power' in keys and self.mppt_configured:
+            samples.update(await self.read_fast_mppt_power())
+        if 'soc' in keys and self.storage_configured:
+            # ChaState of the storage, scale factor -2 like in read_inverter_storage_data
+            block = self.model_block(self._inverter_unit_id, [STORAGE_MODEL])
+            if block is not None:
+                regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0] + STORAGE_SOC_OFFSET, count=1, budgeted=False)
+                if regs is not None:
+                    charge_state = self._client.convert_from_registers(regs[0:1], data_type = self._client.DATATYPE.UINT16)
+                    samples['soc'] = self.calculate_value(charge_state, -2, 2, 0, 100)
+        if 'acpower' in keys:
+            # W and W_SF of the inverter
+            block = self.model_block(self._inverter_unit_id, INVERTER_MODELS)
+            float_block = self.model_block(self._inverter_unit_id, INVERTER_FLOAT_MODELS)
+            if block is not None:
+                regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0] + INVERTER_POWER_OFFSET, count=2, budgeted=False)
+                if regs is not None:
+                    W = self._client.convert_from_registers(regs[0:1], data_type = self._client.DATATYPE.INT16)
+                    W_SF = self._client.convert_from_registers(regs[1:2], data_type = self._client.DATATYPE.INT16)
+                    samples['acpower'] = self.calculate_value(W, W_SF, 2, -50000, 50000)
+            elif float_block is not None:
+                float_regs = await self.get_registers(unit_id=self._inverter_unit_id, address=float_block[0] + INVERTER_FLOAT_POWER_OFFSET, count=2, budgeted=False)
+                if float_regs is not None:
+                    samples['acpower'] = INVERTER_FLOAT_POWER_LAYOUT.decode(float_regs)['acpower']
+        if 'm1_power' in keys and self.meter_configured:
+            # W and W_SF of the first meter
+            unit_id = self._meter_unit_ids[0]
+            block = self.model_block(unit_id, METER_MODELS)
+            float_block = self.model_block(unit_id, METER_FLOAT_MODELS)
+            regs = None
+            if block is not None:
+                regs = await self.get_registers(unit_id=unit_id, address=block[0] + METER_POWER_OFFSET, count=5, budgeted=False)
+            elif float_block is not None:
+                float_regs = await self.get_registers(unit_id=unit_id, address=float_block[0] + METER_FLOAT_POWER_OFFSET, count=2, budgeted=False)
+                if float_regs is not None:
+                    samples['m1_power'] = METER_FLOAT_POWER_LAYOUT.decode(float_regs)['power']
+            if regs is not None:
+                W = self._client.convert_from_registers(regs[0:1], data_type = self._client.DATATYPE.INT16)
+                W_SF = self._client.convert_from_registers(regs[4:5], data_type = self._client.DATATYPE.INT16)
+                samples['m1_power'] = self.calculate_value(W, W_SF, 2, -50000, 50000)
+        return samples
+
+    async def read_fast_mppt_power(self):
+        """DCW of the MPPT modules like in read_mppt_data, the storage modules only with a storage."""
+        block = self.model_block(self._inverter_unit_id, [MPPT_MODEL])
+        if block is None:
+            return {}
+        regs = await self.get_registers(unit_id=self._inverter_unit_id, address=block[0], count=block[1], budgeted=False)
+        if regs is None:
+            return {}
+        DCW_SF = self._client.convert_from_registers(regs[2:3], data_type = self._client.DATATYPE.INT16)
+        modules = min((len(regs) - 8) // 20, 4 if self.storage_configured else 2)
+        samples = {}
+        for module in range(modules):
+            # DCW is the 12th register of a module
+            DCW = self._client.convert_from_registers(regs[19 + module * 20:20 + module * 20], data_type = self._client.DATATYPE.UINT16)
+            samples[f'mppt{module + 1}_power'] = self.calculate_value(DCW, DCW_SF, 2, 0, 15000)
+        return samples
+
     async def read_export_limit_data(self):
         """Read export limit control registers"""
         # Read export limit rate register (40232)
-        rate_regs = await self.get_registers(unit_id=self._inverter_unit_id, address=EXPORT_LIMIT_RATE_ADDRESS, count=1)
+        rate_regs = await self.get_registers(unit_id=self._inverter_unit_id, address=self.export_limit_rate_address, count=1)
         if rate_regs is not None:
             export_limit_rate = self._client.convert_from_registers(rate_regs[0:1], data_type=self._client.DATATYPE.UINT16)
             self.data['export_limit_rate'] = export_limit_rate
@@ -602,10 +914,10 @@ class FroniusModbusClient(ExtModbusClient):
             self.data['export_limit_rate'] = None
 
         # Read export limit enable register (40236)
-        enable_regs = await self.get_registers(unit_id=self._inverter_unit_id, address=EXPORT_LIMIT_ENABLE_ADDRESS, count=1)
+        enable_regs = await self.get_registers(unit_id=self._inverter_unit_id, address=self.export_limit_enable_address, count=1)
         if enable_regs is not None:
             export_limit_enable_raw = self._client.convert_from_registers(enable_regs[0:1], data_type=self._client.DATATYPE.UINT16)
-            self.data['export_limit_enable'] = EXPORT_LIMIT_STATUS.get(export_limit_enable_raw, 'Unknown')
+            self.set_enum('export_limit_enable', export_limit_enable_raw)
         else:
             self.data['export_limit_enable'] = None
 
@@ -615,39 +927,54 @@ class FroniusModbusClient(ExtModbusClient):
         if not mode in [0,1,2,3]:
             _LOGGER.error(f'Attempted to set to unsupported storage control mode. Value: {mode}')
             return
-        await self.write_registers(unit_id=self._inverter_unit_id, address=STORAGE_CONTROL_MODE_ADDRESS, payload=[mode])
+        self.storage_control.expect('StorCtl_Mod', mode)
+        await self.write_registers(unit_id=self._inverter_unit_id, address=self.storage_control_mode_address, payload=[mode])
 
     async def set_minimum_reserve(self, minimum_reserve: float):
         if minimum_reserve < 5:
             _LOGGER.error(f'Attempted to set minimum reserve below 5%. Value: {minimum_reserve}')
             return
         minimum_reserve = round(minimum_reserve * 100)
-        await self.write_registers(unit_id=self._inverter_unit_id, address=MINIMUM_RESERVE_ADDRESS, payload=[minimum_reserve])
+        await self.write_registers(unit_id=self._inverter_unit_id, address=self.minimum_reserve_address, payload=[minimum_reserve])
 
     async def set_discharge_rate_w(self, discharge_rate_w):
-        if discharge_rate_w > self.max_discharge_rate_w:
-            discharge_rate = 100
-        elif discharge_rate_w < self.max_discharge_rate_w * -1:
-            discharge_rate = -100
-        else:
-            discharge_rate = discharge_rate_w / self.max_discharge_rate_w * 100
-        await self.set_discharge_rate(discharge_rate)
+        await self.set_discharge_rate(self.power_to_rate(discharge_rate_w, self.max_discharge_rate_w))
+
+    @property
+    def storage_control_addresses(self) -> dict:
+        return {
+            'StorCtl_Mod': self.storage_control_mode_address,
+            'InWRte': self.charge_rate_address,
+            'OutWRte': self.discharge_rate_address,
+        }
+
+    @staticmethod
+    def signed_register(value):
+        return value - 65536 if value >= 32768 else value
+
+    def rate_to_register(self, rate):
+        """Convert a charge/discharge rate in percent to the register value."""
+        if rate < 0:
+            return int(65536 + (rate * 100))
+        return int(round(rate * 100))
+
+    def power_to_rate(self, power_w, max_power_w):
+        """Convert a power in W to a rate in percent of max_power_w."""
+        if power_w > max_power_w:
+            return 100
+        elif power_w < max_power_w * -1:
+            return -100
+        return power_w / max_power_w * 100
 
     async def set_discharge_rate(self, discharge_rate):
-        if discharge_rate < 0:
-            discharge_rate = int(65536 + (discharge_rate * 100))
-        else:
-            discharge_rate = int(round(discharge_rate * 100))
-        await self.write_registers(unit_id=self._inverter_unit_id, address=DISCHARGE_RATE_ADDRESS, payload=[discharge_rate])
+        discharge_rate = self.rate_to_register(discharge_rate)
+        self.storage_control.expect('OutWRte', discharge_rate)
+        result = await self.write_registers(unit_id=self._inverter_unit_id, address=self.discharge_rate_address, payload=[discharge_rate])
+        if result is not None:
+            self._storage_rates_written_at = time.monotonic()
 
     async def set_charge_rate_w(self, charge_rate_w):
-        if charge_rate_w > self.max_charge_rate_w:
-            charge_rate = 100
-        elif charge_rate_w < self.max_charge_rate_w * -1:
-            charge_rate = -100
-        else:
-            charge_rate = charge_rate_w / self.max_charge_rate_w * 100
-        await self.set_charge_rate(charge_rate)
+        await self.set_charge_rate(self.power_to_rate(charge_rate_w, self.max_charge_rate_w))
 
     async def set_grid_charge_power(self, value):
         """value is in W from HA, store percent internally."""
@@ -689,12 +1016,28 @@ class FroniusModbusClient(ExtModbusClient):
         elif self.storage_extended_control_mode in [0]:
             return
 
+    async def write_raw_registers(self, unit_id, address, values):
+        """Write raw registers, also when they are known to hold the values already.
+
+        Storage control registers in the written range are expected from now on, so the next
+        comparison does not report them as changed outside of Home Assistant.
+        """
+        result = await self.write_registers(unit_id=unit_id, address=address, payload=values, skip_unchanged=False)
+        if unit_id != self._inverter_unit_id or not self.storage_configured:
+            return result
+        for point, point_address in self.storage_control_addresses.items():
+            if address <= point_address < address + len(values):
+                self.storage_control.expect(point, values[point_address - address])
+                if point in ['InWRte', 'OutWRte']:
+                    self._storage_rates_written_at = time.monotonic()
+        return result
+
     async def set_charge_rate(self, charge_rate):
-        if charge_rate < 0:
-            charge_rate =  int(65536 + (charge_rate * 100))
-        else:
-            charge_rate = int(round(charge_rate * 100))
-        await self.write_registers(unit_id=self._inverter_unit_id, address=CHARGE_RATE_ADDRESS, payload=[charge_rate])
+        charge_rate = self.rate_to_register(charge_rate)
+        self.storage_control.expect('InWRte', charge_rate)
+        result = await self.write_registers(unit_id=self._inverter_unit_id, address=self.charge_rate_address, payload=[charge_rate])
+        if result is not None:
+            self._storage_rates_written_at = time.monotonic()
 
     async def change_settings(self, mode, charge_limit, discharge_limit, grid_charge_power=0, grid_discharge_power=0, minimum_reserve=None):
         await self.set_storage_control_mode(mode)
@@ -714,6 +1057,98 @@ class FroniusModbusClient(ExtModbusClient):
         if not minimum_reserve is None:
             await self.set_minimum_reserve(minimum_reserve)
         
+    def storage_mode_rates(self, ext_mode, charge_power=None, discharge_power=None):
+        """Storage control mode, charge rate and discharge rate in percent for an extended control mode.
+
+        charge_power is the PV charge limit, or the grid charge power in mode 4.
+        discharge_power is the discharge limit, or the grid discharge power in mode 5.
+        """
+        charge_rate = 100 if charge_power is None else self.power_to_rate(charge_power, self.max_charge_rate_w)
+        discharge_rate = 100 if discharge_power is None else self.power_to_rate(discharge_power, self.max_discharge_rate_w)
+        if ext_mode == 0:
+            return 0, 100, 100
+        elif ext_mode == 1:
+            return 1, charge_rate, 100
+        elif ext_mode == 2:
+            return 2, 100, discharge_rate
+        elif ext_mode == 3:
+            return 3, charge_rate, discharge_rate
+        elif ext_mode == 4:
+            return 2, 100, 0 if charge_power is None else self.power_to_rate(charge_power * -1, self.max_discharge_rate_w)
+        elif ext_mode == 5:
+            return 1, 0 if discharge_power is None else self.power_to_rate(discharge_power * -1, self.max_charge_rate_w), 100
+        elif ext_mode == 6:
+            return 3, charge_rate, 0
+        elif ext_mode == 7:
+            return 3, 0, discharge_rate
+        raise ValueError(f'Unsupported extended storage control mode {ext_mode}')
+
+    async def apply_storage_mode(self, ext_mode, charge_power=None, discharge_power=None, minimum_reserve=None, refresh_margin=0):
+        """Apply an extended storage control mode, writing only the registers that differ from the cached values.
+
+        The charge and discharge rates are written again when the revert timeout of the inverter
+        expires within refresh_margin seconds. Returns the addresses that were written.
+        """
+        mode, charge_rate, discharge_rate = self.storage_mode_rates(ext_mode, charge_power, discharge_power)
+        targets = {
+            self.storage_control_mode_address: mode,
+            self.discharge_rate_address: self.rate_to_register(discharge_rate),
+            self.charge_rate_address: self.rate_to_register(charge_rate),
+        }
+        if minimum_reserve is not None:
+            if minimum_reserve < 5:
+                raise ValueError(f'Minimum reserve below 5%. Value: {minimum_reserve}')
+            targets[self.minimum_reserve_address] = round(minimum_reserve * 100)
+        for point, address in self.storage_control_addresses.items():
+            self.storage_control.expect(point, targets[address])
+
+        refresh_rates = (
+            mode != 0
+            and self.storage_revert_timeout > 0
+            and (self._storage_rates_written_at is None
+                 or time.monotonic() - self._storage_rates_written_at > self.storage_revert_timeout - refresh_margin)
+        )
+
+        written = []
+        for address, value in targets.items():
+            refresh = refresh_rates and address in [self.discharge_rate_address, self.charge_rate_address]
+            result = await self.write_registers(unit_id=self._inverter_unit_id, address=address, payload=[value], skip_unchanged=not refresh)
+            if result is not None:
+                written.append(address)
+        if self.discharge_rate_address in written or self.charge_rate_address in written:
+            self._storage_rates_written_at = time.monotonic()
+
+        self.storage_extended_control_mode = ext_mode
+        self.data['ext_control_mode'] = STORAGE_EXT_CONTROL_MODE[ext_mode]
+        self.data['charge_limit'] = max(charge_rate, 0)
+        self.data['grid_discharge_power'] = max(charge_rate * -1, 0)
+        self.data['discharge_limit'] = max(discharge_rate, 0)
+        self.data['grid_charge_power'] = max(discharge_rate * -1, 0)
+        if written:
+            _LOGGER.info(f"Applied storage mode {ext_mode} written registers: {written}")
+        return written
+
+    def storage_settings(self) -> dict:
+        """Storage control registers, minimum reserve and extended mode, to restore them after a temporary change."""
+        return {
+            'registers': dict(self.storage_control.desired),
+            'minimum_reserve': self.data.get('minimum_reserve'),
+            'ext_mode': self.storage_extended_control_mode,
+        }
+
+    async def restore_storage_settings(self, settings):
+        """Write the storage settings from storage_settings() again, only the registers that changed."""
+        for point, value in settings['registers'].items():
+            self.storage_control.expect(point, value)
+            result = await self.write_registers(unit_id=self._inverter_unit_id, address=self.storage_control_addresses[point], payload=[value])
+            if result is not None and point in ['InWRte', 'OutWRte']:
+                self._storage_rates_written_at = time.monotonic()
+        if settings['minimum_reserve'] is not None:
+            await self.set_minimum_reserve(settings['minimum_reserve'])
+        self.storage_extended_control_mode = settings['ext_mode']
+        self.data['ext_control_mode'] = STORAGE_EXT_CONTROL_MODE[settings['ext_mode']]
+        _LOGGER.info(f"Restored storage settings {settings}")
+
     async def restore_defaults(self):
         await self.change_settings(mode=0, charge_limit=100, discharge_limit=100, minimum_reserve=7)
         _LOGGER.info(f"restored defaults")
@@ -779,31 +1214,33 @@ class FroniusModbusClient(ExtModbusClient):
         self.storage_extended_control_mode = 7
         _LOGGER.info(f"Block charging at {discharge_rate}")
 
-    async def set_calibrate_mode(self):
-        await self.change_settings(mode=2, charge_limit=100, discharge_limit=-100, grid_charge_power=100)
-        self.storage_extended_control_mode = 8
-        _LOGGER.info(f"Auto mode")
 
+    @staticmethod
+    def export_limit_register(rate) -> int:
+        """Register value of an export limit rate (100-10000, where 10000=100%, minimum 1%)"""
+        return int(round(min(max(rate, 100), 10000)))
 
     async def set_export_limit_rate(self, rate):
         """Set export limit rate (100-10000, where 10000=100%, minimum 1%)"""
-        if rate < 100:
-            rate = 100
-        elif rate > 10000:
-            rate = 10000
-        await self.write_registers(unit_id=self._inverter_unit_id, address=EXPORT_LIMIT_RATE_ADDRESS, payload=[int(rate)])
+        rate = self.export_limit_register(rate)
+        await self.write_registers(unit_id=self._inverter_unit_id, address=self.export_limit_rate_address, payload=[rate])
+        # the value written, like the value read in read_export_limit_data
         self.data['export_limit_rate'] = rate
         _LOGGER.info(f"Set export limit rate to {rate}")
 
     async def set_export_limit_enable(self, enable):
         """Enable/disable export limit (0=Disabled, 1=Enabled)"""
         enable_value = 1 if enable else 0
-        await self.write_registers(unit_id=self._inverter_unit_id, address=EXPORT_LIMIT_ENABLE_ADDRESS, payload=[enable_value])
-        self.data['export_limit_enable'] = enable_value
+        await self.write_registers(unit_id=self._inverter_unit_id, address=self.export_limit_enable_address, payload=[enable_value])
+        self.set_enum('export_limit_enable', enable_value)
         _LOGGER.info(f"Set export limit enable to {enable_value}")
 
     async def apply_export_limit(self, rate):
         """Apply export limit by first disabling, then setting rate, then enabling"""
+        if (self.registers_unchanged(self._inverter_unit_id, self.export_limit_rate_address, [self.export_limit_register(rate)])
+            and self.registers_unchanged(self._inverter_unit_id, self.export_limit_enable_address, [1])):
+            _LOGGER.debug(f"Export limit rate={rate} already applied")
+            return
         await self.set_export_limit_enable(0)  # Disable first
         await asyncio.sleep(1.0)
         await self.set_export_limit_rate(rate)  # Set new rate
@@ -814,6 +1251,6 @@ class FroniusModbusClient(ExtModbusClient):
     async def set_conn_status(self, enable):
         """Enable/disable inverter connection (0=Disconnected/Standby, 1=Connected/Normal)"""
         conn_value = 1 if enable else 0
-        await self.write_registers(unit_id=self._inverter_unit_id, address=CONN_ADDRESS, payload=[conn_value])
-        self.data['Conn'] = CONTROL_STATUS[conn_value]
+        await self.write_registers(unit_id=self._inverter_unit_id, address=self.conn_address, payload=[conn_value])
+        self.set_enum('Conn', conn_value)
         _LOGGER.info(f"Set inverter connection status to {conn_value} ({'Connected' if enable else 'Disconnected/Standby'})")
@@ -15,6 +15,62 @@ EXPORT_LIMIT_RATE_ADDRESS = 40232
 EXPORT_LIMIT_ENABLE_ADDRESS = 40236
 CONN_ADDRESS = 40231
 
+# SunSpec model ids
+COMMON_MODEL = 1
+# int+SF single, split and three phase models share the same layout
+INVERTER_MODELS = [101, 102, 103]
+NAMEPLATE_MODEL = 120
+SETTINGS_MODEL = 121
+STATUS_MODEL = 122
+CONTROLS_MODEL = 123
+STORAGE_MODEL = 124
+MPPT_MODEL = 160
+METER_MODELS = [201, 202, 203]
+
+# Model id -> (address, length) of the model data of a GEN24 in int+SF mode.
+# Used when the SunSpec model chain of a device cannot be read.
+DEFAULT_INVERTER_MODELS = {
+    COMMON_MODEL: (COMMON_ADDRESS, 65),
+    103: (INVERTER_ADDRESS, 50),
+    NAMEPLATE_MODEL: (NAMEPLATE_ADDRESS, 26),
+    SETTINGS_MODEL: (40151, 30),
+    STATUS_MODEL: (40183, 44),
+    CONTROLS_MODEL: (40229, 24),
+    MPPT_MODEL: (MPPT_ADDRESS, 88),
+    STORAGE_MODEL: (STORAGE_ADDRESS, 24),
+}
+DEFAULT_METER_MODELS = {
+    COMMON_MODEL: (COMMON_ADDRESS, 65),
+    203: (METER_ADDRESS, 105),
+}
+
+# Register offsets within the model data
+CONN_OFFSET = 2                     # model 123 Conn
+EXPORT_LIMIT_RATE_OFFSET = 3        # model 123 WMaxLimPct
+EXPORT_LIMIT_ENABLE_OFFSET = 7      # model 123 WMaxLim_Ena
+STORAGE_CONTROL_MODE_OFFSET = 3     # model 124 StorCtl_Mod
+MINIMUM_RESERVE_OFFSET = 5          # model 124 MinRsvPct
+DISCHARGE_RATE_OFFSET = 10          # model 124 OutWRte
+CHARGE_RATE_OFFSET = 11             # model 124 InWRte
+METER_POWER_OFFSET = 16             # model 20x W
+INVERTER_POWER_OFFSET = 12          # model 10x W
+STORAGE_SOC_OFFSET = 6              # model 124 ChaState
+
+# Rated power used when a device does not report one, and of the meters unless configured
+DEFAULT_RATED_POWER = 50000
+
+# Lifetime energy counters (TOTAL_INCREASING) and the data key of the rated power
+# that limits how fast each of them can increase. None uses the rated power of the meter.
+LIFETIME_COUNTERS = {
+    'acenergy': 'max_power',
+    'mppt1_lfte': 'max_power',
+    'mppt2_lfte': 'max_power',
+    'mppt3_lfte': 'MaxChaRte',
+    'mppt4_lfte': 'MaxDisChaRte',
+    'm1_exported': None,
+    'm1_imported': None,
+}
+
     # Manufacturer
     # Type
     # Firmware
@@ -54,12 +110,91 @@ INVERTER_CONTROLS = [
     'Constant power factor',
 ]
 
-INVERTER_EVENTS = [
-    'Error',
-    'Warning',
-    'Info',
+# Fronius vendor event flags (EvtVnd1, EvtVnd2, EvtVnd3), by bit
+FRONIUS_EVENTS_1 = [
+    'Insulation fault',
+    'Grid error',
+    'AC overcurrent',
+    'DC overcurrent',
+    'Over temperature',
+    'Power low',
+    'DC low',
+    'Intermediate circuit fault',
+    'Frequency high',
+    'Frequency low',
+    'AC voltage high',
+    'AC voltage low',
+    'Direct current feed in',
+    'Relay fault',
+    'Power stage fault',
+    'Control fault',
+    'Grid voltage error',
+    'Grid frequency error',
+    'Energy transfer fault',
+    'AC reference power source fault',
+    'Anti islanding fault',
+    'Fixed voltage fault',
+    'Memory fault',
+    'Display fault',
+    'Communication fault',
+    'Temperature sensor fault',
+    'DC/AC board fault',
+    'ENS fault',
+    'Fan fault',
+    'Defective fuse',
+    'Output choke fault',
+    'Converter relay fault',
 ]
 
+FRONIUS_EVENTS_2 = [
+    'No Solar Net communication',
+    'Inverter address fault',
+    'No feed in for 24 hours',
+    'Plug fault',
+    'Phase allocation fault',
+    'Grid conductor open',
+    'Software issue',
+    'Power derating',
+    'Jumper incorrect',
+    'Incompatible feature',
+    'Vents blocked',
+    'Power reduction error',
+    'Arc detected',
+    'AFCI self test failed',
+    'Current sensor error',
+    'DC switch fault',
+    'AFCI defective',
+    'AFCI manual test ok',
+    'Power stage supply issue',
+    'AFCI no communication',
+    'AFCI manual test failed',
+    'AC polarity reversed',
+    'Faulty AC device',
+    'Flash fault',
+    'General error',
+    'Grounding issue',
+    'Limitation fault',
+    'Open contact',
+    'Overvoltage protection',
+    'Program status',
+    'Solar Net issue',
+    'Supply voltage fault',
+]
+
+FRONIUS_EVENTS_3 = [
+    'Time fault',
+    'USB fault',
+    'DC high',
+    'Init error',
+]
+
+# event register -> labels of its bits
+INVERTER_EVENT_REGISTERS = {
+    'EvtVnd1': FRONIUS_EVENTS_1,
+    'EvtVnd2': FRONIUS_EVENTS_2,
+    'EvtVnd3': FRONIUS_EVENTS_3,
+}
+
 FRONIUS_INVERTER_STATUS = {
     1: 'Off',
     2: 'Sleeping',
@@ -75,6 +210,14 @@ FRONIUS_INVERTER_STATUS = {
     12: 'Firmware updating',
     13: 'ACFI event',
 }
+# statuses in which the inverter may answer the not implemented value for the points it implements
+INVERTER_SLEEP_STATUSES = ['Sleeping', 'Standby']
+# power values of an inverter that is asleep, 0 while its blocks are not read
+SLEEPING_INVERTER_POWERS = ['acpower', 'pv_power', 'mppt1_power', 'mppt2_power', 'mppt3_power', 'mppt4_power']
+# values of the fast lane read from the inverter
+INVERTER_FAST_KEYS = ['acpower', 'mppt_power']
+# values of the fast lane for the integrated energy, mppt_power are the powers of all MPPT modules
+ENERGY_FAST_KEYS = ['m1_power', 'acpower', 'mppt_power']
 
 CHARGE_GRID_STATUS = {
     1: 'Disabled',
@@ -127,3 +270,19 @@ STORAGE_EXT_CONTROL_MODE = {
     7: 'Block Charging',
 #    8: 'Calibrate',
 }
+
+# data key -> labels of the raw codes of the enum points read from the device
+ENUM_POINTS = {
+    'statusvendor': FRONIUS_INVERTER_STATUS,
+    'pv_connection': CONNECTION_STATUS_CONDENSED,
+    'storage_connection': CONNECTION_STATUS_CONDENSED,
+    'ecp_connection': ECP_CONNECTION_STATUS,
+    'Conn': CONTROL_STATUS,
+    'WMaxLim_Ena': CONTROL_STATUS,
+    'OutPFSet_Ena': CONTROL_STATUS,
+    'VArPct_Ena': CONTROL_STATUS,
+    'grid_charging': CHARGE_GRID_STATUS,
+    'charge_status': CHARGE_STATUS,
+    'control_mode': STORAGE_CONTROL_MODE,
+    'export_limit_enable': EXPORT_LIMIT_STATUS,
+}
@@ -0,0 +1,96 @@
+"""Grid status estimation from meter and inverter frequency."""
+
+import logging
+from collections import deque
+from statistics import median
+
+from .froniusmodbusclient_const import (
+    GRID_STATUS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+OFF_GRID = GRID_STATUS[0]
+OFF_GRID_OPERATING = GRID_STATUS[1]
+ON_GRID = GRID_STATUS[2]
+ON_GRID_OPERATING = GRID_STATUS[3]
+
+
+class GridStatusEstimator:
+    """Classifies the grid status over a sliding window of frequency samples.
+
+    The meter frequency shows whether the grid is present, the inverter frequency
+    whether the inverter is operating (on grid or in backup mode, e.g. at 53 Hz).
+    The medians of the last window samples are classified, so a single noisy
+    sample does not change the status. The meter is considered online within
+    grid_tolerance of the nominal frequency, and stays online until it leaves the
+    band widened by grid_hysteresis. A new status is only adopted after it has been
+    classified for its dwell time; returning to the grid uses a longer dwell time
+    than an outage, so outages are reported quickly without flapping.
+    """
+
+    def __init__(self, window=3, nominal_frequency=50, grid_tolerance=0.2, grid_hysteresis=0.1, inverter_tolerance=5, on_grid_dwell=30, off_grid_dwell=0):
+        self._m_frequencies = deque(maxlen=window)
+        self._i_frequencies = deque(maxlen=window)
+        self._nominal_frequency = nominal_frequency
+        self._grid_tolerance = grid_tolerance
+        self._grid_hysteresis = grid_hysteresis
+        self._inverter_tolerance = inverter_tolerance
+        self._dwell = {
+            ON_GRID: on_grid_dwell,
+            ON_GRID_OPERATING: on_grid_dwell,
+            OFF_GRID: off_grid_dwell,
+            OFF_GRID_OPERATING: off_grid_dwell,
+        }
+        self.status = None
+        self._candidate = None
+        self._candidate_since = None
+
+    @staticmethod
+    def _is_numeric(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def classify(self):
+        """Status from the current window, None if there are no samples."""
+        if not self._m_frequencies or not self._i_frequencies:
+            return None
+        m_frequency = median(self._m_frequencies)
+        i_frequency = median(self._i_frequencies)
+
+        tolerance = self._grid_tolerance
+        if self.status in [ON_GRID, ON_GRID_OPERATING]:
+            tolerance += self._grid_hysteresis
+        m_online = abs(m_frequency - self._nominal_frequency) < tolerance
+        i_operating = abs(i_frequency - self._nominal_frequency) < self._inverter_tolerance
+
+        if m_online:
+            return ON_GRID_OPERATING if i_operating else ON_GRID
+        return OFF_GRID_OPERATING if i_operating else OFF_GRID
+
+    def add_sample(self, timestamp, m_frequency, i_frequency):
+        """Add a sample. Returns (previous, new) status on a transition, otherwise None."""
+        if self._is_numeric(m_frequency):
+            self._m_frequencies.append(m_frequency)
+        if self._is_numeric(i_frequency):
+            self._i_frequencies.append(i_frequency)
+
+        status = self.classify()
+        if status is None or status == self.status:
+            self._candidate = None
+            return None
+
+        if self.status is None:
+            self.status = status
+            return None
+
+        if status != self._candidate:
+            self._candidate = status
+            self._candidate_since = timestamp
+        if timestamp - self._candidate_since < self._dwell[status]:
+            return None
+
+        previous = self.status
+        self.status = status
+        self._candidate = None
+        _LOGGER.info(f'Grid status changed from {previous} to {status}')
+        return previous, status
@@ -1,7 +1,9 @@
 """Fronius Modbus Hub."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import timedelta
 from typing import Optional
 from importlib.metadata import version
@@ -10,18 +12,89 @@ from packaging import version as pkg_version
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .froniusmodbusclient import FroniusModbusClient
+from .energyintegrator import EnergyIntegrator, INTEGRATED_ENERGY_SOURCES, fast_energy_powers
+from .schedule import BatterySchedule
+from .exportcontrol import ExportLimitController
+from .pollscheduler import get_poll_scheduler
+from .samplestatistics import SampleStatistics
+from .calibration import BatteryCalibration, IDLE
+from .activity import InverterActivity, FULL, REDUCED
+from .froniusmodbusclient_const import INVERTER_FAST_KEYS, ENERGY_FAST_KEYS
 
 from .const import (
     DOMAIN,
     ENTITY_PREFIX,
+    STORE_VERSION,
+    ENERGY_INTEGRATION_MAX_GAP_CYCLES,
+    ENERGY_STORE_SAVE_DELAY,
+    SCHEDULE_UPDATE_INTERVAL,
+    CALIBRATION_PHASE_TIMEOUT,
+    KEEPALIVE_INTERVAL,
+    SLEEP_PROBE_INTERVAL,
+    REGISTER_CACHE_TTL_CYCLES,
+    FAST_POLL_INTERVAL,
+    CYCLE_BUDGET_FRACTION,
+    CONF_FRAMER,
+    CONF_TCP_KEEPALIVE,
+    CONF_TCP_NODELAY,
+    DEFAULT_FRAMER,
+    DEFAULT_TCP_KEEPALIVE,
+    DEFAULT_TCP_NODELAY,
+    EVENT_GRID_STATUS_CHANGED,
+    EVENT_INVERTER_EVENT,
+    CONF_EXPORT_CONTROL,
+    CONF_EXPORT_CONTROL_TARGET,
+    CONF_EXPORT_CONTROL_KP,
+    CONF_EXPORT_CONTROL_KI,
+    CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL,
+    DEFAULT_EXPORT_CONTROL_TARGET,
+    DEFAULT_EXPORT_CONTROL_KP,
+    DEFAULT_EXPORT_CONTROL_KI,
+    DEFAULT_EXPORT_CONTROL_MIN_WRITE_INTERVAL,
+    CONF_FLEET_UNIT_IDS,
+    DEFAULT_FLEET_UNIT_IDS,
+    MAX_FLEET_INVERTERS,
+    CONF_FAST_STATISTICS,
+    CONF_FAST_ENERGY,
+    CONF_SIGNIFICANT_CHANGE,
+    CONF_STORAGE_CONTROL_POLICY,
+    DEFAULT_STORAGE_CONTROL_POLICY,
+    CONF_STATE_HEARTBEAT,
+    DEFAULT_SIGNIFICANT_CHANGE,
+    DEFAULT_STATE_HEARTBEAT,
+    CONF_SLEEP_POLLING,
+    DEFAULT_SLEEP_POLLING,
+    CONF_METER_RATED_POWER,
+    DEFAULT_METER_RATED_POWER,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def parse_unit_ids(value: str) -> list:
+    """Unit ids of a comma separated list such as '2, 3'. Raises ValueError if one is not a valid unit id."""
+    unit_ids = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        unit_id = int(part)
+        if not 1 <= unit_id <= 247:
+            raise ValueError(f'Invalid unit id {unit_id}')
+        unit_ids.append(unit_id)
+    if len(unit_ids) > MAX_FLEET_INVERTERS:
+        raise ValueError(f'More than {MAX_FLEET_INVERTERS} unit ids')
+    if len(unit_ids) > len(set(unit_ids)):
+        raise ValueError(f'Unit ids are not unique {unit_ids}')
+    return unit_ids
+
+
 class FroniusCoordinator(DataUpdateCoordinator):
     """Coordinator for Fronius Modbus data updates."""
 
@@ -31,48 +104,89 @@ class FroniusCoordinator(DataUpdateCoordinator):
             hass,
             _LOGGER,
             name=f"{DOMAIN}_{hub._id}_coordinator",
-            update_interval=hub._scan_interval,
+            # updates are started by the poll scheduler of the domain
+            update_interval=None,
         )
         self.hub = hub
 
+    async def _timed(self, block, read):
+        """Await the read of a block and add its duration to the block timings of the hub."""
+        started = time.monotonic()
+        try:
+            with self.hub._client.reading_block(block):
+                return await read
+        finally:
+            timing = self.hub.block_timings.setdefault(block, {'reads': 0, 'seconds': 0.0, 'last': 0.0})
+            timing['last'] = time.monotonic() - started
+            timing['reads'] += 1
+            timing['seconds'] += timing['last']
+
     async def _async_update_data(self) -> dict:
         """Fetch all data from Fronius device."""
+        self.hub._client.start_cycle(self.hub.cycle_budget)
+        # only the meter and the storage are read while the inverter is asleep, the inverter blocks as a probe
+        read_inverter = self.hub.read_inverter_blocks()
         try:
-            # Read inverter data
-            await self.hub._client.read_inverter_data()
+            if read_inverter:
+                # Read inverter data
+                await self._timed('inverter', self.hub._client.read_inverter_data())
 
-            # Read inverter status data
-            await self.hub._client.read_inverter_status_data()
+                # Read inverter status data
+                await self._timed('status', self.hub._client.read_inverter_status_data())
 
-            # Read inverter model settings data
-            await self.hub._client.read_inverter_model_settings_data()
+                # Read inverter model settings data
+                await self._timed('settings', self.hub._client.read_inverter_model_settings_data())
 
-            # Read inverter controls data
-            await self.hub._client.read_inverter_controls_data()
+                # Read inverter controls data
+                await self._timed('controls', self.hub._client.read_inverter_controls_data())
 
             # Read meter data if configured
             if self.hub._client.meter_configured:
                 for meter_address in self.hub._client._meter_unit_ids:
-                    await self.hub._client.read_meter_data(
+                    await self._timed('meter', self.hub._client.read_meter_data(
                         meter_prefix="m1_",
                         unit_id=meter_address
-                    )
+                    ))
 
             # Read MPPT data if configured
-            if self.hub._client.mppt_configured:
-                await self.hub._client.read_mppt_data()
+            if read_inverter and self.hub._client.mppt_configured:
+                await self._timed('mppt', self.hub._client.read_mppt_data())
 
             # Read export limit data
-            await self.hub._client.read_export_limit_data()
+            if read_inverter:
+                await self._timed('export_limit', self.hub._client.read_export_limit_data())
 
             # Read storage data if configured
             if self.hub._client.storage_configured:
-                await self.hub._client.read_inverter_storage_data()
+                # not reconciled while a storage control change of the hub is being written
+                await self._timed('storage', self.hub._client.read_inverter_storage_data(reconcile=not self.hub.writing))
+
+            # Read the further inverters behind the gateway
+            if read_inverter:
+                await self._timed('fleet', self.hub._client.read_fleet_data())
+
+            if not read_inverter:
+                self.hub._client.set_sleeping_inverter_data()
+
+            # Check lifetime counters and calculate derived values from the complete snapshot
+            self.hub.guard_counters()
+            self.hub.store_capabilities()
+            self.hub._client.update_derived_data()
+            self.hub._client.update_site_data()
+            self.hub.update_grid_status(inverter_asleep=not read_inverter)
+            self.hub.update_events()
+            self.hub.update_energy_data()
+            self.hub.update_statistics()
+            self.hub.update_activity(read_inverter)
+            self.hub.update_connection_data()
+            self.hub.snapshot_version += 1
 
             return self.hub.data
 
         except Exception as err:
             raise UpdateFailed(f"Fronius data update failed: {err}")
+        finally:
+            self.hub._client.end_cycle()
 
 
 class Hub:
@@ -80,38 +194,100 @@ class Hub:
 
     PYMODBUS_VERSION = '3.11.2'
 
-    def __init__(self, hass: HomeAssistant, name: str, host: str, port: int, inverter_unit_id: int, meter_unit_ids, scan_interval: int) -> None:
+    def __init__(self, hass: HomeAssistant, name: str, host: str, port: int, inverter_unit_id: int, meter_unit_ids, scan_interval: int, options: dict = None) -> None:
         """Init hub."""
         self._hass = hass
+        options = options or {}
         self._name = name
         self._entity_prefix = f'{ENTITY_PREFIX}_{name.lower()}_'
 
         self._id = f'{name.lower()}_{host.lower().replace('.','')}'
         self.online = True
 
-        self._client = FroniusModbusClient(host=host, port=port, inverter_unit_id=inverter_unit_id, meter_unit_ids=meter_unit_ids, timeout=max(3, (scan_interval - 1)))
+        self._client = FroniusModbusClient(
+            host=host,
+            port=port,
+            inverter_unit_id=inverter_unit_id,
+            meter_unit_ids=meter_unit_ids,
+            timeout=max(3, (scan_interval - 1)),
+            register_cache_ttl=scan_interval * REGISTER_CACHE_TTL_CYCLES,
+            framer=options.get(CONF_FRAMER, DEFAULT_FRAMER),
+            tcp_keepalive=options.get(CONF_TCP_KEEPALIVE, DEFAULT_TCP_KEEPALIVE),
+            tcp_nodelay=options.get(CONF_TCP_NODELAY, DEFAULT_TCP_NODELAY),
+            fleet_unit_ids=parse_unit_ids(options.get(CONF_FLEET_UNIT_IDS, DEFAULT_FLEET_UNIT_IDS)),
+            storage_control_policy=options.get(CONF_STORAGE_CONTROL_POLICY, DEFAULT_STORAGE_CONTROL_POLICY),
+            meter_rated_power=options.get(CONF_METER_RATED_POWER, DEFAULT_METER_RATED_POWER),
+        )
         self._scan_interval = timedelta(seconds=scan_interval)
+        self.cycle_budget = scan_interval * CYCLE_BUDGET_FRACTION
         self.coordinator = None
-        self._busy = False
-
-    def toggle_busy(func):
+        self._first_refresh_duration = 0
+        # block -> {'reads': n, 'seconds': total, 'last': seconds} of the coordinator reads
+        self.block_timings = {}
+        # incremented with every completed update
+        self.snapshot_version = 0
+        # serializes the writes of the users, the schedule, the calibration and the export control
+        self._write_lock = asyncio.Lock()
+
+        self._energy_integrator = EnergyIntegrator(INTEGRATED_ENERGY_SOURCES, max_gap=scan_interval * ENERGY_INTEGRATION_MAX_GAP_CYCLES)
+        self._energy_store = Store(hass, STORE_VERSION, f'{DOMAIN}.{self._id}_energy')
+        self._counter_store = Store(hass, STORE_VERSION, f'{DOMAIN}.{self._id}_counters')
+        # the capabilities are stored, so the sensors of points that are not implemented are not created on a start
+        self._capability_store = Store(hass, STORE_VERSION, f'{DOMAIN}.{self._id}_capabilities')
+        self._stored_capabilities = {}
+
+        self._schedule = BatterySchedule()
+        self._schedule_store = Store(hass, STORE_VERSION, f'{DOMAIN}.{self._id}_schedule')
+
+        # (listener, keys) called with the samples of every fast poll
+        self._fast_listeners = []
+        self._fast_keys = set()
+        self._fast_poll_running = False
+        self._fast_lane_cancel = None
+
+        self._calibration = None
+        self.data['calibration_phase'] = IDLE
+        self.data['calibration_progress'] = None
+
+        self._fast_statistics = options.get(CONF_FAST_STATISTICS, False)
+        self._fast_energy = options.get(CONF_FAST_ENERGY, False)
+
+        self._activity = None
+        if options.get(CONF_SLEEP_POLLING, DEFAULT_SLEEP_POLLING):
+            self._activity = InverterActivity(SLEEP_PROBE_INTERVAL)
+        self.data['polling'] = FULL
+
+        self.significant_change = options.get(CONF_SIGNIFICANT_CHANGE, DEFAULT_SIGNIFICANT_CHANGE)
+        self.state_heartbeat = options.get(CONF_STATE_HEARTBEAT, DEFAULT_STATE_HEARTBEAT)
+        self._sample_statistics = None
+
+        self._export_controller = None
+        # (export limit rate, enabled) before the export control started and the function to stop it
+        self._export_limit_before = None
+        self._remove_export_control = None
+        if options.get(CONF_EXPORT_CONTROL, False):
+            self._export_controller = ExportLimitController(
+                target=options.get(CONF_EXPORT_CONTROL_TARGET, DEFAULT_EXPORT_CONTROL_TARGET),
+                kp=options.get(CONF_EXPORT_CONTROL_KP, DEFAULT_EXPORT_CONTROL_KP),
+                ki=options.get(CONF_EXPORT_CONTROL_KI, DEFAULT_EXPORT_CONTROL_KI),
+                min_write_interval=options.get(CONF_EXPORT_CONTROL_MIN_WRITE_INTERVAL, DEFAULT_EXPORT_CONTROL_MIN_WRITE_INTERVAL),
+            )
+
+    def serialize_writes(func):
+        """Run func after the writes of the hub started before it, so overlapping writes are not lost."""
         async def wrapper(self, *args, **kwargs):
-            if self._busy:
-                #_LOGGER.debug(f"skip {func.__name__} hub busy") 
-                return
-            self._busy = True
-            error = None
-            try:
-                result = await func(self, *args, **kwargs)
-            except Exception as e:
-                _LOGGER.warning(f'Exception in wrapper {e}')
-                error = e
-            self._busy = False
-            if not error is None:
-                raise error
-            return result
+            async with self._write_lock:
+                try:
+                    return await func(self, *args, **kwargs)
+                except Exception as e:
+                    _LOGGER.warning(f'Exception in {func.__name__} {e}')
+                    raise
         return wrapper
 
+    @property
+    def writing(self) -> bool:
+        return self._write_lock.locked()
+
     async def init_data(self, close = False, read_status_data = False):
         """Initialize data and coordinator."""
         await self._hass.async_add_executor_job(self.check_pymodbus_version)
@@ -120,9 +296,21 @@ class Hub:
         if self.storage_configured:
             result : bool = await self._hass.async_add_executor_job(self._client.get_json_storage_info)
 
+        self._energy_integrator.restore(await self._energy_store.async_load())
+        self._client.counter_guard.restore(await self._counter_store.async_load())
+        self._client.restore_capabilities(await self._capability_store.async_load(), self.data.get('i_serial'))
+        self._stored_capabilities = dict(self._client.capabilities)
+
+        try:
+            self._schedule = BatterySchedule.from_dict(await self._schedule_store.async_load())
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Invalid stored battery schedule, ignoring it: {e}")
+
         # Initialize the coordinator
         self.coordinator = FroniusCoordinator(self._hass, self)
+        started = time.monotonic()
         await self.coordinator.async_config_entry_first_refresh()
+        self._first_refresh_duration = time.monotonic() - started
 
         return
 
@@ -145,6 +333,297 @@ class Hub:
             _LOGGER.error(f"Error checking pymodbus version: {e}")
             raise
 
+    def guard_counters(self):
+        """Check the lifetime counters of the current cycle and persist the last plausible values."""
+        self._client.guard_counters(time.time())
+        self._counter_store.async_delay_save(lambda: self._client.counter_guard.state, ENERGY_STORE_SAVE_DELAY)
+
+    def store_capabilities(self):
+        """Persist the capabilities when points were decided since they were stored."""
+        if self._client.capabilities == self._stored_capabilities:
+            return
+        self._stored_capabilities = dict(self._client.capabilities)
+        self._capability_store.async_delay_save(lambda: self._client.capability_state(self.data.get('i_serial')), ENERGY_STORE_SAVE_DELAY)
+
+    def update_grid_status(self, inverter_asleep=False):
+        """Update the grid status and fire an event on a transition."""
+        transition = self._client.update_grid_status(time.monotonic(), inverter_asleep)
+        if transition is None:
+            return
+        previous, status = transition
+        self._hass.bus.async_fire(EVENT_GRID_STATUS_CHANGED, {
+            'hub_id': self._id,
+            'name': self._name,
+            'previous': previous,
+            'status': status,
+        })
+
+    def update_events(self):
+        """Fire an event for every inverter event raised or cleared in the current cycle."""
+        for unit_id, register, bit, label, active in self._client.event_edges():
+            self._hass.bus.async_fire(EVENT_INVERTER_EVENT, {
+                'hub_id': self._id,
+                'name': self._name,
+                'unit_id': unit_id,
+                'register': register,
+                'bit': bit,
+                'event': label,
+                'active': active,
+            })
+
+    def update_energy_data(self):
+        """Integrate the power values of the current cycle and persist the totals."""
+        self._energy_integrator.add_samples(self.data, time.monotonic())
+        self._energy_integrator.update(self.data)
+        self._energy_store.async_delay_save(lambda: self._energy_integrator.state, ENERGY_STORE_SAVE_DELAY)
+
+    @property
+    def statistics_keys(self) -> list:
+        """Keys with statistics of the fast samples."""
+        if not self._fast_statistics:
+            return []
+        return ['acpower'] + (['m1_power'] if self.meter_configured else [])
+
+    def update_statistics(self):
+        """Publish the statistics of the fast samples since the last update."""
+        if self._sample_statistics is not None:
+            self._sample_statistics.publish(self.data, self._client.attributes)
+
+    async def _async_collect_statistics(self, samples, timestamp):
+        self._sample_statistics.add_samples(samples)
+
+    def start_polling(self):
+        """Schedule the updates with the poll scheduler of the domain. Returns the function to stop them."""
+        return get_poll_scheduler(self._hass).register(self._id, self._scan_interval.total_seconds(), self.coordinator.async_refresh, self._first_refresh_duration)
+
+    def start_supervisor(self):
+        """Start the task owning the Modbus connection. Returns the function to stop it."""
+        task = self._hass.async_create_background_task(self._client.supervise(KEEPALIVE_INTERVAL), f'fronius_modbus connection {self._id}')
+        return task.cancel
+
+    def read_inverter_blocks(self) -> bool:
+        """Whether the next update reads the inverter blocks, False while the inverter is asleep and no probe is due."""
+        return self._activity is None or self._activity.read_inverter(time.monotonic())
+
+    @property
+    def polling_reduced(self) -> bool:
+        return self._activity is not None and self._activity.mode == REDUCED
+
+    def update_activity(self, inverter_read):
+        """Switch between full and reduced polling on the data of the current update."""
+        if self._activity is None:
+            return
+        sun = self._hass.states.get('sun.sun')
+        night = sun is not None and sun.state == 'below_horizon'
+        transition = self._activity.update(self.data, time.monotonic(), inverter_read, night)
+        self.data['polling'] = self._activity.mode
+        if transition is not None:
+            _LOGGER.info(f"{self._name} polling {transition[0]} -> {transition[1]}, inverter status {self.data.get('statusvendor')}")
+
+    def update_connection_data(self):
+        self.data['connection'] = 'Connected' if self._client.connected else 'Disconnected'
+        self.data['reconnects'] = self._client.reconnects
+        connected_since = self._client.connected_since
+        self.data['connected_since'] = dt_util.utc_from_timestamp(connected_since).isoformat() if connected_since is not None else None
+
+    def start_fast_lane(self):
+        """Start polling the fast values for the configured listeners. Returns the function to stop it."""
+        if self._export_controller is not None:
+            if self.meter_configured:
+                enabled = self.data.get('export_limit_enable') == 'Enabled'
+                self._export_limit_before = (self.data.get('export_limit_rate'), enabled)
+                self._export_controller.reset(self.data.get('export_limit_rate') if enabled else None, self.data.get('max_power'))
+                self._remove_export_control = self.add_fast_listener(self._async_export_control, ['m1_power'])
+            else:
+                _LOGGER.error(f"Export control needs a meter, export control disabled")
+
+        if self.statistics_keys:
+            self._sample_statistics = SampleStatistics(self.statistics_keys)
+            self.add_fast_listener(self._async_collect_statistics, self.statistics_keys)
+
+        if self._fast_energy:
+            # the samples of every fast poll are integrated, see _integrate_fast_samples
+            self.add_fast_listener(None, ENERGY_FAST_KEYS)
+
+        return self._stop_fast_lane
+
+    def add_fast_listener(self, listener, keys):
+        """Call listener with the samples of keys at every fast poll, polling only while there are listeners.
+        A listener of None only samples keys. Returns the function to remove it."""
+        entry = (listener, tuple(keys))
+        self._fast_listeners.append(entry)
+        self._fast_keys.update(keys)
+        if self._fast_lane_cancel is None:
+            self._fast_lane_cancel = async_track_time_interval(self._hass, self._async_fast_poll, timedelta(seconds=FAST_POLL_INTERVAL))
+
+        @callback
+        def remove():
+            if entry in self._fast_listeners:
+                self._fast_listeners.remove(entry)
+            self._fast_keys = {key for _, listener_keys in self._fast_listeners for key in listener_keys}
+            if not self._fast_listeners:
+                self._stop_fast_lane()
+
+        return remove
+
+    @callback
+    def _stop_fast_lane(self):
+        if self._fast_lane_cancel is not None:
+            self._fast_lane_cancel()
+            self._fast_lane_cancel = None
+
+    async def _async_fast_poll(self, now=None):
+        """Read the fast values and pass them to the listeners."""
+        if self._fast_poll_running:
+            return
+        self._fast_poll_running = True
+        try:
+            keys = self._fast_keys
+            if self.polling_reduced:
+                # the inverter is only read by the probes while it is asleep
+                keys = keys - set(INVERTER_FAST_KEYS)
+            samples = await self._client.read_fast_data(keys)
+            timestamp = time.monotonic()
+            self._integrate_fast_samples(samples, timestamp)
+            for listener, _ in list(self._fast_listeners):
+                if listener is not None:
+                    await listener(samples, timestamp)
+        except Exception as e:
+            _LOGGER.warning(f"Error in fast poll: {e}")
+        finally:
+            self._fast_poll_running = False
+
+    def _integrate_fast_samples(self, samples, timestamp):
+        """Integrate the powers of the fast samples, between the samples of the updates."""
+        self._energy_integrator.add_samples(fast_energy_powers(samples), timestamp)
+
+    async def _async_export_control(self, samples, timestamp):
+        """Update the export limit from the meter power."""
+        max_power = self.data.get('max_power')
+        rate = self._export_controller.update(samples.get('m1_power'), max_power, timestamp)
+        if rate is None:
+            return
+        if await self._apply_export_control_rate(rate):
+            self._export_controller.written(rate, timestamp)
+
+    @serialize_writes
+    async def _apply_export_control_rate(self, rate):
+        await self._client.set_export_limit_rate(rate)
+        await self._client.set_export_limit_enable(1)
+        return True
+
+    async def stop_export_control(self):
+        """Stop the export control and restore the export limit from before it started."""
+        if self._remove_export_control is None:
+            return
+        self._remove_export_control()
+        self._remove_export_control = None
+        rate, enabled = self._export_limit_before
+        try:
+            await self._restore_export_limit(rate, enabled)
+        except Exception as e:
+            _LOGGER.error(f"Restoring the export limit after the export control failed: {e}")
+
+    @serialize_writes
+    async def _restore_export_limit(self, rate, enabled):
+        if rate is not None:
+            await self._client.set_export_limit_rate(rate)
+        # without a known rate the limit is disabled, so the inverter is not left throttled
+        await self._client.set_export_limit_enable(1 if enabled and rate is not None else 0)
+        _LOGGER.info(f"Export control stopped, export limit rate {rate} enabled {enabled and rate is not None}")
+
+    def start_schedule(self):
+        """Start the battery schedule timer. Returns the function to stop it."""
+        return async_track_time_interval(self._hass, self._async_run_schedule, timedelta(seconds=SCHEDULE_UPDATE_INTERVAL))
+
+    @property
+    def schedule(self) -> BatterySchedule:
+        return self._schedule
+
+    async def set_schedule(self, schedule: BatterySchedule):
+        """Replace and store the battery schedule and apply it."""
+        self._schedule = schedule
+        await self._schedule_store.async_save(schedule.as_dict())
+        _LOGGER.info(f"Battery schedule set: {schedule.as_dict()}")
+        await self._async_run_schedule()
+
+    async def _async_run_schedule(self, now=None):
+        """Apply the target of the battery schedule for the current time."""
+        if not self.storage_configured or not self._schedule.active or self.calibration_running:
+            return
+        target = self._schedule.target(dt_util.now().time())
+        if target is None:
+            return
+        try:
+            written = await self._apply_schedule_target(target)
+        except Exception as e:
+            _LOGGER.error(f"Error applying battery schedule target {target}: {e}")
+            return
+        if written and self.coordinator is not None:
+            self.coordinator.async_update_listeners()
+
+    @serialize_writes
+    async def _apply_schedule_target(self, target):
+        return await self._client.apply_storage_mode(
+            target.mode,
+            charge_power=target.charge_power,
+            discharge_power=target.discharge_power,
+            minimum_reserve=target.minimum_reserve,
+            refresh_margin=SCHEDULE_UPDATE_INTERVAL * 2,
+        )
+
+    @property
+    def calibration_running(self) -> bool:
+        return self._calibration is not None and self._calibration.running
+
+    def start_calibration(self, hold_time, floor_soc):
+        """Start the battery calibration as a background task. Raises ValueError if one is running."""
+        if self.calibration_running:
+            raise ValueError('Battery calibration is already running')
+        self._calibration = BatteryCalibration(
+            self,
+            hold_time=hold_time,
+            floor_soc=floor_soc,
+            phase_timeout=CALIBRATION_PHASE_TIMEOUT,
+            refresh_interval=SCHEDULE_UPDATE_INTERVAL,
+        )
+        self._calibration.task = self._hass.async_create_background_task(self._calibration.run(), f'fronius_modbus calibration {self._id}')
+
+    async def cancel_calibration(self):
+        """Cancel a running battery calibration and wait until the storage settings are restored."""
+        if self._calibration is not None:
+            await self._calibration.cancel()
+
+    @callback
+    def update_calibration_data(self):
+        """Publish the phase and progress of the calibration, only when one of them changed."""
+        phase = self._calibration.phase
+        progress = self._calibration.progress
+        if self.data.get('calibration_phase') == phase and self.data.get('calibration_progress') == progress:
+            return
+        self.data['calibration_phase'] = phase
+        self.data['calibration_progress'] = progress
+        if self.coordinator is not None:
+            self.coordinator.async_update_listeners()
+
+    def storage_settings(self) -> dict:
+        return self._client.storage_settings()
+
+    @serialize_writes
+    async def apply_storage_step(self, ext_mode, charge_power=None, discharge_power=None, minimum_reserve=None):
+        return await self._client.apply_storage_mode(
+            ext_mode,
+            charge_power=charge_power,
+            discharge_power=discharge_power,
+            minimum_reserve=minimum_reserve,
+            refresh_margin=SCHEDULE_UPDATE_INTERVAL * 2,
+        )
+
+    @serialize_writes
+    async def restore_storage_settings(self, settings):
+        await self._client.restore_storage_settings(settings)
+        return True
+
     @property 
     def device_info_storage(self) -> dict:
         return {
@@ -178,6 +657,33 @@ class Hub:
             #"hw_version": f'modbus id-{self._client.data.get(f'm{id}_unit_id')}',
         }
 
+    def fleet_prefix(self, unit_id) -> str:
+        return self._client.fleet_prefix(unit_id)
+
+    def get_device_info_fleet_inverter(self, unit_id) -> dict:
+        prefix = self.fleet_prefix(unit_id)
+        return {
+            "identifiers": {(DOMAIN, f'{self._name}_inverter{unit_id}')},
+            "name": f'Fronius {self._client.data.get(prefix + 'model')} {unit_id}',
+            "manufacturer": self._client.data.get(prefix + 'manufacturer'),
+            "model": self._client.data.get(prefix + 'model'),
+            "serial_number": self._client.data.get(prefix + 'serial'),
+            "sw_version": self._client.data.get(prefix + 'sw_version'),
+        }
+
+    @property
+    def device_info_site(self) -> dict:
+        return {
+            "identifiers": {(DOMAIN, f'{self._name}_site')},
+            "name": f'{self._name} site',
+            "manufacturer": self._client.data.get('i_manufacturer'),
+            "model": 'Site',
+        }
+
+    @property
+    def fleet_unit_ids(self):
+        return self._client.fleet_unit_ids
+
     @property
     def hub_id(self) -> str:
         """ID for hub."""
@@ -190,7 +696,7 @@ class Hub:
 
 
 
-    @toggle_busy
+    @serialize_writes
     async def test_connection(self) -> bool:
         """Test connectivity"""
         try:
@@ -208,6 +714,33 @@ class Hub:
     def data(self):
         return self._client.data
 
+    @property
+    def request_timeouts(self) -> dict:
+        return self._client.request_timeouts
+
+    @property
+    def read_errors(self) -> dict:
+        return self._client.read_errors
+
+    @property
+    def scale_factors(self) -> dict:
+        return self._client.scale_factors
+
+    @property
+    def connected(self) -> bool:
+        return self._client.connected
+
+    def register_images(self) -> dict:
+        return self._client.register_images()
+
+    @property
+    def attributes(self):
+        return self._client.attributes
+
+    def implemented(self, key) -> bool:
+        """False if the device does not implement the point stored under key."""
+        return self._client.implemented(key)
+
     @property
     def meter_configured(self):
         return self._client.meter_configured
@@ -216,6 +749,14 @@ class Hub:
     def storage_configured(self):
         return self._client.storage_configured
 
+    @property
+    def mppt_configured(self):
+        return self._client.mppt_configured
+
+    @property
+    def capabilities(self) -> dict:
+        return self._client.capabilities
+
     @property
     def max_discharge_rate_w(self):
         return self._client.max_discharge_rate_w
@@ -228,7 +769,7 @@ class Hub:
     def storage_extended_control_mode(self):
         return self._client.storage_extended_control_mode
 
-    @toggle_busy
+    @serialize_writes
     async def set_mode(self, mode):
         if mode == 0:
             await self._client.set_auto_mode()
@@ -246,36 +787,65 @@ class Hub:
             await self._client.set_block_discharge_mode()
         elif mode == 7:
             await self._client.set_block_charge_mode()
-        elif mode == 8:
-            await self._client.set_calibrate_mode()
 
-    @toggle_busy
+    @serialize_writes
     async def set_minimum_reserve(self, value):
         await self._client.set_minimum_reserve(value)
 
-    @toggle_busy
+    @serialize_writes
     async def set_charge_limit(self, value):
         await self._client.set_charge_limit(value)
 
-    @toggle_busy
+    @serialize_writes
     async def set_discharge_limit(self, value):
         await self._client.set_discharge_limit(value)
 
-    @toggle_busy
+    @serialize_writes
     async def set_grid_charge_power(self, value):
         await self._client.set_grid_charge_power(value)
            
-    @toggle_busy
+    @serialize_writes
     async def set_grid_discharge_power(self, value):
         await self._client.set_grid_discharge_power(value)
 
+    @property
+    def inverter_unit_id(self):
+        return self._client._inverter_unit_id
+
+    async def read_registers(self, ranges) -> dict:
+        """Read raw (unit_id, address, count) ranges over the connection of the hub."""
+        return await self._client.read_ranges(ranges)
+
+    @serialize_writes
+    async def write_registers(self, unit_id, address, values):
+        """Write raw registers, also when they are known to hold the values already."""
+        await self._client.write_raw_registers(unit_id, address, values)
+
+    async def refresh(self):
+        await self.coordinator.async_request_refresh()
+
+    @property
+    def export_control_active(self) -> bool:
+        return self._remove_export_control is not None
+
+    def _check_manual_export_limit(self):
+        """Manual export limits would be overwritten by the next step of the export control."""
+        if self.export_control_active:
+            raise ServiceValidationError("The export limit is set by the zero export control, disable it in the options to set the export limit")
+
+    @serialize_writes
     async def set_export_limit_rate(self, value):
+        self._check_manual_export_limit()
         await self._client.set_export_limit_rate(value)
 
+    @serialize_writes
     async def set_export_limit_enable(self, value):
+        self._check_manual_export_limit()
         await self._client.set_export_limit_enable(value)
 
+    @serialize_writes
     async def apply_export_limit(self, rate):
+        self._check_manual_export_limit()
         await self._client.apply_export_limit(rate)
 
     async def set_conn_status(self, enable):
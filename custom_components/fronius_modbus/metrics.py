@@ -0,0 +1,111 @@
+"""OpenMetrics exporter of the hub data."""
+
+import logging
+
+from aiohttp import web
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.http import KEY_HASS, HomeAssistantView
+
+from .const import DOMAIN, CONF_METRICS
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# metric family -> (type, help)
+METRIC_FAMILIES = {
+    'fronius_modbus_value': ('gauge', 'Latest decoded value of a data key.'),
+    'fronius_modbus_block_reads': ('counter', 'Reads of a register block by the coordinator.'),
+    'fronius_modbus_block_read_seconds': ('counter', 'Time spent reading a register block.'),
+    'fronius_modbus_block_last_read_seconds': ('gauge', 'Duration of the last read of a register block.'),
+    'fronius_modbus_request_srtt_seconds': ('gauge', 'Smoothed round trip time of the requests to a unit.'),
+    'fronius_modbus_request_timeout_seconds': ('gauge', 'Current request timeout of a unit.'),
+    'fronius_modbus_updates': ('counter', 'Completed updates of the hub.'),
+}
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def hub_samples(hub) -> dict:
+    """Samples of a hub as {family: [sample lines]}. Reads the hub snapshot only, no Modbus requests."""
+    hub_label = f'hub="{escape(hub.hub_id)}"'
+    samples = {family: [] for family in METRIC_FAMILIES}
+
+    values = samples['fronius_modbus_value']
+    for key, value in hub.data.items():
+        if isinstance(value, bool):
+            value = int(value)
+        elif not isinstance(value, (int, float)):
+            continue
+        values.append(f'fronius_modbus_value{{{hub_label},key="{escape(key)}"}} {value}')
+
+    for block, timing in hub.block_timings.items():
+        labels = f'{{{hub_label},block="{escape(block)}"}}'
+        samples['fronius_modbus_block_reads'].append(f'fronius_modbus_block_reads_total{labels} {timing["reads"]}')
+        samples['fronius_modbus_block_read_seconds'].append(f'fronius_modbus_block_read_seconds_total{labels} {timing["seconds"]:.6f}')
+        samples['fronius_modbus_block_last_read_seconds'].append(f'fronius_modbus_block_last_read_seconds{labels} {timing["last"]:.6f}')
+
+    for (host, unit_id), estimate in hub.request_timeouts.items():
+        labels = f'{{{hub_label},unit_id="{unit_id}"}}'
+        if estimate['srtt'] is not None:
+            samples['fronius_modbus_request_srtt_seconds'].append(f'fronius_modbus_request_srtt_seconds{labels} {estimate["srtt"]:.6f}')
+        samples['fronius_modbus_request_timeout_seconds'].append(f'fronius_modbus_request_timeout_seconds{labels} {estimate["timeout"]:.6f}')
+
+    samples['fronius_modbus_updates'].append(f'fronius_modbus_updates_total{{{hub_label}}} {hub.snapshot_version}')
+    return samples
+
+
+class MetricsRenderer:
+    """Text exposition of the hubs, rendered again only when the snapshot of a hub changed."""
+
+    def __init__(self):
+        self._key = None
+        self._text = None
+
+    def render(self, hubs) -> bytes:
+        key = tuple((hub.hub_id, hub.snapshot_version) for hub in hubs)
+        if key != self._key:
+            all_samples = [hub_samples(hub) for hub in hubs]
+            lines = []
+            for family, (metric_type, help_text) in METRIC_FAMILIES.items():
+                lines.append(f'# TYPE {family} {metric_type}')
+                lines.append(f'# HELP {family} {help_text}')
+                for samples in all_samples:
+                    lines.extend(samples[family])
+            lines.append('# EOF\n')
+            self._text = '\n'.join(lines).encode()
+            self._key = key
+        return self._text
+
+
+class FroniusMetricsView(HomeAssistantView):
+    """Latest data of the hubs with metrics enabled in the OpenMetrics text format."""
+
+    url = f'/api/{DOMAIN}/metrics'
+    name = f'api:{DOMAIN}:metrics'
+
+    def __init__(self):
+        self._renderer = MetricsRenderer()
+
+    async def get(self, request: web.Request) -> web.Response:
+        hass: HomeAssistant = request.app[KEY_HASS]
+        hubs = [
+            entry.runtime_data
+            for entry in hass.config_entries.async_loaded_entries(DOMAIN)
+            if entry.options.get(CONF_METRICS, False)
+        ]
+        return web.Response(body=self._renderer.render(hubs), headers={'Content-Type': CONTENT_TYPE})
+
+
+def async_register_metrics_view(hass: HomeAssistant, entry: ConfigEntry):
+    """Register the metrics view once, when the first entry enables it."""
+    if not entry.options.get(CONF_METRICS, False):
+        return
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if 'metrics_view' not in domain_data:
+        domain_data['metrics_view'] = FroniusMetricsView()
+        hass.http.register_view(domain_data['metrics_view'])
@@ -0,0 +1,124 @@
+"""Domain wide scheduling of the hub updates."""
+
+import asyncio
+import logging
+import math
+import time
+import zlib
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, MAX_CONCURRENT_UPDATES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _ScheduledHub:
+
+    def __init__(self, hub_id, interval, refresh, duration):
+        self.hub_id = hub_id
+        self.interval = interval
+        self.refresh = refresh
+        # smoothed duration of an update and the duration the phase was planned with
+        self.duration = duration
+        self.planned_duration = duration
+        self.base_phase = zlib.crc32(hub_id.encode()) / 2**32 * interval
+        self.phase = self.base_phase
+        self.cancel = None
+        self.running = False
+
+
+class PollScheduler:
+    """Starts the updates of all hubs of the domain at staggered phases of their intervals.
+
+    Every hub gets a fixed phase within its interval, derived from a hash of its id so it
+    does not change between restarts. The phases are spread in hash order so that the
+    update of a hub starts after the measured update duration of the previous one.
+    Updates start at phase + n * interval of the wall clock, so they do not drift, and at
+    most max_concurrent updates run at the same time.
+    """
+
+    SMOOTHING = 0.2
+    # relative change of an update duration that spreads the phases again
+    REPLAN_CHANGE = 0.5
+
+    def __init__(self, hass: HomeAssistant, max_concurrent=MAX_CONCURRENT_UPDATES):
+        self._hass = hass
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._hubs = {}
+
+    @property
+    def phases(self) -> dict:
+        return {hub_id: round(hub.phase, 3) for hub_id, hub in self._hubs.items()}
+
+    def register(self, hub_id, interval: float, refresh, duration: float = 0):
+        """Schedule refresh (a coroutine function) every interval seconds. Returns the function to stop it."""
+        self._hubs[hub_id] = _ScheduledHub(hub_id, interval, refresh, duration)
+        self._plan()
+
+        @callback
+        def unregister():
+            hub = self._hubs.pop(hub_id, None)
+            if hub is not None and hub.cancel is not None:
+                hub.cancel()
+            self._plan()
+
+        return unregister
+
+    def _plan(self):
+        """Spread the phases of all hubs and reschedule their next updates."""
+        end = None
+        for hub in sorted(self._hubs.values(), key=lambda hub: (hub.base_phase, hub.hub_id)):
+            start = hub.base_phase if end is None else max(hub.base_phase, end)
+            hub.phase = start % hub.interval
+            hub.planned_duration = hub.duration
+            end = start + hub.duration
+            self._schedule(hub)
+        _LOGGER.debug(f"Update phases {self.phases}")
+
+    def _schedule(self, hub):
+        if hub.cancel is not None:
+            hub.cancel()
+            hub.cancel = None
+        if hub.running:
+            # scheduled when the running update is done
+            return
+        now = time.time()
+        next_start = hub.phase + math.ceil((now - hub.phase) / hub.interval) * hub.interval
+        if next_start - now < 0.1:
+            next_start += hub.interval
+
+        @callback
+        def start(_now):
+            hub.cancel = None
+            self._hass.async_create_background_task(self._run(hub), f'fronius_modbus update {hub.hub_id}')
+
+        hub.cancel = async_call_later(self._hass, next_start - now, start)
+
+    async def _run(self, hub):
+        hub.running = True
+        try:
+            async with self._semaphore:
+                started = time.monotonic()
+                await hub.refresh()
+                duration = time.monotonic() - started
+            hub.duration += self.SMOOTHING * (duration - hub.duration)
+        except Exception as e:
+            _LOGGER.warning(f"Error in scheduled update of {hub.hub_id}: {e}")
+        finally:
+            hub.running = False
+        if self._hubs.get(hub.hub_id) is not hub:
+            return
+        if abs(hub.duration - hub.planned_duration) > self.REPLAN_CHANGE * max(hub.planned_duration, 0.1):
+            self._plan()
+        else:
+            self._schedule(hub)
+
+
+def get_poll_scheduler(hass: HomeAssistant) -> PollScheduler:
+    """The scheduler shared by all hubs of the domain."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if 'poll_scheduler' not in domain_data:
+        domain_data['poll_scheduler'] = PollScheduler(hass)
+    return domain_data['poll_scheduler']
@@ -0,0 +1,52 @@
+"""Statistics of values sampled faster than the scan interval."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# statistics published as data keys <key>_<statistic>
+PUBLISHED_STATISTICS = ['min', 'max', 'mean']
+
+
+class SampleStatistics:
+    """Streaming minimum, maximum, mean and last value of the samples of a window, per key.
+
+    Each key keeps a running count, sum, minimum, maximum and last value, so the memory
+    does not grow with the sampling rate. publish() writes the statistics of the window
+    and starts the next one.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        # key -> [count, sum, min, max, last]
+        self._windows = {}
+
+    def add_samples(self, samples):
+        for key in self.keys:
+            value = samples.get(key)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            window = self._windows.get(key)
+            if window is None:
+                self._windows[key] = [1, value, value, value, value]
+                continue
+            window[0] += 1
+            window[1] += value
+            if value < window[2]:
+                window[2] = value
+            if value > window[3]:
+                window[3] = value
+            window[4] = value
+
+    def publish(self, data, attributes):
+        """Write <key>_min, <key>_max and <key>_mean to data and all statistics as attributes of key."""
+        for key in self.keys:
+            window = self._windows.pop(key, None)
+            if window is None:
+                statistics = {'min': None, 'max': None, 'mean': None, 'last': None, 'samples': 0}
+            else:
+                count, total, minimum, maximum, last = window
+                statistics = {'min': minimum, 'max': maximum, 'mean': round(total / count, 2), 'last': last, 'samples': count}
+            for statistic in PUBLISHED_STATISTICS:
+                data[f'{key}_{statistic}'] = statistics[statistic]
+            attributes[key] = statistics
@@ -0,0 +1,109 @@
+"""Battery schedule with time windows."""
+
+import logging
+from datetime import time
+
+from .const import (
+    STORAGE_EXT_CONTROL_MODE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_mode(mode) -> int:
+    """Storage control mode from its number or its name."""
+    if isinstance(mode, str) and not mode.isdigit():
+        for key, value in STORAGE_EXT_CONTROL_MODE.items():
+            if value.lower() == mode.lower():
+                return key
+        raise ValueError(f'Unknown storage control mode {mode}')
+    mode = int(mode)
+    if mode not in STORAGE_EXT_CONTROL_MODE:
+        raise ValueError(f'Unknown storage control mode {mode}')
+    return mode
+
+
+def parse_time(value) -> time:
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(value)
+
+
+class ScheduleTarget:
+    """Storage settings to apply."""
+
+    def __init__(self, mode, charge_power=None, discharge_power=None, minimum_reserve=None):
+        self.mode = parse_mode(mode)
+        self.charge_power = charge_power
+        self.discharge_power = discharge_power
+        self.minimum_reserve = minimum_reserve
+
+    def as_dict(self) -> dict:
+        return {
+            'mode': self.mode,
+            'charge_power': self.charge_power,
+            'discharge_power': self.discharge_power,
+            'minimum_reserve': self.minimum_reserve,
+        }
+
+    def __repr__(self):
+        return f'ScheduleTarget({self.as_dict()})'
+
+
+class ScheduleWindow(ScheduleTarget):
+    """Storage settings applied between start and end. End before start spans midnight."""
+
+    def __init__(self, start, end, mode, charge_power=None, discharge_power=None, minimum_reserve=None):
+        super().__init__(mode, charge_power, discharge_power, minimum_reserve)
+        self.start = parse_time(start)
+        self.end = parse_time(end)
+        if self.start == self.end:
+            raise ValueError(f'Schedule window start and end are equal {self.start}')
+
+    def contains(self, now: time) -> bool:
+        if self.start < self.end:
+            return self.start <= now < self.end
+        return now >= self.start or now < self.end
+
+    def as_dict(self) -> dict:
+        return {
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            **super().as_dict(),
+        }
+
+
+class BatterySchedule:
+    """List of windows; the first window containing the current time is active.
+
+    Outside of all windows the default target is applied, if there is one.
+    """
+
+    def __init__(self, windows=None, default=None):
+        self.windows = windows or []
+        self.default = default
+
+    @classmethod
+    def from_dict(cls, config):
+        config = config or {}
+        windows = [ScheduleWindow(**window) for window in config.get('windows', [])]
+        default = config.get('default')
+        if default is not None:
+            default = ScheduleTarget(**default)
+        return cls(windows, default)
+
+    def as_dict(self) -> dict:
+        return {
+            'windows': [window.as_dict() for window in self.windows],
+            'default': self.default.as_dict() if self.default is not None else None,
+        }
+
+    @property
+    def active(self) -> bool:
+        return len(self.windows) > 0 or self.default is not None
+
+    def target(self, now: time):
+        for window in self.windows:
+            if window.contains(now):
+                return window
+        return self.default
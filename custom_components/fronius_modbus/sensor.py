@@ -20,8 +20,13 @@ from .const import (
     INVERTER_SENSOR_TYPES,
     INVERTER_SYMO_SENSOR_TYPES,
     INVERTER_STORAGE_SENSOR_TYPES,
+    INVERTER_METER_SENSOR_TYPES,
     METER_SENSOR_TYPES,
     STORAGE_SENSOR_TYPES,
+    FLEET_INVERTER_SENSOR_TYPES,
+    SITE_SENSOR_TYPES,
+    INVERTER_STATISTICS_SENSOR_TYPES,
+    METER_STATISTICS_SENSOR_TYPES,
 )
 from .hub import Hub
 from .base import FroniusModbusBaseEntity
@@ -40,6 +45,8 @@ async def async_setup_entry(
     coordinator = hub.coordinator
 
     for sensor_info in INVERTER_SENSOR_TYPES.values():
+        if not hub.implemented(sensor_info[1]):
+            continue
         sensor = FroniusModbusSensor(
             coordinator=coordinator,
             device_info=hub.device_info_inverter,
@@ -54,6 +61,8 @@ async def async_setup_entry(
         entities.append(sensor)
 
     for sensor_info in INVERTER_SYMO_SENSOR_TYPES.values():
+        if not hub.implemented(sensor_info[1]):
+            continue
         sensor = FroniusModbusSensor(
             coordinator=coordinator,
             device_info=hub.device_info_inverter,
@@ -70,6 +79,8 @@ async def async_setup_entry(
     if hub.meter_configured:
         meter_id = '1'
         for sensor_info in METER_SENSOR_TYPES.values():
+            if not hub.implemented(f'm{meter_id}_' + sensor_info[1]):
+                continue
             sensor = FroniusModbusSensor(
                 coordinator=coordinator,
                 device_info=hub.get_device_info_meter(meter_id),
@@ -83,8 +94,26 @@ async def async_setup_entry(
             )
             entities.append(sensor)
 
+        for sensor_info in INVERTER_METER_SENSOR_TYPES.values():
+            if not hub.implemented(sensor_info[1]):
+                continue
+            sensor = FroniusModbusSensor(
+                coordinator=coordinator,
+                device_info=hub.device_info_inverter,
+                name=sensor_info[0],
+                key=sensor_info[1],
+                device_class=sensor_info[2],
+                state_class=sensor_info[3],
+                unit=sensor_info[4],
+                icon=sensor_info[5],
+                entity_category=sensor_info[6],
+            )
+            entities.append(sensor)
+
     if hub.storage_configured:
         for sensor_info in INVERTER_STORAGE_SENSOR_TYPES.values():
+            if not hub.implemented(sensor_info[1]):
+                continue
             sensor = FroniusModbusSensor(
                 coordinator=coordinator,
                 device_info=hub.device_info_inverter,
@@ -99,6 +128,8 @@ async def async_setup_entry(
             entities.append(sensor)
 
         for sensor_info in STORAGE_SENSOR_TYPES.values():
+            if not hub.implemented(sensor_info[1]):
+                continue
             sensor = FroniusModbusSensor(
                 coordinator=coordinator,
                 device_info=hub.device_info_storage,
@@ -112,6 +143,70 @@ async def async_setup_entry(
             )
             entities.append(sensor)
 
+    if 'acpower' in hub.statistics_keys:
+        for sensor_info in INVERTER_STATISTICS_SENSOR_TYPES.values():
+            sensor = FroniusModbusSensor(
+                coordinator=coordinator,
+                device_info=hub.device_info_inverter,
+                name=sensor_info[0],
+                key=sensor_info[1],
+                device_class=sensor_info[2],
+                state_class=sensor_info[3],
+                unit=sensor_info[4],
+                icon=sensor_info[5],
+                entity_category=sensor_info[6],
+            )
+            entities.append(sensor)
+
+    if 'm1_power' in hub.statistics_keys:
+        meter_id = '1'
+        for sensor_info in METER_STATISTICS_SENSOR_TYPES.values():
+            sensor = FroniusModbusSensor(
+                coordinator=coordinator,
+                device_info=hub.get_device_info_meter(meter_id),
+                name=f'Meter {meter_id} ' + sensor_info[0],
+                key=f'm{meter_id}_' + sensor_info[1],
+                device_class=sensor_info[2],
+                state_class=sensor_info[3],
+                unit=sensor_info[4],
+                icon=sensor_info[5],
+                entity_category=sensor_info[6],
+            )
+            entities.append(sensor)
+
+    for unit_id in hub.fleet_unit_ids:
+        prefix = hub.fleet_prefix(unit_id)
+        for sensor_info in FLEET_INVERTER_SENSOR_TYPES.values():
+            if not hub.implemented(prefix + sensor_info[1]):
+                continue
+            sensor = FroniusModbusSensor(
+                coordinator=coordinator,
+                device_info=hub.get_device_info_fleet_inverter(unit_id),
+                name=sensor_info[0],
+                key=prefix + sensor_info[1],
+                device_class=sensor_info[2],
+                state_class=sensor_info[3],
+                unit=sensor_info[4],
+                icon=sensor_info[5],
+                entity_category=sensor_info[6],
+            )
+            entities.append(sensor)
+
+    if hub.fleet_unit_ids:
+        for sensor_info in SITE_SENSOR_TYPES.values():
+            sensor = FroniusModbusSensor(
+                coordinator=coordinator,
+                device_info=hub.device_info_site,
+                name=sensor_info[0],
+                key=sensor_info[1],
+                device_class=sensor_info[2],
+                state_class=sensor_info[3],
+                unit=sensor_info[4],
+                icon=sensor_info[5],
+                entity_category=sensor_info[6],
+            )
+            entities.append(sensor)
+
     async_add_entities(entities)
     return True
 
@@ -131,7 +226,7 @@ class FroniusModbusSensor(FroniusModbusBaseEntity, SensorEntity):
 
     @property
     def extra_state_attributes(self):
-        return None
+        return self.coordinator.hub.attributes.get(self._key)
 
 
 
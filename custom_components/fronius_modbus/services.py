@@ -0,0 +1,220 @@
+"""Services for the Fronius Modbus integration."""
+
+from __future__ import annotations
+
+import logging
+import struct
+
+import voluptuous as vol
+from pymodbus.client import AsyncModbusTcpClient
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    DOMAIN,
+    ATTR_CONFIG_ENTRY_ID,
+    SERVICE_SET_BATTERY_SCHEDULE,
+    SERVICE_CLEAR_BATTERY_SCHEDULE,
+    SERVICE_START_BATTERY_CALIBRATION,
+    SERVICE_CANCEL_BATTERY_CALIBRATION,
+    DEFAULT_CALIBRATION_HOLD_TIME,
+    DEFAULT_CALIBRATION_FLOOR_SOC,
+    SERVICE_READ_REGISTERS,
+    SERVICE_WRITE_REGISTERS,
+)
+from .hub import Hub
+from .schedule import BatterySchedule
+
+_LOGGER = logging.getLogger(__name__)
+
+TARGET_SCHEMA = {
+    vol.Required('mode'): vol.Any(cv.positive_int, cv.string),
+    vol.Optional('charge_power'): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional('discharge_power'): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional('minimum_reserve'): vol.All(vol.Coerce(float), vol.Range(min=5, max=100)),
+}
+
+WINDOW_SCHEMA = vol.Schema({
+    vol.Required('start'): cv.time,
+    vol.Required('end'): cv.time,
+    **TARGET_SCHEMA,
+})
+
+SET_BATTERY_SCHEDULE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional('windows', default=[]): vol.All(cv.ensure_list, [WINDOW_SCHEMA]),
+    vol.Optional('default'): vol.Schema(TARGET_SCHEMA),
+})
+
+CLEAR_BATTERY_SCHEDULE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+})
+
+START_BATTERY_CALIBRATION_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional('hold_time', default=DEFAULT_CALIBRATION_HOLD_TIME): vol.All(vol.Coerce(int), vol.Range(min=0, max=6 * 3600)),
+    vol.Optional('floor_soc', default=DEFAULT_CALIBRATION_FLOOR_SOC): vol.All(vol.Coerce(float), vol.Range(min=5, max=50)),
+})
+
+CANCEL_BATTERY_CALIBRATION_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+})
+
+# type hints of the raw register services, the bit list type is not supported
+REGISTER_TYPES = {
+    data_type.name.lower(): data_type
+    for data_type in AsyncModbusTcpClient.DATATYPE
+    if data_type != AsyncModbusTcpClient.DATATYPE.BITS
+}
+
+UNIT_ID = vol.All(vol.Coerce(int), vol.Range(min=1, max=247))
+ADDRESS = vol.All(vol.Coerce(int), vol.Range(min=0, max=65535))
+
+RANGE_SCHEMA = vol.Schema({
+    vol.Optional('unit_id'): UNIT_ID,
+    vol.Required('address'): ADDRESS,
+    vol.Optional('count'): vol.All(vol.Coerce(int), vol.Range(min=1, max=125)),
+    vol.Optional('type'): vol.In(REGISTER_TYPES),
+})
+
+READ_REGISTERS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required('ranges'): vol.All(cv.ensure_list, [RANGE_SCHEMA]),
+})
+
+WRITE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Optional('unit_id'): UNIT_ID,
+        vol.Required('address'): ADDRESS,
+        vol.Exclusive('values', 'value'): vol.All(cv.ensure_list, [vol.All(vol.Coerce(int), vol.Range(min=0, max=65535))], vol.Length(min=1, max=123)),
+        vol.Exclusive('value', 'value'): vol.Any(vol.Coerce(int), vol.Coerce(float), cv.string),
+        vol.Optional('type'): vol.In(REGISTER_TYPES),
+    }),
+    cv.has_at_least_one_key('values', 'value'),
+)
+
+WRITE_REGISTERS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required('writes'): vol.All(cv.ensure_list, [WRITE_SCHEMA]),
+})
+
+
+def decode_registers(registers, type_name):
+    """Value of registers according to the type hint, the registers if there is none."""
+    if type_name is None:
+        return registers
+    return AsyncModbusTcpClient.convert_from_registers(registers, data_type=REGISTER_TYPES[type_name])
+
+
+def encode_value(write) -> list[int]:
+    """Registers to write for a write of the write_registers service."""
+    if 'values' in write:
+        return write['values']
+    type_name = write.get('type', 'uint16')
+    data_type = REGISTER_TYPES[type_name]
+    value = write['value']
+    try:
+        if data_type == AsyncModbusTcpClient.DATATYPE.STRING:
+            return AsyncModbusTcpClient.convert_to_registers(str(value), data_type=data_type)
+        if type_name.startswith('float'):
+            return AsyncModbusTcpClient.convert_to_registers(float(value), data_type=data_type)
+        return AsyncModbusTcpClient.convert_to_registers(int(value), data_type=data_type)
+    except (ValueError, TypeError, OverflowError, struct.error) as e:
+        raise ServiceValidationError(f"Cannot encode {value} as {type_name}: {e}") from e
+
+
+def get_hub(hass: HomeAssistant, call: ServiceCall) -> Hub:
+    """Hub of the config entry selected in the service call."""
+    entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Config entry {entry_id} is not a {DOMAIN} entry")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Config entry {entry_id} is not loaded")
+    return entry.runtime_data
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def set_battery_schedule(call: ServiceCall) -> None:
+        hub = get_hub(hass, call)
+        if not hub.storage_configured:
+            raise ServiceValidationError("No battery storage configured")
+        try:
+            schedule = BatterySchedule.from_dict({
+                'windows': call.data['windows'],
+                'default': call.data.get('default'),
+            })
+        except ValueError as e:
+            raise ServiceValidationError(f"Invalid battery schedule: {e}") from e
+        await hub.set_schedule(schedule)
+
+    async def clear_battery_schedule(call: ServiceCall) -> None:
+        hub = get_hub(hass, call)
+        await hub.set_schedule(BatterySchedule())
+
+    async def start_battery_calibration(call: ServiceCall) -> None:
+        hub = get_hub(hass, call)
+        if not hub.storage_configured:
+            raise ServiceValidationError("No battery storage configured")
+        try:
+            hub.start_calibration(call.data['hold_time'], call.data['floor_soc'])
+        except ValueError as e:
+            raise ServiceValidationError(str(e)) from e
+
+    async def cancel_battery_calibration(call: ServiceCall) -> None:
+        hub = get_hub(hass, call)
+        await hub.cancel_calibration()
+
+    async def read_registers(call: ServiceCall) -> ServiceResponse:
+        hub = get_hub(hass, call)
+        ranges = []
+        for item in call.data['ranges']:
+            unit_id = item.get('unit_id', hub.inverter_unit_id)
+            count = item.get('count')
+            if count is None:
+                count = REGISTER_TYPES[item['type']].value[1] if 'type' in item else 1
+                if count == 0:
+                    raise ServiceValidationError(f"count is required for type {item['type']}")
+            ranges.append((unit_id, item['address'], count, item.get('type')))
+
+        registers = await hub.read_registers([(unit_id, address, count) for unit_id, address, count, _ in ranges])
+
+        result = []
+        for unit_id, address, count, type_name in ranges:
+            values = [registers.get((unit_id, address + i)) for i in range(count)]
+            item = {'unit_id': unit_id, 'address': address, 'count': count}
+            if type_name is not None:
+                item['type'] = type_name
+            if None in values:
+                item['error'] = 'read failed'
+            else:
+                item['registers'] = values
+                try:
+                    item['value'] = decode_registers(values, type_name)
+                except Exception as e:
+                    item['error'] = f'cannot decode as {type_name}: {e}'
+            result.append(item)
+        return {'ranges': result}
+
+    async def write_registers(call: ServiceCall) -> None:
+        hub = get_hub(hass, call)
+        writes = [(write.get('unit_id', hub.inverter_unit_id), write['address'], encode_value(write)) for write in call.data['writes']]
+        try:
+            for unit_id, address, values in writes:
+                await hub.write_registers(unit_id, address, values)
+        except Exception as e:
+            raise HomeAssistantError(f"Writing registers failed: {e}") from e
+        finally:
+            await hub.refresh()
+
+    hass.services.async_register(DOMAIN, SERVICE_SET_BATTERY_SCHEDULE, set_battery_schedule, schema=SET_BATTERY_SCHEDULE_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_CLEAR_BATTERY_SCHEDULE, clear_battery_schedule, schema=CLEAR_BATTERY_SCHEDULE_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_START_BATTERY_CALIBRATION, start_battery_calibration, schema=START_BATTERY_CALIBRATION_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_CANCEL_BATTERY_CALIBRATION, cancel_battery_calibration, schema=CANCEL_BATTERY_CALIBRATION_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_READ_REGISTERS, read_registers, schema=READ_REGISTERS_SCHEMA, supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(DOMAIN, SERVICE_WRITE_REGISTERS, write_registers, schema=WRITE_REGISTERS_SCHEMA)
@@ -0,0 +1,102 @@
+"""Reconciliation of the storage control registers with the mode set by the integration."""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# StorCtl_Mod bits: 1 limits charging to InWRte, 2 limits discharging to OutWRte
+CHARGE_LIMITED = 1
+DISCHARGE_LIMITED = 2
+
+POLICY_ADOPT = 'adopt'
+POLICY_REASSERT = 'reassert'
+
+SYNCED = 'Synced'
+ADOPTED = 'Adopted'
+REASSERTED = 'Reasserted'
+
+
+def derive_ext_mode(storage_control_mode, charge_rate, discharge_rate) -> int:
+    """Extended storage control mode from StorCtl_Mod and the signed InWRte and OutWRte."""
+    if storage_control_mode == 0:
+        return 0
+    elif storage_control_mode in [1,3] and charge_rate == 0:
+        return 7
+    elif storage_control_mode == 1:
+        return 1
+    elif storage_control_mode in [2,3] and discharge_rate < 0:
+        return 4
+    elif storage_control_mode in [2,3] and charge_rate < 0:
+        return 5
+    elif storage_control_mode in [2,3] and discharge_rate == 0:
+        return 6
+    elif storage_control_mode == 2:
+        return 2
+    return 3
+
+
+class StorageControl:
+    """Compares the storage control registers read from the inverter with the values written by the integration.
+
+    The values last written to StorCtl_Mod, InWRte and OutWRte are the desired state; the read
+    values before the first write. A rate is only compared while StorCtl_Mod enables it, so a
+    changed rate that the inverter ignores is no difference. On a difference, e.g. after a change
+    in the Fronius app or the revert timeout of the rates, the adopt policy takes the read values
+    as the desired state and the reassert policy returns the differing registers to write again.
+    """
+
+    POINTS = ['StorCtl_Mod', 'InWRte', 'OutWRte']
+
+    def __init__(self, policy=POLICY_ADOPT):
+        self.policy = policy
+        # point -> register value
+        self.desired = {}
+        self.state = None
+        self.drifts = 0
+
+    def expect(self, point, value):
+        """Record a value written by the integration."""
+        self.desired[point] = value
+
+    @staticmethod
+    def relevant_points(storage_control_mode) -> list:
+        points = ['StorCtl_Mod']
+        if storage_control_mode & CHARGE_LIMITED:
+            points.append('InWRte')
+        if storage_control_mode & DISCHARGE_LIMITED:
+            points.append('OutWRte')
+        return points
+
+    def differences(self, observed) -> dict:
+        """Desired values of the relevant points that differ from observed."""
+        return {
+            point: self.desired[point]
+            for point in self.relevant_points(self.desired['StorCtl_Mod'])
+            if point in self.desired and observed[point] != self.desired[point]
+        }
+
+    def reconcile(self, observed) -> dict:
+        """Registers to write for the observed {point: register value}, {} if none.
+
+        state is SYNCED when the registers match, ADOPTED when the observed values became the
+        desired state and REASSERTED when the returned registers restore the desired state.
+        """
+        if 'StorCtl_Mod' not in self.desired:
+            self.desired.update(observed)
+            self.state = SYNCED
+            return {}
+        differences = self.differences(observed)
+        if not differences:
+            self.state = SYNCED
+            return {}
+
+        self.drifts += 1
+        if self.policy == POLICY_REASSERT:
+            _LOGGER.info(f"Storage control changed outside of the integration, reasserting {differences} read {observed}")
+            self.state = REASSERTED
+            return differences
+
+        _LOGGER.info(f"Storage control changed outside of the integration, adopting {observed} instead of {self.desired}")
+        self.desired.update(observed)
+        self.state = ADOPTED
+        return {}
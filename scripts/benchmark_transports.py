@@ -0,0 +1,123 @@
+"""Benchmark the polling cycle over the supported Modbus transports.
+
+Runs the register reads of one coordinator cycle against a local Modbus server
+for every framer and TCP_NODELAY setting and prints the cycle latencies.
+
+    python scripts/benchmark_transports.py --cycles 200
+
+Pass --host and --port to run the cycle against a real inverter or gateway instead
+of the local stand-in. Only read requests are sent.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'custom_components', 'fronius_modbus'))
+
+from pymodbus import FramerType
+from pymodbus.datastore import ModbusDeviceContext, ModbusSequentialDataBlock, ModbusServerContext
+from pymodbus.server import ModbusTcpServer
+
+from extmodbusclient import ExtModbusClient
+from froniusmodbusclient_const import (
+    INVERTER_ADDRESS,
+    MPPT_ADDRESS,
+    METER_ADDRESS,
+    STORAGE_ADDRESS,
+    EXPORT_LIMIT_RATE_ADDRESS,
+    EXPORT_LIMIT_ENABLE_ADDRESS,
+)
+
+INVERTER_UNIT_ID = 1
+METER_UNIT_ID = 200
+
+# (unit id, address, count) of the reads of one coordinator cycle with meter and storage
+CYCLE = [
+    (INVERTER_UNIT_ID, INVERTER_ADDRESS, 50),
+    (INVERTER_UNIT_ID, 40183, 44),
+    (INVERTER_UNIT_ID, 40151, 30),
+    (INVERTER_UNIT_ID, 40229, 24),
+    (INVERTER_UNIT_ID, MPPT_ADDRESS, 88),
+    (INVERTER_UNIT_ID, STORAGE_ADDRESS, 24),
+    (METER_UNIT_ID, METER_ADDRESS, 103),
+    (INVERTER_UNIT_ID, EXPORT_LIMIT_RATE_ADDRESS, 1),
+    (INVERTER_UNIT_ID, EXPORT_LIMIT_ENABLE_ADDRESS, 1),
+]
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+async def start_server(framer: FramerType, port: int) -> ModbusTcpServer:
+    """Local stand-in answering the inverter and meter unit ids."""
+    def device():
+        return ModbusDeviceContext(hr=ModbusSequentialDataBlock(0, [0] * 41000))
+
+    context = ModbusServerContext(devices={INVERTER_UNIT_ID: device(), METER_UNIT_ID: device()}, single=False)
+    server = ModbusTcpServer(context, framer=framer, address=('127.0.0.1', port))
+    await server.listen()
+    return server
+
+
+async def run_cycles(host, port, framer, tcp_nodelay, cycles, timeout):
+    client = ExtModbusClient(host=host, port=port, unit_id=INVERTER_UNIT_ID, timeout=timeout, framer=framer, tcp_nodelay=tcp_nodelay)
+    await client.connect()
+    if not client.connected:
+        raise ConnectionError(f'Cannot connect to {host}:{port}')
+
+    durations = []
+    errors = 0
+    try:
+        for _ in range(cycles):
+            start = time.perf_counter()
+            for unit_id, address, count in CYCLE:
+                if await client.get_registers(unit_id=unit_id, address=address, count=count) is None:
+                    errors += 1
+            durations.append(time.perf_counter() - start)
+    finally:
+        client.close()
+    return durations, errors
+
+
+async def main(args):
+    if args.host is None:
+        framers = [framer.value for framer in [FramerType.SOCKET, FramerType.RTU]]
+    else:
+        framers = [args.framer]
+
+    print(f"{'framer':<8} {'nodelay':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for index, framer in enumerate(framers):
+        server = None
+        host, port = args.host, args.port
+        if host is None:
+            host, port = '127.0.0.1', args.port + index
+            server = await start_server(FramerType(framer), port)
+        try:
+            for tcp_nodelay in [True, False]:
+                durations, errors = await run_cycles(host, port, framer, tcp_nodelay, args.cycles, args.timeout)
+                durations = [duration * 1000 for duration in durations]
+                print(f"{framer:<8} {str(tcp_nodelay):<8} {statistics.mean(durations):>8.2f} {percentile(durations, 50):>8.2f} {percentile(durations, 95):>8.2f} {errors:>7}")
+        finally:
+            if server is not None:
+                await server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=100, help='polling cycles per transport')
+    parser.add_argument('--host', help='inverter or gateway to benchmark instead of the local stand-in')
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--framer', choices=[framer.value for framer in [FramerType.SOCKET, FramerType.RTU]], default='socket', help='framer used with --host')
+    parser.add_argument('--timeout', type=int, default=3)
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+    asyncio.run(main(args))
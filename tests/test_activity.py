@@ -0,0 +1,41 @@
+"""Tests of the detection of the sleeping inverter."""
+
+from custom_components.fronius_modbus.activity import FULL, REDUCED, InverterActivity
+
+
+def test_sleep_status_reduces_polling():
+    activity = InverterActivity(probe_interval=300)
+    assert activity.update({'statusvendor': 'Sleeping'}, 0, True, False) == (FULL, REDUCED)
+    assert activity.mode == REDUCED
+
+
+def test_idle_inverter_at_night_is_asleep():
+    activity = InverterActivity(probe_interval=300)
+    data = {'statusvendor': 'Running', 'acpower': 0, 'pv_power': 5}
+    assert activity.update(data, 0, True, False) is None
+    assert activity.update(data, 1, True, True) == (FULL, REDUCED)
+
+
+def test_missing_power_is_not_idle():
+    activity = InverterActivity(probe_interval=300)
+    assert activity.update({'acpower': None}, 0, True, True) is None
+    assert activity.mode == FULL
+
+
+def test_inverter_is_probed_while_reduced():
+    activity = InverterActivity(probe_interval=300)
+    activity.update({'statusvendor': 'Standby'}, 0, True, False)
+    assert not activity.read_inverter(299)
+    assert activity.read_inverter(300)
+    assert activity.update({'statusvendor': 'Running', 'acpower': 500}, 300, True, False) == (REDUCED, FULL)
+    assert activity.read_inverter(301)
+
+
+def test_export_or_battery_wakes_without_probe():
+    activity = InverterActivity(probe_interval=300, export_threshold=50)
+    activity.update({'statusvendor': 'Sleeping'}, 0, True, False)
+    assert activity.update({'m1_power': -40}, 10, False, True) is None
+    assert activity.update({'m1_power': -100}, 20, False, True) == (REDUCED, FULL)
+
+    activity.update({'statusvendor': 'Sleeping'}, 30, True, False)
+    assert activity.update({'charge_status': 'Discharging'}, 40, False, True) == (REDUCED, FULL)
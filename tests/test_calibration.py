@@ -0,0 +1,130 @@
+"""Tests of the battery calibration workflow."""
+
+import asyncio
+
+from custom_components.fronius_modbus.calibration import (
+    BatteryCalibration,
+    CANCELLED,
+    CHARGING,
+    DISCHARGING,
+    FAILED,
+    FINISHED,
+    HOLDING,
+)
+
+SETTINGS = {'ext_mode': 0, 'minimum_reserve': 7}
+
+
+class FakeHub:
+    """Records the storage writes and passes the fast lane samples to the listener."""
+
+    max_charge_rate_w = 5000
+
+    def __init__(self, soc=60, fail_restore=False):
+        self.data = {'soc': soc}
+        self.steps = []
+        self.restored = []
+        self.phases = []
+        self.listener = None
+        self.fail_restore = fail_restore
+
+    def storage_settings(self):
+        return dict(SETTINGS)
+
+    def add_fast_listener(self, listener, keys):
+        self.listener = listener
+
+        def remove():
+            self.listener = None
+        return remove
+
+    async def apply_storage_step(self, ext_mode, charge_power=None, discharge_power=None, minimum_reserve=None):
+        self.steps.append((ext_mode, charge_power, discharge_power, minimum_reserve))
+
+    async def restore_storage_settings(self, settings):
+        if self.fail_restore:
+            raise Exception('write failed')
+        self.restored.append(settings)
+
+    def update_calibration_data(self):
+        if not self.phases or self.phases[-1] != self.calibration.phase:
+            self.phases.append(self.calibration.phase)
+
+    async def sample(self, soc):
+        await self.listener({'soc': soc}, 0)
+        await asyncio.sleep(0)
+
+
+def calibration(hub, hold_time=0.01, phase_timeout=5, refresh_interval=5):
+    hub.calibration = BatteryCalibration(hub, hold_time=hold_time, floor_soc=10, phase_timeout=phase_timeout, refresh_interval=refresh_interval)
+    return hub.calibration
+
+
+def test_phases_follow_the_state_of_charge():
+    async def run():
+        hub = FakeHub()
+        task = asyncio.create_task(calibration(hub).run())
+        await asyncio.sleep(0)
+        await hub.sample(100)
+        await asyncio.sleep(0.05)
+        await hub.sample(10)
+        await task
+        return hub
+    hub = asyncio.run(run())
+    assert hub.steps == [(4, 5000, None, None), (6, None, None, None), (7, None, None, 10)]
+    assert hub.phases == [CHARGING, HOLDING, DISCHARGING, 'Restoring', FINISHED]
+    assert hub.restored == [SETTINGS]
+    assert hub.calibration.progress == 100
+    assert hub.listener is None
+
+
+def test_cancel_restores_the_settings():
+    async def run():
+        hub = FakeHub()
+        cal = calibration(hub)
+        cal.task = asyncio.create_task(cal.run())
+        await asyncio.sleep(0)
+        await hub.sample(80)
+        await cal.cancel()
+        return hub
+    hub = asyncio.run(run())
+    assert hub.calibration.task.cancelled()
+    assert hub.calibration.phase == CANCELLED
+    assert hub.calibration.progress == 20
+    assert hub.restored == [SETTINGS]
+    assert hub.listener is None
+
+
+def test_phase_timeout_fails_and_restores_the_settings():
+    async def run():
+        hub = FakeHub()
+        await calibration(hub, phase_timeout=0.05).run()
+        return hub
+    hub = asyncio.run(run())
+    assert hub.calibration.phase == FAILED
+    assert hub.restored == [SETTINGS]
+
+
+def test_failed_restore_fails_the_calibration():
+    async def run():
+        hub = FakeHub(soc=100, fail_restore=True)
+        task = asyncio.create_task(calibration(hub).run())
+        await asyncio.sleep(0.05)
+        await hub.sample(10)
+        await task
+        return hub
+    hub = asyncio.run(run())
+    assert hub.calibration.phase == FAILED
+
+
+def test_step_is_applied_again_every_refresh_interval():
+    async def run():
+        hub = FakeHub()
+        cal = calibration(hub, refresh_interval=0.02)
+        cal.task = asyncio.create_task(cal.run())
+        await asyncio.sleep(0.07)
+        await cal.cancel()
+        return hub
+    hub = asyncio.run(run())
+    assert len(hub.steps) >= 3
+    assert set(hub.steps) == {(4, 5000, None, None)}
@@ -0,0 +1,90 @@
+"""Tests of the detection of points the device does not implement."""
+
+import asyncio
+
+import pytest
+
+from custom_components.fronius_modbus.froniusmodbusclient import FroniusModbusClient
+
+SLEEPING = 2
+NORMAL = 4
+
+
+def inverter_regs(status, phase_b_voltage=0xFFFF):
+    """Registers of an int inverter model 103 with 230 V on L1 and phase_b_voltage on L2."""
+    regs = [0] * 50
+    regs[8:11] = [230, phase_b_voltage, 0xFFFF]
+    regs[37] = status
+    return regs
+
+
+@pytest.fixture
+def client():
+    async def create():
+        return FroniusModbusClient('127.0.0.1', 502, 1, [], 5)
+    client = asyncio.run(create())
+    client._models = {1: {103: (40072, 50)}}
+    client.regs = inverter_regs(NORMAL)
+
+    async def get_registers(unit_id, address, count, retries=0, budgeted=True):
+        return client.regs[:count]
+    client.get_registers = get_registers
+    return client
+
+
+def read(client, regs, times=1):
+    client.regs = regs
+    for _ in range(times):
+        assert asyncio.run(client.read_inverter_data())
+
+
+def test_point_is_not_implemented_after_reads_while_awake(client):
+    read(client, inverter_regs(NORMAL), client.NOT_IMPLEMENTED_READS - 1)
+    assert client.implemented('PhVphB')
+    read(client, inverter_regs(NORMAL))
+    assert not client.implemented('PhVphB')
+    assert client.implemented('PhVphA')
+    assert client.data['PhVphB'] is None
+
+
+def test_first_read_counts_with_the_status_of_that_read(client):
+    read(client, inverter_regs(NORMAL))
+    assert client._not_implemented_reads['PhVphB'] == 1
+
+
+def test_reads_while_asleep_do_not_count(client):
+    read(client, inverter_regs(SLEEPING), client.NOT_IMPLEMENTED_READS + 1)
+    assert 'PhVphB' not in client.capabilities
+    assert client.implemented('PhVphB')
+
+
+def test_value_makes_the_point_implemented_again(client):
+    read(client, inverter_regs(NORMAL), client.NOT_IMPLEMENTED_READS)
+    read(client, inverter_regs(NORMAL, 231))
+    assert client.implemented('PhVphB')
+    assert client.data['PhVphB'] == 231
+    read(client, inverter_regs(NORMAL), client.NOT_IMPLEMENTED_READS)
+    assert client.implemented('PhVphB')
+
+
+def test_capabilities_are_restored_for_the_same_serial(client):
+    read(client, inverter_regs(NORMAL), client.NOT_IMPLEMENTED_READS)
+    state = client.capability_state('SERIAL1')
+
+    async def create():
+        return FroniusModbusClient('127.0.0.1', 502, 1, [], 5)
+    restarted = asyncio.run(create())
+    restarted.restore_capabilities(state, 'SERIAL2')
+    assert restarted.implemented('PhVphB')
+    restarted.restore_capabilities(state, 'SERIAL1')
+    assert not restarted.implemented('PhVphB')
+    assert not restarted.implemented('PhVphC')
+    assert restarted.implemented('PhVphA')
+
+
+def test_decode_skips_the_not_implemented_value(client):
+    uint16 = client._client.DATATYPE.UINT16
+    int16 = client._client.DATATYPE.INT16
+    assert client.decode('PhVphA', [0xFFFF], uint16) is None
+    assert client.decode('acpower', [0x8000], int16) is None
+    assert client.decode('acpower', [0xFFFF], int16) == -1
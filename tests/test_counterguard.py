@@ -0,0 +1,88 @@
+"""Tests of the plausibility filter for lifetime energy counters."""
+
+import logging
+
+from custom_components.fronius_modbus.counterguard import CounterGuard
+
+RATED_POWER = 3600  # 1.5 Wh per second with the default margin
+
+
+def test_first_value_is_accepted():
+    guard = CounterGuard()
+    assert guard.check('acenergy', 1000, RATED_POWER, 0) == 1000
+
+
+def test_plausible_increase_is_accepted():
+    guard = CounterGuard()
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    assert guard.check('acenergy', 1250, RATED_POWER, 100) == 1250
+
+
+def test_spike_keeps_the_last_value():
+    guard = CounterGuard()
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    # at most 1000 + 1.5 * 100 + 100 Wh after 100 s
+    assert guard.check('acenergy', 1251, RATED_POWER, 100) == 1000
+    assert guard.check('acenergy', 1250, RATED_POWER, 100) == 1250
+
+
+def test_frozen_counter_is_accepted_again():
+    guard = CounterGuard()
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    assert guard.check('acenergy', 5000, RATED_POWER, 10) == 1000
+    # the bound grows with the time since the last accepted value
+    assert guard.check('acenergy', 5000, RATED_POWER, 3000) == 5000
+
+
+def test_reset_needs_confirmations():
+    guard = CounterGuard(reset_confirmations=3)
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    assert guard.check('acenergy', 10, RATED_POWER, 1) == 1000
+    assert guard.check('acenergy', 11, RATED_POWER, 2) == 1000
+    assert guard.check('acenergy', 12, RATED_POWER, 3) == 12
+    assert guard.check('acenergy', 13, RATED_POWER, 4) == 13
+
+
+def test_single_dip_is_not_a_reset():
+    guard = CounterGuard(reset_confirmations=3)
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    assert guard.check('acenergy', 0, RATED_POWER, 1) == 1000
+    assert guard.check('acenergy', 1001, RATED_POWER, 2) == 1001
+    assert guard.check('acenergy', 0, RATED_POWER, 3) == 1001
+    assert guard.check('acenergy', 0, RATED_POWER, 4) == 1001
+
+
+def test_missing_value_keeps_the_last_value():
+    guard = CounterGuard()
+    assert guard.check('acenergy', None, RATED_POWER, 0) is None
+    guard.check('acenergy', 1000, RATED_POWER, 1)
+    assert guard.check('acenergy', None, RATED_POWER, 2) == 1000
+
+
+def test_missing_values_warn_once_in_a_row(caplog):
+    guard = CounterGuard()
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    with caplog.at_level(logging.DEBUG):
+        for now in range(1, 4):
+            guard.check('acenergy', None, RATED_POWER, now)
+        guard.check('acenergy', 1001, RATED_POWER, 4)
+        guard.check('acenergy', None, RATED_POWER, 5)
+    levels = [record.levelno for record in caplog.records if 'Received no' in record.message]
+    assert levels == [logging.WARNING, logging.DEBUG, logging.DEBUG, logging.WARNING]
+
+
+def test_state_round_trip():
+    guard = CounterGuard()
+    guard.check('acenergy', 1000, RATED_POWER, 0)
+    restored = CounterGuard()
+    restored.restore(guard.state)
+    assert restored.check('acenergy', 5000, RATED_POWER, 1) == 1000
+    assert restored.check('acenergy', 1001, RATED_POWER, 1) == 1001
+
+
+def test_restore_ignores_invalid_counters():
+    guard = CounterGuard()
+    guard.restore({'counters': {'acenergy': {'value': None, 'time': 0}, 'm1_imported': {'value': 10}}})
+    assert guard.state == {'counters': {}}
+    guard.restore(None)
+    assert guard.state == {'counters': {}}
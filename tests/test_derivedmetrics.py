@@ -0,0 +1,78 @@
+"""Tests of the derived metrics engine."""
+
+import pytest
+
+from custom_components.fronius_modbus.derivedmetrics import (
+    DERIVED_METRICS,
+    DerivedMetric,
+    DerivedMetricsEngine,
+)
+
+
+def test_metrics_are_evaluated_after_their_inputs():
+    engine = DerivedMetricsEngine([
+        DerivedMetric('b', ['a'], lambda a: a + 1),
+        DerivedMetric('a', ['x'], lambda x: x * 2),
+    ])
+    assert engine.keys == ['a', 'b']
+    data = {'x': 2}
+    assert engine.update(data) == ['a', 'b']
+    assert data == {'x': 2, 'a': 4, 'b': 5}
+
+
+def test_circular_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        DerivedMetricsEngine([
+            DerivedMetric('a', ['b'], lambda b: b),
+            DerivedMetric('b', ['a'], lambda a: a),
+        ])
+
+
+def test_only_changed_inputs_are_recalculated():
+    calls = []
+    engine = DerivedMetricsEngine([DerivedMetric('a', ['x'], lambda x: calls.append(x) or x)])
+    data = {'x': 1}
+    engine.update(data)
+    assert engine.update(data) == []
+    data['x'] = 2
+    assert engine.update(data) == ['a']
+    assert calls == [1, 2]
+
+
+def test_missing_input_skips_the_metric_unless_defaulted():
+    engine = DerivedMetricsEngine([
+        DerivedMetric('a', ['x', 'y'], lambda x, y: x + y),
+        DerivedMetric('b', ['x', 'z'], lambda x, z: x + z, defaults={'z': 10}),
+    ])
+    data = {'x': 1}
+    assert engine.update(data) == ['b']
+    assert data == {'x': 1, 'b': 11}
+
+
+def test_failing_formula_gives_none():
+    engine = DerivedMetricsEngine([DerivedMetric('a', ['x'], lambda x: 1 / x)])
+    data = {'x': 0}
+    engine.update(data)
+    assert data['a'] is None
+
+
+def test_power_flows():
+    engine = DerivedMetricsEngine(DERIVED_METRICS)
+    data = {'mppt1_power': 3000, 'acpower': 2800, 'm1_power': -800}
+    engine.update(data)
+    assert data['pv_power'] == 3000
+    assert data['load'] == 2000
+    assert data['grid_import_power'] == 0
+    assert data['grid_export_power'] == 800
+    assert data['self_consumption'] == pytest.approx(71.4)
+    assert data['autarky'] == 100
+    assert 'storage_power' not in data
+
+
+def test_non_numeric_input_gives_none():
+    engine = DerivedMetricsEngine(DERIVED_METRICS)
+    data = {'mppt1_power': 3000, 'acpower': None, 'm1_power': 500}
+    engine.update(data)
+    assert data['load'] is None
+    assert data['grid_import_power'] == 500
+    assert data['autarky'] is None
@@ -0,0 +1,94 @@
+"""Tests of the integration of power samples into energy."""
+
+import pytest
+
+from custom_components.fronius_modbus.energyintegrator import (
+    INTEGRATED_ENERGY_SOURCES,
+    EnergyIntegrator,
+    fast_energy_powers,
+)
+
+
+def integrator(max_gap=30):
+    return EnergyIntegrator({'load_energy': 'load', 'pv_energy': 'pv_power'}, max_gap)
+
+
+def test_trapezoidal_integration():
+    energy = integrator()
+    energy.add_samples({'load': 1000}, 0)
+    energy.add_samples({'load': 2000}, 10)
+    data = {'load': 2000}
+    energy.update(data)
+    assert data['load_energy'] == pytest.approx(1500 * 10 / 3600, abs=0.01)
+    assert 'pv_energy' not in data
+
+
+def test_gap_is_not_integrated():
+    energy = integrator(max_gap=30)
+    energy.add_samples({'load': 3600}, 0)
+    energy.add_samples({'load': 3600}, 100)
+    energy.add_samples({'load': 3600}, 110)
+    assert energy.state['totals']['load_energy'] == pytest.approx(10)
+
+
+def test_invalid_sample_restarts_the_integration():
+    energy = integrator()
+    energy.add_samples({'load': 3600}, 0)
+    energy.add_samples({'load': None}, 10)
+    energy.add_samples({'load': 3600}, 20)
+    assert energy.state['totals']['load_energy'] == 0
+    energy.add_samples({'load': 3600}, 30)
+    assert energy.state['totals']['load_energy'] == pytest.approx(10)
+
+
+def test_missing_key_keeps_the_last_sample():
+    energy = integrator()
+    energy.add_samples({'load': 3600, 'pv_power': 3600}, 0)
+    energy.add_samples({'load': 3600}, 10)
+    energy.add_samples({'load': 3600, 'pv_power': 3600}, 20)
+    totals = energy.state['totals']
+    assert totals['load_energy'] == pytest.approx(20)
+    assert totals['pv_energy'] == pytest.approx(20)
+
+
+def test_negative_power_counts_as_zero_and_old_samples_are_skipped():
+    energy = integrator()
+    energy.add_samples({'load': -500}, 0)
+    energy.add_samples({'load': 3600}, 10)
+    energy.add_samples({'load': 3600}, 5)
+    assert energy.state['totals']['load_energy'] == pytest.approx(5)
+
+
+def test_restore():
+    energy = integrator()
+    energy.restore({'totals': {'load_energy': 12.5, 'unknown': 1, 'pv_energy': None}})
+    assert energy.state == {'totals': {'load_energy': 12.5, 'pv_energy': 0.0}}
+
+
+def test_fast_energy_powers():
+    powers = fast_energy_powers({'m1_power': -800, 'acpower': 2800, 'mppt1_power': 2000, 'mppt2_power': 1000, 'mppt3_power': 0, 'mppt4_power': 500})
+    assert powers == {
+        'grid_import_power': 0,
+        'grid_export_power': 800,
+        'load': 2000,
+        'pv_power': 3000,
+        'mppt3_power': 0,
+        'mppt4_power': 500,
+    }
+    assert set(powers) == set(INTEGRATED_ENERGY_SOURCES.values())
+
+
+def test_fast_energy_powers_of_partial_samples():
+    assert fast_energy_powers({'m1_power': 300}) == {'grid_import_power': 300, 'grid_export_power': 0}
+    assert fast_energy_powers({'acpower': 1000, 'mppt1_power': 1200}) == {'pv_power': 1200}
+    assert fast_energy_powers({'mppt1_power': 1200, 'mppt2_power': None}) == {'pv_power': None}
+
+
+def test_fast_samples_between_updates():
+    energy = EnergyIntegrator(INTEGRATED_ENERGY_SOURCES, max_gap=30)
+    energy.add_samples({'pv_power': 0}, 0)
+    for timestamp in range(1, 11):
+        energy.add_samples(fast_energy_powers({'mppt1_power': 3600 if timestamp <= 5 else 0}), timestamp)
+    energy.add_samples({'pv_power': 0}, 10)
+    # 3600 W from 1 s to 5 s and the ramps from 0 s to 1 s and 5 s to 6 s
+    assert energy.state['totals']['pv_energy'] == pytest.approx(5)
@@ -0,0 +1,35 @@
+"""Tests of the labels of enum points."""
+
+import logging
+
+from custom_components.fronius_modbus.extmodbusclient import EnumRegistry
+
+
+def registry():
+    return EnumRegistry({'status': {1: 'Off', 2: 'Sleeping'}})
+
+
+def test_label():
+    enums = registry()
+    assert enums.label('status', 1) == 'Off'
+    assert enums.label('status', 2) == 'Sleeping'
+
+
+def test_prefixed_key_uses_the_enum():
+    enums = registry()
+    assert enums.label('inv2_status', 2, 'status') == 'Sleeping'
+
+
+def test_unknown_code(caplog):
+    enums = registry()
+    with caplog.at_level(logging.WARNING):
+        assert enums.label('status', 9) is EnumRegistry.UNKNOWN
+        assert enums.label('status', 9) is EnumRegistry.UNKNOWN
+    # only a change of the code is looked up and logged again
+    assert len(caplog.records) == 1
+
+
+def test_labels_are_interned():
+    first = EnumRegistry({'a': {1: ''.join(['En', 'abled'])}})
+    second = EnumRegistry({'b': {1: ''.join(['Ena', 'bled'])}})
+    assert first.label('a', 1) is second.label('b', 1)
@@ -0,0 +1,62 @@
+"""Tests of the decoding of bitfields and the Fronius vendor events."""
+
+import asyncio
+
+from custom_components.fronius_modbus.extmodbusclient import BitfieldDecoder, bitfield_decoder
+from custom_components.fronius_modbus.froniusmodbusclient import FroniusModbusClient, decode_events
+
+
+def test_active_bits_and_strings():
+    decoder = BitfieldDecoder(['a', 'b', 'c'], bits=16)
+    assert decoder.active_bits(0) == ()
+    assert decoder.active_bits(0b101) == (0, 2)
+    assert decoder.strings(0b101) == ('a', 'c')
+    assert decoder.string(0b101) == 'a,c'
+    assert decoder.string(0) == 'NA'
+
+
+def test_undefined_and_out_of_range_bits():
+    decoder = BitfieldDecoder(['a'], bits=16)
+    assert decoder.strings(0b10) == ('bit 1 undefined',)
+    # bits above the width of the field are ignored
+    assert decoder.active_bits(1 << 16 | 1) == (0,)
+
+
+def test_bits_of_all_bytes():
+    decoder = BitfieldDecoder([], bits=32)
+    assert decoder.active_bits(1 << 31 | 1 << 8 | 1) == (0, 8, 31)
+
+
+def test_string_is_truncated():
+    decoder = BitfieldDecoder(['x' * 200, 'y' * 200])
+    assert len(decoder.string(0b11)) == 255
+
+
+def test_shared_decoders():
+    assert bitfield_decoder(('a', 'b')) is bitfield_decoder(('a', 'b'))
+
+
+def test_decode_events():
+    state, attributes, active = decode_events((0b11, 0, 1))
+    assert state == 'Insulation fault,Grid error,Time fault'
+    assert attributes['EvtVnd1'] == 3
+    assert attributes['insulation_fault'] is True
+    assert attributes['ac_overcurrent'] is False
+    assert active == frozenset({('EvtVnd1', 0), ('EvtVnd1', 1), ('EvtVnd3', 0)})
+    assert decode_events((0, 0, 0))[0] == 'None'
+
+
+def test_event_edges():
+    async def create():
+        return FroniusModbusClient('127.0.0.1', 502, 1, [], 5)
+    client = asyncio.run(create())
+    client.set_events(1, '', 0b1, 0, 0)
+    # the events of the first read are the baseline
+    assert client.event_edges() == []
+    client.set_events(1, '', 0b10, 0, 0)
+    assert client.event_edges() == [
+        (1, 'EvtVnd1', 0, 'Insulation fault', False),
+        (1, 'EvtVnd1', 1, 'Grid error', True),
+    ]
+    client.set_events(1, '', 0b10, 0, 0)
+    assert client.event_edges() == []
@@ -0,0 +1,85 @@
+"""Tests of the closed loop export limit controller."""
+
+from custom_components.fronius_modbus.exportcontrol import (
+    EXPORT_LIMIT_RATE_MAX,
+    EXPORT_LIMIT_RATE_MIN,
+    ExportLimitController,
+)
+
+MAX_POWER = 10000
+
+
+def controller(**kwargs):
+    options = {'target': 0, 'kp': 0.5, 'ki': 0.5, 'min_write_interval': 5}
+    options.update(kwargs)
+    return ExportLimitController(**options)
+
+
+def test_first_update_starts_unlimited():
+    control = controller()
+    control.reset()
+    assert control.update(-2000, MAX_POWER, 0) == EXPORT_LIMIT_RATE_MAX
+    assert control.output == MAX_POWER
+
+
+def test_missing_sample_or_max_power_writes_nothing():
+    control = controller()
+    control.reset()
+    assert control.update(None, MAX_POWER, 0) is None
+    assert control.update(-2000, None, 0) is None
+    assert control.output is None
+
+
+def test_export_lowers_the_limit():
+    control = controller()
+    control.reset(EXPORT_LIMIT_RATE_MAX, MAX_POWER)
+    control.update(-2000, MAX_POWER, 0)
+    rate = control.update(-2000, MAX_POWER, 1)
+    assert rate is not None and rate < EXPORT_LIMIT_RATE_MAX
+
+
+def test_step_is_limited():
+    control = controller(kp=10, ki=10, max_step=1000)
+    control.reset(EXPORT_LIMIT_RATE_MAX, MAX_POWER)
+    control.update(0, MAX_POWER, 0)
+    control.update(-5000, MAX_POWER, 1)
+    assert control.output == MAX_POWER - 1000
+
+
+def test_output_is_clamped_to_the_minimum_rate():
+    control = controller(kp=10, ki=10, max_step=100000)
+    control.reset(EXPORT_LIMIT_RATE_MAX, MAX_POWER)
+    control.update(0, MAX_POWER, 0)
+    assert control.update(-50000, MAX_POWER, 1) == EXPORT_LIMIT_RATE_MIN
+
+
+def test_deadband_keeps_the_output():
+    control = controller(deadband=50)
+    control.reset(5000, MAX_POWER)
+    control.update(-40, MAX_POWER, 0)
+    assert control.update(30, MAX_POWER, 1) is None
+    assert control.output == 5000
+
+
+def test_hysteresis_and_write_interval():
+    control = controller(kp=0, ki=0.01, max_step=100000, write_hysteresis=50, min_write_interval=5)
+    control.reset(5000, MAX_POWER)
+    control.update(0, MAX_POWER, 0)
+    # 0.01 * 2000 W * 1 s = 20 W, less than the hysteresis
+    assert control.update(2000, MAX_POWER, 1) is None
+    rate = control.update(20000, MAX_POWER, 2)
+    assert rate is not None
+    control.written(rate, 2)
+    # larger than the hysteresis but within the write interval
+    assert control.update(20000, MAX_POWER, 3) is None
+    assert control.update(20000, MAX_POWER, 7) is not None
+
+
+def test_rate_is_retried_until_written():
+    control = controller(kp=0, ki=0.01, max_step=100000)
+    control.reset(5000, MAX_POWER)
+    control.update(0, MAX_POWER, 0)
+    first = control.update(20000, MAX_POWER, 1)
+    assert first is not None
+    # not confirmed, so the next sample returns a rate again without waiting for the write interval
+    assert control.update(0, MAX_POWER, 2) == first
@@ -0,0 +1,41 @@
+"""Tests of the writes of the export limit rate."""
+
+import asyncio
+
+import pytest
+
+from custom_components.fronius_modbus.froniusmodbusclient import FroniusModbusClient
+
+
+@pytest.fixture
+def client():
+    async def create():
+        return FroniusModbusClient('127.0.0.1', 502, 1, [], 5, register_cache_ttl=60)
+    client = asyncio.run(create())
+    client.written = []
+
+    async def write_registers(unit_id, address, payload, skip_unchanged=True):
+        if client.fail:
+            raise Exception('write_registers: no connection')
+        client.written.append(payload)
+        client.update_register_cache(unit_id, address, payload)
+        return True
+    client.fail = False
+    client.write_registers = write_registers
+    return client
+
+
+@pytest.mark.parametrize('rate, register', [(4999.6, 5000), (4999.4, 4999), (10, 100), (20000, 10000)])
+def test_written_register_is_stored(client, rate, register):
+    asyncio.run(client.set_export_limit_rate(rate))
+    assert client.written == [[register]]
+    assert client.data['export_limit_rate'] == register
+    assert client.registers_unchanged(1, client.export_limit_rate_address, [client.export_limit_register(rate)])
+
+
+def test_failed_write_keeps_the_rate(client):
+    client.data['export_limit_rate'] = 8000
+    client.fail = True
+    with pytest.raises(Exception):
+        asyncio.run(client.set_export_limit_rate(5000))
+    assert client.data['export_limit_rate'] == 8000
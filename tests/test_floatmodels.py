@@ -0,0 +1,76 @@
+"""Tests of the decoding of the SunSpec float models."""
+
+import struct
+
+import pytest
+
+from custom_components.fronius_modbus.floatmodels import (
+    INVERTER_FLOAT_LAYOUT,
+    METER_FLOAT_LAYOUT,
+    METER_FLOAT_POWER_LAYOUT,
+    METER_FLOAT_POWER_OFFSET,
+    FloatLayout,
+)
+
+
+def float_regs(value):
+    return list(struct.unpack('>2H', struct.pack('>f', value)))
+
+
+def model_regs(layout, values):
+    """Registers of a model holding values, keyed by offset, and NaN in all other float points."""
+    regs = [0] * layout.length
+    for key, offset, point_type, *_ in layout._points:
+        if point_type == 'float32':
+            regs[offset:offset + 2] = float_regs(float('nan'))
+    for offset, value in values.items():
+        regs[offset:offset + len(value)] = value
+    return regs
+
+
+def test_decode_types_and_rounding():
+    layout = FloatLayout([
+        ('power', 0, 'float32', 1, None, None),
+        ('status', 3, 'uint16', None, None, None),
+        ('events', 4, 'uint32', None, None, None),
+    ])
+    assert layout.length == 6
+    regs = float_regs(1234.56) + [0, 7, 1, 2]
+    assert layout.decode(regs) == {'power': 1234.6, 'status': 7, 'events': 65538}
+    assert layout.decode(regs, keys=['status']) == {'status': 7}
+
+
+def test_overlapping_points_are_rejected():
+    with pytest.raises(ValueError):
+        FloatLayout([('a', 0, 'float32', 2, None, None), ('b', 1, 'uint16', None, None, None)])
+
+
+def test_nan_and_out_of_bounds_are_none():
+    regs = model_regs(METER_FLOAT_LAYOUT, {26: float_regs(60000), 24: float_regs(50.01)})
+    values = METER_FLOAT_LAYOUT.decode(regs)
+    assert values['power'] is None
+    assert values['line_frequency'] == 50.01
+    assert values['imported'] is None
+
+
+def test_not_implemented_points():
+    regs = model_regs(METER_FLOAT_LAYOUT, {26: float_regs(-1500.5)})
+    not_implemented = METER_FLOAT_LAYOUT.not_implemented(regs)
+    assert 'power' not in not_implemented
+    assert {'PhVphA', 'exported', 'imported'} <= not_implemented
+
+
+def test_power_layout_matches_the_model_layout():
+    regs = model_regs(METER_FLOAT_LAYOUT, {26: float_regs(-1500.5)})
+    power_regs = regs[METER_FLOAT_POWER_OFFSET:METER_FLOAT_POWER_OFFSET + METER_FLOAT_POWER_LAYOUT.length]
+    assert METER_FLOAT_POWER_LAYOUT.decode(power_regs) == {'power': -1500.5}
+    assert METER_FLOAT_LAYOUT.decode(regs)['power'] == -1500.5
+
+
+def test_inverter_layout():
+    regs = model_regs(INVERTER_FLOAT_LAYOUT, {20: float_regs(4321.25), 47: [4], 52: [0, 1]})
+    values = INVERTER_FLOAT_LAYOUT.decode(regs)
+    assert values['acpower'] == 4321.25
+    assert values['StVnd'] == 4
+    assert values['EvtVnd1'] == 1
+    assert values['tempcab'] is None
@@ -0,0 +1,68 @@
+"""Tests of the grid status estimation."""
+
+from custom_components.fronius_modbus.gridstatus import (
+    OFF_GRID,
+    OFF_GRID_OPERATING,
+    ON_GRID,
+    ON_GRID_OPERATING,
+    GridStatusEstimator,
+)
+
+
+def test_first_status_is_adopted_immediately():
+    estimator = GridStatusEstimator()
+    assert estimator.add_sample(0, 50.0, 50.0) is None
+    assert estimator.status == ON_GRID_OPERATING
+
+
+def test_no_status_without_samples():
+    estimator = GridStatusEstimator()
+    assert estimator.add_sample(0, None, 50.0) is None
+    assert estimator.status is None
+
+
+def test_inverter_not_operating():
+    estimator = GridStatusEstimator()
+    estimator.add_sample(0, 50.0, 0)
+    assert estimator.status == ON_GRID
+
+
+def test_outage_is_reported_without_dwell():
+    estimator = GridStatusEstimator(window=1, off_grid_dwell=0)
+    estimator.add_sample(0, 50.0, 50.0)
+    assert estimator.add_sample(1, 0, 53.0) == (ON_GRID_OPERATING, OFF_GRID_OPERATING)
+    assert estimator.add_sample(2, 0, 0) == (OFF_GRID_OPERATING, OFF_GRID)
+
+
+def test_single_noisy_sample_is_filtered():
+    estimator = GridStatusEstimator(window=3)
+    for timestamp in range(3):
+        estimator.add_sample(timestamp, 50.0, 50.0)
+    assert estimator.add_sample(3, 0, 50.0) is None
+    assert estimator.status == ON_GRID_OPERATING
+
+
+def test_return_to_grid_needs_the_dwell_time():
+    estimator = GridStatusEstimator(window=1, on_grid_dwell=30)
+    estimator.add_sample(0, 0, 0)
+    assert estimator.status == OFF_GRID
+    assert estimator.add_sample(10, 50.0, 0) is None
+    assert estimator.add_sample(39, 50.0, 0) is None
+    assert estimator.add_sample(40, 50.0, 0) == (OFF_GRID, ON_GRID)
+
+
+def test_interrupted_candidate_starts_again():
+    estimator = GridStatusEstimator(window=1, on_grid_dwell=30)
+    estimator.add_sample(0, 0, 0)
+    estimator.add_sample(10, 50.0, 0)
+    estimator.add_sample(20, 0, 0)
+    assert estimator.add_sample(45, 50.0, 0) is None
+    assert estimator.add_sample(75, 50.0, 0) == (OFF_GRID, ON_GRID)
+
+
+def test_hysteresis_keeps_the_grid_online():
+    estimator = GridStatusEstimator(window=1, grid_tolerance=0.2, grid_hysteresis=0.1)
+    estimator.add_sample(0, 50.0, 50.0)
+    assert estimator.add_sample(1, 50.25, 50.0) is None
+    assert estimator.status == ON_GRID_OPERATING
+    assert estimator.add_sample(2, 50.35, 50.0) == (ON_GRID_OPERATING, OFF_GRID_OPERATING)
@@ -0,0 +1,69 @@
+"""Tests of the serialization of the writes of the hub."""
+
+import asyncio
+
+import pytest
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.fronius_modbus.hub import Hub
+
+
+class FakeClient:
+    """Records the writes of the hub, the export limit rate write takes a while."""
+
+    def __init__(self):
+        self.writes = []
+
+    async def set_export_limit_rate(self, rate):
+        self.writes.append(('start rate', rate))
+        await asyncio.sleep(0.05)
+        self.writes.append(('end rate', rate))
+
+    async def set_export_limit_enable(self, enable):
+        self.writes.append(('enable', enable))
+
+    async def write_raw_registers(self, unit_id, address, values):
+        self.writes.append(('raw', address))
+
+    async def apply_export_limit(self, rate):
+        self.writes.append(('apply', rate))
+
+
+def hub():
+    hub = Hub.__new__(Hub)
+    hub._write_lock = asyncio.Lock()
+    hub._client = FakeClient()
+    hub._remove_export_control = None
+    return hub
+
+
+def test_raw_write_waits_for_a_running_write_sequence():
+    async def run():
+        writes_hub = hub()
+        sequence = asyncio.create_task(writes_hub._apply_export_control_rate(5000))
+        await asyncio.sleep(0)
+        assert writes_hub.writing
+        await writes_hub.write_registers(1, 40232, [1000])
+        await sequence
+        return writes_hub._client.writes
+    assert asyncio.run(run()) == [('start rate', 5000), ('end rate', 5000), ('enable', 1), ('raw', 40232)]
+
+
+def test_manual_export_limit_waits_for_the_export_control():
+    async def run():
+        writes_hub = hub()
+        step = asyncio.create_task(writes_hub._apply_export_control_rate(5000))
+        await asyncio.sleep(0)
+        await writes_hub.apply_export_limit(8000)
+        await step
+        return writes_hub._client.writes
+    assert asyncio.run(run()) == [('start rate', 5000), ('end rate', 5000), ('enable', 1), ('apply', 8000)]
+
+
+def test_manual_export_limit_is_rejected_while_export_control_runs():
+    writes_hub = hub()
+    writes_hub._remove_export_control = lambda: None
+    for write in [writes_hub.set_export_limit_rate(8000), writes_hub.set_export_limit_enable(0), writes_hub.apply_export_limit(8000)]:
+        with pytest.raises(ServiceValidationError):
+            asyncio.run(write)
+    assert writes_hub._client.writes == []
@@ -0,0 +1,29 @@
+"""Tests of the planning of raw register reads."""
+
+from custom_components.fronius_modbus.extmodbusclient import ExtModbusClient
+
+
+def test_overlapping_and_adjacent_ranges_are_merged():
+    ranges = [(1, 40083, 2), (1, 40080, 4), (1, 40085, 5), (200, 40097, 1)]
+    assert ExtModbusClient.plan_reads(ranges) == [(1, 40080, 10), (200, 40097, 1)]
+
+
+def test_ranges_with_a_gap_are_not_merged():
+    assert ExtModbusClient.plan_reads([(1, 100, 2), (1, 103, 2)]) == [(1, 100, 2), (1, 103, 2)]
+
+
+def test_units_are_not_merged():
+    assert ExtModbusClient.plan_reads([(2, 100, 2), (1, 100, 2)]) == [(1, 100, 2), (2, 100, 2)]
+
+
+def test_contained_range():
+    assert ExtModbusClient.plan_reads([(1, 100, 10), (1, 102, 2)]) == [(1, 100, 10)]
+
+
+def test_reads_are_split_at_the_maximum_count():
+    max_count = ExtModbusClient.MAX_READ_COUNT
+    assert ExtModbusClient.plan_reads([(1, 0, max_count * 2 + 10)]) == [
+        (1, 0, max_count),
+        (1, max_count, max_count),
+        (1, max_count * 2, 10),
+    ]
@@ -0,0 +1,54 @@
+"""Tests of the request timeouts from the round trip time."""
+
+import pytest
+
+from custom_components.fronius_modbus.extmodbusclient import RttEstimator
+
+
+def test_initial_timeout_without_samples():
+    estimator = RttEstimator(initial_timeout=2)
+    assert estimator.timeout('inverter') == 2
+    assert estimator.srtt('inverter') is None
+
+
+def test_first_sample():
+    estimator = RttEstimator()
+    estimator.add_sample('inverter', 0.1)
+    assert estimator.srtt('inverter') == pytest.approx(0.1)
+    # srtt + 4 * rtt / 2
+    assert estimator.timeout('inverter') == pytest.approx(0.3)
+
+
+def test_smoothing():
+    estimator = RttEstimator()
+    estimator.add_sample('inverter', 0.1)
+    estimator.add_sample('inverter', 0.5)
+    assert estimator.srtt('inverter') == pytest.approx(0.1 * 7 / 8 + 0.5 / 8)
+    rttvar = 0.05 * 3 / 4 + 0.4 / 4
+    assert estimator.timeout('inverter') == pytest.approx(estimator.srtt('inverter') + 4 * rttvar)
+
+
+def test_timeout_is_clamped():
+    estimator = RttEstimator(min_timeout=0.2, max_timeout=10)
+    estimator.add_sample('inverter', 0.01)
+    assert estimator.timeout('inverter') == 0.2
+    estimator.add_sample('meter', 20)
+    assert estimator.timeout('meter') == 10
+
+
+def test_backoff_doubles_until_the_next_sample():
+    estimator = RttEstimator(initial_timeout=2, max_timeout=10)
+    estimator.backoff('inverter')
+    assert estimator.timeout('inverter') == 4
+    estimator.backoff('inverter')
+    estimator.backoff('inverter')
+    assert estimator.timeout('inverter') == 10
+    estimator.add_sample('inverter', 0.1)
+    assert estimator.timeout('inverter') == pytest.approx(0.3)
+
+
+def test_keys_are_independent():
+    estimator = RttEstimator(initial_timeout=2)
+    estimator.add_sample('inverter', 0.1)
+    assert estimator.timeout('meter') == 2
+    assert set(estimator.estimates) == {'inverter'}
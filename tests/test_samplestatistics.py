@@ -0,0 +1,34 @@
+"""Tests of the statistics of fast power samples."""
+
+from custom_components.fronius_modbus.samplestatistics import SampleStatistics
+
+
+def test_statistics_of_a_window():
+    statistics = SampleStatistics(['m1_power'])
+    for value in [100, -50, 250, 10]:
+        statistics.add_samples({'m1_power': value})
+    data, attributes = {}, {}
+    statistics.publish(data, attributes)
+    assert data == {'m1_power_min': -50, 'm1_power_max': 250, 'm1_power_mean': 77.5}
+    assert attributes['m1_power'] == {'min': -50, 'max': 250, 'mean': 77.5, 'last': 10, 'samples': 4}
+
+
+def test_invalid_samples_and_other_keys_are_ignored():
+    statistics = SampleStatistics(['m1_power'])
+    statistics.add_samples({'m1_power': None, 'acpower': 1000})
+    statistics.add_samples({'m1_power': True})
+    statistics.add_samples({'m1_power': 20})
+    data, attributes = {}, {}
+    statistics.publish(data, attributes)
+    assert attributes['m1_power']['samples'] == 1
+    assert 'acpower' not in attributes
+
+
+def test_publish_starts_a_new_window():
+    statistics = SampleStatistics(['m1_power'])
+    statistics.add_samples({'m1_power': 100})
+    statistics.publish({}, {})
+    data, attributes = {}, {}
+    statistics.publish(data, attributes)
+    assert data == {'m1_power_min': None, 'm1_power_max': None, 'm1_power_mean': None}
+    assert attributes['m1_power']['samples'] == 0
@@ -0,0 +1,70 @@
+"""Tests of the battery schedule."""
+
+from datetime import time
+
+import pytest
+
+from custom_components.fronius_modbus.schedule import (
+    BatterySchedule,
+    ScheduleWindow,
+    parse_mode,
+)
+
+
+def test_parse_mode():
+    assert parse_mode(3) == 3
+    assert parse_mode('4') == 4
+    assert parse_mode('auto') == 0
+    with pytest.raises(ValueError):
+        parse_mode('unknown')
+    with pytest.raises(ValueError):
+        parse_mode(99)
+
+
+def test_window_within_a_day():
+    window = ScheduleWindow('08:00', '12:00', 0)
+    assert window.contains(time(8, 0))
+    assert window.contains(time(11, 59))
+    assert not window.contains(time(12, 0))
+    assert not window.contains(time(7, 59))
+
+
+def test_window_spanning_midnight():
+    window = ScheduleWindow('22:00', '06:00', 0)
+    assert window.contains(time(23, 0))
+    assert window.contains(time(5, 59))
+    assert not window.contains(time(6, 0))
+    assert not window.contains(time(12, 0))
+
+
+def test_empty_window_is_rejected():
+    with pytest.raises(ValueError):
+        ScheduleWindow('08:00', '08:00', 0)
+
+
+def test_first_window_wins_and_default_applies_outside():
+    schedule = BatterySchedule.from_dict({
+        'windows': [
+            {'start': '00:00', 'end': '06:00', 'mode': 4, 'discharge_power': 3000},
+            {'start': '05:00', 'end': '07:00', 'mode': 6},
+        ],
+        'default': {'mode': 0},
+    })
+    assert schedule.active
+    assert schedule.target(time(5, 30)).mode == 4
+    assert schedule.target(time(6, 30)).mode == 6
+    assert schedule.target(time(12, 0)).mode == 0
+
+
+def test_no_target_outside_without_default():
+    schedule = BatterySchedule.from_dict({'windows': [{'start': '00:00', 'end': '06:00', 'mode': 4}]})
+    assert schedule.target(time(12, 0)) is None
+    assert not BatterySchedule.from_dict(None).active
+
+
+def test_dict_round_trip():
+    config = {
+        'windows': [{'start': '22:00:00', 'end': '06:00:00', 'mode': 4, 'charge_power': None, 'discharge_power': 3000, 'minimum_reserve': 20}],
+        'default': {'mode': 0, 'charge_power': None, 'discharge_power': None, 'minimum_reserve': None},
+    }
+    assert BatterySchedule.from_dict(config).as_dict() == config
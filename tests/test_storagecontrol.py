@@ -0,0 +1,78 @@
+"""Tests of the reconciliation of the storage control registers."""
+
+import pytest
+
+from custom_components.fronius_modbus.storagecontrol import (
+    ADOPTED,
+    POLICY_ADOPT,
+    POLICY_REASSERT,
+    REASSERTED,
+    SYNCED,
+    StorageControl,
+    derive_ext_mode,
+)
+
+
+@pytest.mark.parametrize('storage_control_mode, charge_rate, discharge_rate, ext_mode', [
+    (0, 10000, 10000, 0),
+    (1, 5000, 10000, 1),
+    (1, 0, 10000, 7),
+    (2, 10000, 5000, 2),
+    (3, 5000, 5000, 3),
+    (2, 10000, -5000, 4),
+    (3, -5000, 10000, 5),
+    (2, 10000, 0, 6),
+    (3, 0, 0, 7),
+])
+def test_derive_ext_mode(storage_control_mode, charge_rate, discharge_rate, ext_mode):
+    assert derive_ext_mode(storage_control_mode, charge_rate, discharge_rate) == ext_mode
+
+
+def observed(mode, charge_rate, discharge_rate):
+    return {'StorCtl_Mod': mode, 'InWRte': charge_rate, 'OutWRte': discharge_rate}
+
+
+def test_first_read_becomes_the_desired_state():
+    control = StorageControl()
+    assert control.reconcile(observed(2, 10000, 0)) == {}
+    assert control.state == SYNCED
+    assert control.desired == observed(2, 10000, 0)
+
+
+def test_written_values_are_synced():
+    control = StorageControl()
+    control.reconcile(observed(0, 10000, 10000))
+    control.expect('StorCtl_Mod', 2)
+    control.expect('OutWRte', 0)
+    assert control.reconcile(observed(2, 10000, 0)) == {}
+    assert control.state == SYNCED
+    assert control.drifts == 0
+
+
+def test_ignored_rate_is_no_difference():
+    control = StorageControl(POLICY_REASSERT)
+    control.reconcile(observed(1, 5000, 0))
+    # OutWRte is ignored while only charging is limited
+    assert control.reconcile(observed(1, 5000, 10000)) == {}
+    assert control.state == SYNCED
+
+
+def test_adopt_takes_the_read_values():
+    control = StorageControl(POLICY_ADOPT)
+    control.reconcile(observed(3, 10000, 0))
+    assert control.reconcile(observed(3, 10000, 10000)) == {}
+    assert control.state == ADOPTED
+    assert control.drifts == 1
+    assert control.desired['OutWRte'] == 10000
+    control.reconcile(observed(3, 10000, 10000))
+    assert control.state == SYNCED
+
+
+def test_reassert_returns_the_differences():
+    control = StorageControl(POLICY_REASSERT)
+    control.reconcile(observed(3, 10000, 0))
+    assert control.reconcile(observed(0, 10000, 10000)) == {'StorCtl_Mod': 3, 'OutWRte': 0}
+    assert control.state == REASSERTED
+    assert control.desired == observed(3, 10000, 0)
+    assert control.reconcile(observed(3, 10000, 0)) == {}
+    assert control.state == SYNCED
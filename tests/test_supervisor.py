@@ -0,0 +1,121 @@
+"""Tests of the connection supervisor of the modbus client."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from pymodbus.exceptions import ConnectionException
+
+from custom_components.fronius_modbus.froniusmodbusclient import FroniusModbusClient
+
+
+class FakeModbusClient:
+    """Connects after failures failed attempts and reports the changes like pymodbus."""
+
+    def __init__(self, client, failures=0, connected=False):
+        self._client = client
+        self.failures = failures
+        self.connected = connected
+        self.attempts = 0
+        self.ctx = SimpleNamespace(comm_params=SimpleNamespace(timeout_connect=None))
+
+    async def connect(self):
+        self.attempts += 1
+        if self.attempts > self.failures:
+            self.connected = True
+            self._client._on_connection_change(True)
+        return self.connected
+
+    def close(self):
+        if self.connected:
+            self.connected = False
+            self._client._on_connection_change(False)
+
+
+@pytest.fixture
+def client():
+    async def create():
+        return FroniusModbusClient('127.0.0.1', 502, 1, [], 5)
+    client = asyncio.run(create())
+    client._apply_socket_options = lambda: None
+    return client
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Records the reconnect delays without waiting for them."""
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record(delay, *args, **kwargs):
+        if delay:
+            delays.append(delay)
+        await sleep(0)
+    monkeypatch.setattr(asyncio, 'sleep', record)
+    return delays
+
+
+def test_reconnect_delay_doubles_up_to_the_maximum(client, delays):
+    client.MAX_RECONNECT_DELAY = 4
+
+    async def run():
+        client._client = FakeModbusClient(client, failures=5)
+        supervisor = asyncio.create_task(client.supervise(30))
+        while not client.connected:
+            await asyncio.sleep(0)
+        client.close()
+        await supervisor
+    asyncio.run(run())
+    assert delays[:5] == [1, 2, 4, 4, 4]
+    assert client._client.attempts == 6
+    assert client.reconnects == 0
+
+
+def test_failed_keepalive_replaces_the_connection(client):
+    keepalives = []
+
+    async def keepalive():
+        keepalives.append(client.reconnects)
+        if len(keepalives) == 1:
+            return False
+        client._last_activity = time.monotonic()
+        return True
+
+    async def run():
+        client._client = FakeModbusClient(client)
+        client._keepalive = keepalive
+        supervisor = asyncio.create_task(client.supervise(0.05))
+        while len(keepalives) < 2:
+            await asyncio.sleep(0)
+        client.close()
+        await supervisor
+    asyncio.run(run())
+    assert keepalives == [0, 1]
+    assert client._client.attempts == 2
+
+
+def test_reads_do_not_connect_while_supervised(client):
+    async def run():
+        client._client = FakeModbusClient(client)
+        client._supervised = True
+        return await client._check_and_reconnect()
+    assert not asyncio.run(run())
+    assert client._client.attempts == 0
+
+
+def test_close_stops_the_supervisor_and_cancels_requests_in_flight(client):
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def run():
+        client._client = FakeModbusClient(client, connected=True)
+        supervisor = asyncio.create_task(client.supervise(30))
+        request = asyncio.create_task(client._execute(1, slow, budgeted=False))
+        await asyncio.sleep(0.01)
+        client.close()
+        await asyncio.wait_for(supervisor, 1)
+        with pytest.raises(ConnectionException):
+            await request
+    asyncio.run(run())
+    assert not client.connected